@@ -2,6 +2,7 @@ from flask import Blueprint, request, flash, url_for, render_template, redirect
 from models.adminModel import Admin
 from database import db
 from models.userModel import User
+from services.auth import LoginBusy, LoginThrottled, verify_login
 
 admin_bp = Blueprint('admin_bp',  __name__, template_folder='templates',
                      static_folder='static')
@@ -18,7 +19,17 @@ def userLogin():
 
         existing_admin = db.session.execute(db.select(Admin).filter_by(admin_name=name)).scalar_one_or_none()
 
-        if existing_admin and existing_admin.check_password(password):
+        try:
+            # admins share the hashing pool and throttle with users, under their own keys
+            valid = verify_login(f'admin:{name}', existing_admin.admin_password if existing_admin else None, password)
+        except LoginThrottled as e:
+            flash(str(e), 'danger')
+            return render_template('login.html'), 429
+        except LoginBusy:
+            flash('Login is busy, try again shortly', 'danger')
+            return render_template('login.html'), 503
+
+        if valid:
             flash('You have logged in successfully', 'success')
             return render_template('listuser.html')
         else:
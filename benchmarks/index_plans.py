@@ -0,0 +1,121 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+"""
+Compares query plans and timings of the hot queries with and without the
+indexes declared on the models
+
+    python -m benchmarks.index_plans --clients 100000
+    python -m benchmarks.index_plans --database-url postgresql://.../scratch
+
+The target database is dropped and recreated, never point it at real data.
+"""
+
+HOT_QUERIES = [
+    ("clients in a building", "SELECT * FROM client WHERE building_id = :building_id"),
+    ("clients in an office", "SELECT * FROM client WHERE office_id = :office_id"),
+    ("meetings of a client", "SELECT * FROM meeting WHERE client_id = :client_id"),
+    ("internet of a client", "SELECT * FROM internet WHERE client_id = :client_id"),
+    ("offices in a building", "SELECT * FROM buildingoffice WHERE building_id = :building_id"),
+    ("building by name", "SELECT * FROM building WHERE building_name = :building_name"),
+    ("office by name", "SELECT * FROM buildingoffice WHERE office_name = :office_name"),
+    (
+        "/count scheduled meetings",
+        "SELECT count(meeting_id) FROM meeting WHERE meeting_status = 'Scheduled'",
+    ),
+    (
+        "/count pending deals",
+        "SELECT count(internet_id) FROM internet WHERE deal_status = 'Pending'",
+    ),
+]
+
+PARAMS = {
+    "building_id": 7,
+    "office_id": 42,
+    "client_id": 1234,
+    "building_name": "Building 7",
+    "office_name": "Office 42",
+}
+
+
+def explain(conn, sql):
+    from sqlalchemy import text
+
+    if conn.dialect.name == "postgresql":
+        rows = conn.execute(text("EXPLAIN ANALYZE " + sql), PARAMS).all()
+        return [row[0] for row in rows]
+    rows = conn.execute(text("EXPLAIN QUERY PLAN " + sql), PARAMS).all()
+    return [row[-1] for row in rows]
+
+
+def timed(conn, sql, repeat):
+    from sqlalchemy import text
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        conn.execute(text(sql), PARAMS).all()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def report(conn, repeat):
+    results = {}
+    for label, sql in HOT_QUERIES:
+        results[label] = (explain(conn, sql), timed(conn, sql, repeat))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--database-url")
+    args = parser.parse_args(argv)
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    from main import create_app
+    from database import db
+    from benchmarks.seed import seed
+
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        indexes = [index for table in db.metadata.sorted_tables for index in table.indexes]
+
+        with db.engine.begin() as conn:
+            for index in indexes:
+                index.drop(conn)
+
+        seed(args.clients)
+
+        with db.engine.connect() as conn:
+            before = report(conn, args.repeat)
+
+        with db.engine.begin() as conn:
+            for index in indexes:
+                index.create(conn)
+            conn.exec_driver_sql("ANALYZE")
+
+        with db.engine.connect() as conn:
+            after = report(conn, args.repeat)
+
+    print(f"{args.clients} clients, {len(indexes)} indexes, "
+          f"mean of {args.repeat} runs\n")
+    for label, _ in HOT_QUERIES:
+        (plan_before, ms_before), (plan_after, ms_after) = before[label], after[label]
+        print(f"== {label}: {ms_before:.3f} ms -> {ms_after:.3f} ms")
+        print("   before: " + "\n           ".join(plan_before))
+        print("   after:  " + "\n           ".join(plan_after))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
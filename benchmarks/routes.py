@@ -0,0 +1,401 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+
+"""
+Latency and SQL statement counts for every route, at several data sizes
+
+    python -m benchmarks.routes --scales 1000,10000,100000
+
+For each scale the app is built with create_app("testing") on a fresh
+database (in-memory SQLite unless --database-url is given), seeded with
+benchmarks.seed, and every route of the covered blueprints is called a few
+times. The run fails when
+
+    a route of a covered blueprint has no request plan below,
+    a route answers with a status its plan does not expect, or
+    a route issues more SQL statements at a larger scale than at the
+    smallest one, which is how N+1 query patterns show up
+
+Only calls answered with an expected status are compared, a 404 from a
+delete that missed its row says nothing about its statement count.
+"""
+
+BLUEPRINTS = ("client_bp", "location_bp", "admin_bp")
+PASSWORD = "benchmark-password"
+
+# the deletes take clients, meetings and internet records from the top 15
+# ids and offices from the last two buildings, so each call finds its row
+MIN_SCALE = 20
+
+
+def buildings(scale):
+    """
+    Number of buildings seeded for scale clients
+    """
+    return max(3, scale // 50)
+
+
+class Plan:
+    """
+    How to call one (endpoint, method)
+
+    path and body are callables taking (scale, call number) so mutating
+    routes can target a different row on every call
+    """
+
+    def __init__(self, path, body=None, form=None, auth=False, repeat=5,
+                 expect=(200,), stage=0):
+        self.path = path
+        self.body = body
+        self.form = form
+        # send the benchmark user's session token
+        self.auth = auth
+        self.repeat = repeat
+        self.expect = expect
+        # plans run in stage order: reads, writes, deletes, then clear-all
+        self.stage = stage
+
+
+def sale(scale, n, **overrides):
+    payload = {
+        "building_name": f"Building {n % 7 + 1}",
+        "is_fibre_setup": "Yes",
+        "ease_of_access": 3,
+        "more_info_access": "Ground floor reception",
+        "number_offices": 4,
+        "office_name": f"Bench office {n}",
+        "office_floor": 2,
+        "number_staff": 12,
+        "industry": "Health",
+        "more_offices": "clinic",
+        "client_name": f"Bench client {n}",
+        "contact": "0700000000",
+        "client_email": f"bench{n}@example.com",
+        "job": "Manager",
+        "deal_info": "interested in dedicated fibre",
+        "meetingDate": "2025-03-01",
+        "meetingLocation": "On site",
+        "meetingType": "Physical",
+        "meetingRemarks": "wants a quote",
+        "meetingStatus": "Scheduled",
+        "is_connected": "Yes",
+        "isp_name": "Zuku",
+        "connection_type": "Shared",
+        "product": "Fibre",
+        "net_price": "4500",
+        "deal_status": "Pending",
+    }
+    payload.update(overrides)
+    return payload
+
+
+def update(scale, n):
+    return {
+        "category": "client",
+        "client_id": 1,
+        "field": "client_name",
+        "value": f"Renamed {n}",
+        "clientData": {"client": {"client_id": n + 1}},
+    }
+
+
+def build_plans():
+    """
+    Returns {(endpoint, method): Plan}; ids counted from the top of the
+    seeded ranges are reserved for the deletes so reads never miss, and
+    every id stays within the rows seeded at scale
+    """
+    offices = lambda scale: buildings(scale) * 10
+    top = lambda count, n, spread=0: max(1, count - n - spread)
+
+    return {
+        # client_bp
+        ("client_bp.userLogin", "POST"): Plan(
+            lambda s, n: "/", body=lambda s, n: {"user_name": "bench", "password": PASSWORD},
+            repeat=3,
+        ),
+        ("client_bp.get_session", "GET"): Plan(lambda s, n: "/session", auth=True),
+        ("client_bp.addSales", "POST"): Plan(
+            lambda s, n: "/salesdetails", body=sale, expect=(201,), stage=1
+        ),
+        ("client_bp.addSalesBulk", "POST"): Plan(
+            lambda s, n: "/salesdetails/bulk",
+            body=lambda s, n: [sale(s, 1000 + n * 20 + i) for i in range(20)],
+            expect=(201,),
+            stage=1,
+        ),
+        ("client_bp.get_meetings", "GET"): Plan(
+            lambda s, n: "/meetings" if n % 2 else "/meetings?meeting_status=Scheduled"
+            "&from=2024-06-01&to=2024-12-31&sort=-meeting_date"
+        ),
+        ("client_bp.get_clients", "GET"): Plan(
+            lambda s, n: "/clients" if n % 2 else "/clients?deal_status=Pending&building_id=1,2"
+        ),
+        ("client_bp.get_internet", "GET"): Plan(
+            lambda s, n: "/internet" if n % 2 else "/internet?isp_name=Zuku&sort=-timestamp"
+        ),
+        ("client_bp.get_offices", "GET"): Plan(lambda s, n: "/offices"),
+        ("client_bp.update_client_data", "POST"): Plan(
+            lambda s, n: "/update", body=update, stage=1
+        ),
+        ("client_bp.deleteClient", "DELETE"): Plan(
+            lambda s, n: f"/client/{top(s, n)}", stage=2
+        ),
+        ("client_bp.deleteMeeting", "DELETE"): Plan(
+            lambda s, n: f"/meeting/{top(s, n, 10)}", stage=2
+        ),
+        ("client_bp.deleteInternet", "DELETE"): Plan(
+            lambda s, n: f"/internet/{top(s, n, 10)}", stage=2
+        ),
+        ("client_bp.deleteOffice", "DELETE"): Plan(
+            lambda s, n: f"/office/{top(offices(s), n)}", stage=2
+        ),
+        ("client_bp.get_sales", "GET"): Plan(
+            lambda s, n: "/sales?limit=100" if n % 2 else
+            "/sales?limit=100&fields=client.client_id,client.client_name,internet_records"
+        ),
+        ("client_bp.export_sales", "GET"): Plan(
+            lambda s, n: "/sales/export?format=ndjson", repeat=1
+        ),
+        ("client_bp.get_client_data", "GET"): Plan(lambda s, n: f"/sales/{n + 1}"),
+        ("client_bp.get_sales_summary", "GET"): Plan(
+            lambda s, n: f"/sales/summary?after={n * 100}&limit=100&deal_status=Pending"
+        ),
+        ("client_bp.get_revenue_report", "GET"): Plan(
+            lambda s, n: "/reports/revenue" if n % 2 else
+            "/reports/revenue?group_by=isp_name&percentiles=25,50,75,95"
+        ),
+        ("client_bp.get_pipeline_report", "GET"): Plan(
+            lambda s, n: "/reports/pipeline" if n % 2 else
+            "/reports/pipeline?dimension=industry&monthly=true&from=2024-03&to=2024-09"
+        ),
+        ("client_bp.clear_all_data", "DELETE"): Plan(
+            lambda s, n: "/clear-all-data", repeat=1, expect=(202,), stage=3
+        ),
+        ("client_bp.queue_export", "POST"): Plan(
+            lambda s, n: "/sales/export?format=ndjson", repeat=1, expect=(202,)
+        ),
+        # job ids are random, an unknown one still exercises the lookup
+        ("client_bp.get_job_status", "GET"): Plan(
+            lambda s, n: f"/jobs/{n:032x}", expect=(404,)
+        ),
+        ("client_bp.get_job_result", "GET"): Plan(
+            lambda s, n: f"/jobs/{n:032x}/result", expect=(404,)
+        ),
+        ("client_bp.get_complete_client_data", "GET"): Plan(
+            lambda s, n: f"/client/{n + 1}/complete"
+        ),
+        ("client_bp.count_sales", "GET"): Plan(lambda s, n: "/count"),
+        ("client_bp.search", "GET"): Plan(
+            lambda s, n: f"/search?q=clinic+dedicated+fibre&offset={n * 20}"
+        ),
+        ("client_bp.get_autocomplete", "GET"): Plan(
+            lambda s, n: f"/autocomplete?kind={('building', 'office')[n % 2]}&prefix=b"
+        ),
+        ("client_bp.get_changes", "GET"): Plan(
+            lambda s, n: f"/changes?since={n * 2}&limit=50", stage=2
+        ),
+        ("client_bp.get_events", "GET"): Plan(lambda s, n: "/events"),
+        ("client_bp.get_building_name", "GET"): Plan(lambda s, n: "/building_names"),
+        ("client_bp.get_office_name", "GET"): Plan(lambda s, n: "/office_names"),
+        # location_bp
+        ("location_bp.getBuilding", "GET"): Plan(lambda s, n: "/locations/buildings"),
+        ("location_bp.getOffice", "GET"): Plan(
+            lambda s, n: f"/locations/offices/{n % buildings(s) + 1}"
+        ),
+        ("location_bp.getLocationTree", "GET"): Plan(
+            lambda s, n: f"/locations/tree?after={n * 10}&limit=20"
+        ),
+        ("location_bp.getOffices", "GET"): Plan(lambda s, n: "/locations/offices"),
+        ("location_bp.deleteBuilding", "DELETE"): Plan(
+            lambda s, n: f"/locations/building/{top(buildings(s), n)}", repeat=1, stage=2
+        ),
+        ("location_bp.updateBuilding", "PUT"): Plan(
+            lambda s, n: f"/locations/building/{n % buildings(s) + 1}",
+            body=lambda s, n: {"access_information": f"Gate {n}"},
+            stage=1,
+        ),
+        ("location_bp.deleteOffice", "DELETE"): Plan(
+            lambda s, n: f"/locations/office/{top(offices(s), n, 10)}", stage=2
+        ),
+        ("location_bp.updateOffice", "PUT"): Plan(
+            lambda s, n: f"/locations/office/{n + 1}",
+            body=lambda s, n: {"office_floor": n + 1},
+            stage=1,
+        ),
+        ("location_bp.getOfficeNames", "GET"): Plan(lambda s, n: "/locations/offices/names"),
+        # admin_bp
+        ("admin_bp.userLogin", "GET"): Plan(lambda s, n: "/admin"),
+        ("admin_bp.userLogin", "POST"): Plan(
+            lambda s, n: "/admin",
+            form=lambda s, n: {"username": "bench-admin", "password": PASSWORD},
+            repeat=3,
+        ),
+        ("admin_bp.users", "GET"): Plan(lambda s, n: "/users"),
+        ("admin_bp.addUser", "GET"): Plan(lambda s, n: "/add"),
+        ("admin_bp.addUser", "POST"): Plan(
+            lambda s, n: "/add",
+            form=lambda s, n: {
+                "username": f"bench-user-{n}",
+                "email": f"user{n}@example.com",
+                "password": PASSWORD,
+            },
+            repeat=2,
+            expect=(302,),
+            stage=1,
+        ),
+    }
+
+
+def covered_routes(app):
+    routes = set()
+    for rule in app.url_map.iter_rules():
+        blueprint, _, view = rule.endpoint.partition(".")
+        if blueprint not in BLUEPRINTS or view == "static":
+            continue
+        for method in rule.methods - {"HEAD", "OPTIONS"}:
+            routes.add((rule.endpoint, method))
+    return routes
+
+
+def run_scale(app, plans, scale):
+    from database import db
+    from models.adminModel import Admin
+    from models.userModel import User
+    from services.auth import issue_token
+    from services.doc_cache import init_doc_cache
+    from benchmarks.seed import seed
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed(scale, buildings=buildings(scale))
+        # drop_all bypasses the commit hooks, documents cached at the
+        # previous scale would otherwise still look current
+        init_doc_cache(app)
+        user = User(user_name="bench", user_email="bench@example.com")
+        user.set_password(PASSWORD)
+        admin = Admin(admin_name="bench-admin")
+        admin.set_password(PASSWORD)
+        db.session.add_all([user, admin])
+        db.session.commit()
+        bearer = {"Authorization": f"Bearer {issue_token(user)}"}
+        engine = db.engine
+
+    statements = []
+    listener = lambda *a: statements.append(1)
+    db.event.listen(engine, "before_cursor_execute", listener)
+    client = app.test_client()
+    results = {}
+
+    try:
+        for key, plan in sorted(plans.items(), key=lambda item: item[1].stage):
+            endpoint, method = key
+            counts, timings, unexpected = [], [], set()
+            for n in range(plan.repeat):
+                kwargs = {"method": method, "headers": bearer if plan.auth else None}
+                if plan.body:
+                    kwargs["json"] = plan.body(scale, n)
+                if plan.form:
+                    kwargs["data"] = plan.form(scale, n)
+
+                statements.clear()
+                started = time.perf_counter()
+                try:
+                    response = client.open(plan.path(scale, n), **kwargs)
+                    response.get_data()
+                    response.close()
+                    status = response.status_code
+                except Exception:
+                    # TESTING propagates view errors instead of answering 500
+                    status = 500
+                timings.append((time.perf_counter() - started) * 1000)
+                if status in plan.expect:
+                    counts.append(len(statements))
+                else:
+                    unexpected.add(status)
+
+            results[key] = {
+                "statements": max(counts) if counts else None,
+                "median_ms": statistics.median(timings),
+                "max_ms": max(timings),
+                "unexpected": sorted(unexpected),
+            }
+    finally:
+        db.event.remove(engine, "before_cursor_execute", listener)
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scales", default="1000,10000",
+                        help="comma separated client counts")
+    parser.add_argument("--database-url",
+                        help="scratch database to use instead of in-memory SQLite")
+    args = parser.parse_args(argv)
+    scales = sorted(int(scale) for scale in args.scales.split(","))
+    if scales[0] < MIN_SCALE:
+        parser.error(f"--scales must be at least {MIN_SCALE} clients")
+
+    if args.database_url:
+        os.environ["TEST_DATABASE_URL"] = args.database_url
+
+    from main import create_app
+
+    app = create_app("testing")
+    app.config["LOGIN_MAX_ATTEMPTS"] = 1000
+    # /events only sends its snapshot, the stream would never end otherwise
+    app.config["EVENTS_MAX_DURATION"] = 0
+
+    plans = build_plans()
+    missing = sorted(covered_routes(app) - set(plans))
+    results = {scale: run_scale(app, plans, scale) for scale in scales}
+
+    smallest = scales[0]
+    failures = []
+
+    print(f"{'route':<44}" + "".join(f"{scale:>20}" for scale in scales))
+    for key in sorted(plans):
+        endpoint, method = key
+        cells = []
+        for scale in scales:
+            r = results[scale][key]
+            count = "-" if r["statements"] is None else r["statements"]
+            cells.append(f"{count:>4} q {r['median_ms']:>9.2f} ms")
+        print(f"{method + ' ' + endpoint:<44}" + "".join(f"{cell:>20}" for cell in cells))
+
+        base = results[smallest][key]["statements"]
+        for scale in scales[1:]:
+            grown = results[scale][key]["statements"]
+            if base is not None and grown is not None and grown > base:
+                failures.append(
+                    f"{method} {endpoint}: {base} statements at {smallest} clients, "
+                    f"{grown} at {scale}"
+                )
+        for scale in scales:
+            if results[scale][key]["unexpected"]:
+                failures.append(
+                    f"{method} {endpoint}: answered "
+                    f"{results[scale][key]['unexpected']} at {scale} clients, "
+                    f"expected {list(plans[key].expect)}"
+                )
+
+    for endpoint, method in missing:
+        failures.append(f"{method} {endpoint}: no request plan in benchmarks/routes.py")
+
+    if failures:
+        print("\nFAILED")
+        for failure in failures:
+            print("  " + failure)
+        return 1
+
+    print("\nOK: statement counts do not grow with row count")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+import random
+from datetime import date, datetime, timedelta
+from database import db
+from models.clientModel import Client
+from models.internetModel import Internet
+from models.meetingModel import Meeting
+from models.office import BuildingOffice
+from models.buildingModel import Building
+
+"""
+Deterministic data generator shared by the benchmarks
+
+Rows are written with bulk INSERT statements in batches, so seeding 100k
+clients takes seconds instead of going through the unit of work one object
+at a time.
+"""
+
+INDUSTRIES = ["Health", "Retail", "Finance", "Education", "Legal", "Logistics"]
+ISPS = ["Safaricom", "Zuku", "Liquid", "Airtel", "Faiba"]
+MEETING_STATUSES = ["Scheduled", "Completed", "Cancelled"]
+DEAL_STATUSES = ["Pending", "Closed", "Lost", "Ongoing"]
+REMARKS = [
+    "wants dedicated fibre",
+    "happy with current provider",
+    "asked for a quote on shared internet",
+    "clinic needs redundant link",
+    "follow up after budget approval",
+]
+
+
+def _batched(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _insert(model, rows, batch_size):
+    for batch in _batched(rows, batch_size):
+        db.session.execute(db.insert(model), batch)
+
+
+def seed(clients, buildings=None, offices_per_building=10, seed_value=42,
+         batch_size=5000):
+    """
+    Seeds the current app's database
+
+    clients: number of clients, each with one meeting and one internet record
+    buildings: number of buildings, defaults to one per 50 clients
+    offices_per_building: offices created in every building
+    """
+    rng = random.Random(seed_value)
+    buildings = buildings or max(1, clients // 50)
+    start = date(2024, 1, 1)
+
+    _insert(Building, [
+        {
+            "building_id": b,
+            "building_name": f"Building {b}",
+            "is_fibre_setup": rng.choice(["Yes", "No"]),
+            "ease_of_access": rng.randint(1, 5),
+            "access_information": f"Reception on floor {rng.randint(1, 12)}",
+            "number_offices": offices_per_building,
+        }
+        for b in range(1, buildings + 1)
+    ], batch_size)
+
+    offices = buildings * offices_per_building
+    _insert(BuildingOffice, [
+        {
+            "office_id": o,
+            "office_name": f"Office {o}",
+            "office_floor": rng.randint(1, 12),
+            "staff_number": rng.randint(2, 200),
+            "industry_category": rng.choice(INDUSTRIES),
+            "more_data_on_office": rng.choice(REMARKS),
+            "building_id": (o - 1) // offices_per_building + 1,
+        }
+        for o in range(1, offices + 1)
+    ], batch_size)
+
+    client_rows = []
+    for c in range(1, clients + 1):
+        office_id = rng.randint(1, offices)
+        client_rows.append({
+            "client_id": c,
+            "client_name": f"Client {c}",
+            "client_contact": f"07{c:08d}",
+            "client_email": f"client{c}@example.com",
+            "job_title": rng.choice(["CEO", "IT Manager", "Office Admin"]),
+            "deal_information": rng.choice(REMARKS),
+            "timestamp": datetime(2024, 1, 1) + timedelta(minutes=c),
+            "building_id": (office_id - 1) // offices_per_building + 1,
+            "office_id": office_id,
+        })
+    _insert(Client, client_rows, batch_size)
+
+    _insert(Meeting, [
+        {
+            "meeting_id": c,
+            "meeting_date": start + timedelta(days=rng.randint(0, 540)),
+            "meeting_location": "On site",
+            "meeting_remarks": rng.choice(REMARKS),
+            "meetingtype": rng.choice(["Physical", "Virtual"]),
+            "meeting_status": rng.choice(MEETING_STATUSES),
+            "client_id": c,
+        }
+        for c in range(1, clients + 1)
+    ], batch_size)
+
+    prices = [rng.randrange(2000, 60000, 500) for _ in range(clients)]
+    _insert(Internet, [
+        {
+            "internet_id": c,
+            "is_isp_connected": "Yes",
+            "isp_name": rng.choice(ISPS),
+            "internet_connection_type": rng.choice(["Dedicated", "Shared"]),
+            "service_provided": rng.choice(["Fibre", "Wireless"]),
+            # bulk inserts skip the ORM listener writing the amount
+            "isp_price": str(prices[c - 1]),
+            "isp_price_amount": prices[c - 1],
+            "deal_status": rng.choice(DEAL_STATUSES),
+            "client_id": c,
+            "timestamp": datetime(2024, 1, 1) + timedelta(days=rng.randint(0, 540)),
+        }
+        for c in range(1, clients + 1)
+    ], batch_size)
+
+    if db.session.get_bind().dialect.name == "postgresql":
+        # ids were inserted explicitly, move the sequences past them
+        for model in (Building, BuildingOffice, Client, Meeting, Internet):
+            key = model.__mapper__.primary_key[0]
+            db.session.execute(db.text(
+                f"SELECT setval(pg_get_serial_sequence('{model.__tablename__}', "
+                f"'{key.name}'), (SELECT coalesce(max({key.name}), 1) "
+                f"FROM {model.__tablename__}))"
+            ))
+
+    db.session.commit()
@@ -0,0 +1,90 @@
+import argparse
+import os
+import sys
+import time
+
+"""
+Per-row CPU cost of the list endpoints' read path
+
+    python -m benchmarks.serialization --clients 20000
+
+For every model it compares loading full ORM instances and calling
+to_dict() against the column-projected fast path, then compares Flask's
+default JSON encoder with the orjson provider on the resulting rows.
+"""
+
+
+def per_row_us(fn, rows, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        fn()
+        best = min(best, time.process_time() - started)
+    return best / rows * 1_000_000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("TEST_DATABASE_URL", "sqlite://")
+
+    from flask.json.provider import DefaultJSONProvider
+    from main import create_app
+    from database import db
+    from models.clientModel import Client
+    from models.internetModel import Internet
+    from models.meetingModel import Meeting
+    from models.office import BuildingOffice
+    from models.buildingModel import Building
+    from services.json_provider import OrjsonProvider, orjson
+    from services.projection import fetch_dicts, select_model
+    from benchmarks.seed import seed
+
+    app = create_app("testing")
+    with app.test_request_context():
+        seed(args.clients)
+
+        print(f"{args.clients} clients, best of {args.repeat} runs, CPU µs per row\n")
+        print(f"{'model':<16}{'rows':>8}{'orm+to_dict':>14}{'projection':>12}{'speedup':>9}")
+
+        for model in (Client, Meeting, Internet, BuildingOffice, Building):
+            key = model.__mapper__.primary_key[0]
+            rows = db.session.execute(db.select(db.func.count(key))).scalar()
+
+            def orm():
+                result = db.session.execute(db.select(model).order_by(key)).scalars()
+                [obj.to_dict() for obj in result]
+                db.session.expunge_all()
+
+            def projected():
+                fetch_dicts(select_model(model).order_by(key))
+
+            orm_us = per_row_us(orm, rows, args.repeat)
+            projected_us = per_row_us(projected, rows, args.repeat)
+            print(f"{model.__name__:<16}{rows:>8}{orm_us:>14.2f}{projected_us:>12.2f}"
+                  f"{orm_us / projected_us:>8.1f}x")
+
+        payload = {"success": True, "clients": fetch_dicts(select_model(Client))}
+        default = DefaultJSONProvider(app)
+        encoders = [("flask default", default)]
+        if orjson is not None:
+            encoders.append(("orjson", OrjsonProvider(app)))
+        else:
+            print("\norjson is not installed, install the 'fast' extra to compare")
+
+        print(f"\n{'json encoder':<16}{'µs per row':>12}")
+        for label, provider in encoders:
+            us = per_row_us(
+                lambda: provider.dumps(payload, separators=(",", ":")),
+                len(payload["clients"]),
+                args.repeat,
+            )
+            print(f"{label:<16}{us:>12.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,219 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # this loads environmental variables from .env
 load_dotenv()
 
+
+def _env_flag(name, default):
+    return os.environ.get(name, str(default)).lower() in ("1", "true", "yes", "on")
+
+
+def engine_options(uri, pool_size, max_overflow, pool_recycle, pre_ping,
+                   statement_timeout_ms):
+    """
+    Builds SQLALCHEMY_ENGINE_OPTIONS for a database url
+
+    Every value can be overridden through the DB_* environment variables.
+    SQLite keeps Flask-SQLAlchemy's defaults since it has no server side pool.
+    """
+    if not uri or uri.startswith("sqlite"):
+        return {}
+
+    options = {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", pool_size)),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", max_overflow)),
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", pool_recycle)),
+        "pool_pre_ping": _env_flag("DB_POOL_PRE_PING", pre_ping),
+        "pool_timeout": int(os.environ.get("DB_POOL_TIMEOUT", 10)),
+    }
+
+    timeout = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", statement_timeout_ms))
+    if timeout and uri.startswith("postgres"):
+        # server side limit, a runaway query is cancelled instead of holding
+        # its connection until the client gives up
+        options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+
+    return options
+
+
 class Config:
     """
     Contains configurations for main.py file
     Configurations include: database connection string,
-                            secret key and track modifications
+                            secret key and track modifications,
+                            engine and connection pool options
     """
 
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL")
     SECRET_KEY = os.environ.get('SECRET_KEY')
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # page sizes for keyset paginated endpoints such as /sales
+    SALES_PAGE_SIZE = int(os.environ.get("SALES_PAGE_SIZE", 100))
+    SALES_MAX_PAGE_SIZE = int(os.environ.get("SALES_MAX_PAGE_SIZE", 1000))
+    # buildings per page of /locations/tree
+    TREE_PAGE_SIZE = int(os.environ.get("TREE_PAGE_SIZE", 50))
+    TREE_MAX_PAGE_SIZE = int(os.environ.get("TREE_MAX_PAGE_SIZE", 500))
+
+    # number of rows fetched per round trip by the streaming /sales/export
+    EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", 1000))
+
+    # seconds the /count counters are served from memory between commits
+    COUNT_CACHE_TTL = float(os.environ.get("COUNT_CACHE_TTL", 5))
+
+    # largest batch accepted by /salesdetails/bulk
+    BULK_MAX_ITEMS = int(os.environ.get("BULK_MAX_ITEMS", 1000))
+
+    # /search page size when ?limit is not given, and its upper bound
+    SEARCH_PAGE_SIZE = int(os.environ.get("SEARCH_PAGE_SIZE", 20))
+    SEARCH_MAX_PAGE_SIZE = int(os.environ.get("SEARCH_MAX_PAGE_SIZE", 100))
+
+    # /autocomplete: matches returned by default and at most, and seconds a
+    # worker's name index is trusted before it is reloaded to pick up other
+    # workers' commits
+    AUTOCOMPLETE_LIMIT = int(os.environ.get("AUTOCOMPLETE_LIMIT", 10))
+    AUTOCOMPLETE_MAX_LIMIT = int(os.environ.get("AUTOCOMPLETE_MAX_LIMIT", 50))
+    AUTOCOMPLETE_MAX_AGE = float(os.environ.get("AUTOCOMPLETE_MAX_AGE", 60))
+
+    # per-client document cache behind /sales/<id> and /client/<id>/complete,
+    # see services/doc_cache.py; backend is lru, shared or none
+    CLIENT_CACHE_BACKEND = os.environ.get("CLIENT_CACHE_BACKEND", "lru")
+    CLIENT_CACHE_URL = os.environ.get("CLIENT_CACHE_URL")
+    CLIENT_CACHE_MAX_ENTRIES = int(os.environ.get("CLIENT_CACHE_MAX_ENTRIES", 10000))
+    CLIENT_CACHE_MAX_BYTES = int(os.environ.get("CLIENT_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    CLIENT_CACHE_TTL = float(os.environ.get("CLIENT_CACHE_TTL", 300))
+
+    # /changes page size when ?limit is not given, and its upper bound
+    CHANGES_PAGE_SIZE = int(os.environ.get("CHANGES_PAGE_SIZE", 500))
+    CHANGES_MAX_PAGE_SIZE = int(os.environ.get("CHANGES_MAX_PAGE_SIZE", 5000))
+    # seconds of change log kept by 'flask compact-changes', and the age after
+    # which entries superseded by a newer one for the same row are dropped
+    CHANGE_LOG_RETENTION = float(os.environ.get("CHANGE_LOG_RETENTION", 7 * 24 * 60 * 60))
+    CHANGE_LOG_COMPACT_AFTER = float(os.environ.get("CHANGE_LOG_COMPACT_AFTER", 60 * 60))
+
+    # /events: messages queued per listener before it is told to reload,
+    # listeners per worker, seconds between heartbeats and before a stream
+    # is closed for the browser to reconnect
+    EVENTS_QUEUE_SIZE = int(os.environ.get("EVENTS_QUEUE_SIZE", 100))
+    EVENTS_MAX_SUBSCRIBERS = int(os.environ.get("EVENTS_MAX_SUBSCRIBERS", 500))
+    EVENTS_HEARTBEAT = float(os.environ.get("EVENTS_HEARTBEAT", 15))
+    EVENTS_MAX_DURATION = float(os.environ.get("EVENTS_MAX_DURATION", 30 * 60))
+
+    # background jobs: pool threads per worker (0 runs jobs inside the
+    # request), jobs queued or running per worker, seconds between progress
+    # writes and where result files such as exports are kept
+    JOBS_MAX_WORKERS = int(os.environ.get("JOBS_MAX_WORKERS", 2))
+    JOBS_MAX_PENDING = int(os.environ.get("JOBS_MAX_PENDING", 16))
+    JOBS_PROGRESS_INTERVAL = float(os.environ.get("JOBS_PROGRESS_INTERVAL", 1))
+    JOBS_RESULT_DIR = os.environ.get(
+        "JOBS_RESULT_DIR", os.path.join(tempfile.gettempdir(), "sales-jobs")
+    )
+    # seconds finished jobs and their result files are kept, see 'flask purge-jobs'
+    JOBS_RETENTION = float(os.environ.get("JOBS_RETENTION", 7 * 24 * 60 * 60))
+
+    # password hashing pool: running threads, extra queued checks and
+    # seconds a login waits for its check before giving up
+    PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_QUEUE = int(os.environ.get("PASSWORD_HASH_QUEUE", 8))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get("PASSWORD_HASH_TIMEOUT", 5))
+
+    # login attempts allowed per username within the window (seconds)
+    LOGIN_MAX_ATTEMPTS = int(os.environ.get("LOGIN_MAX_ATTEMPTS", 5))
+    LOGIN_WINDOW_SECONDS = int(os.environ.get("LOGIN_WINDOW_SECONDS", 300))
+
+    # lifetime of the signed tokens returned by login, in seconds
+    SESSION_TOKEN_TTL = int(os.environ.get("SESSION_TOKEN_TTL", 12 * 60 * 60))
+
+    # structured logging: level and the share of DEBUG records that are kept
+    LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+    LOG_DEBUG_SAMPLE_RATE = float(os.environ.get("LOG_DEBUG_SAMPLE_RATE", 0.1))
+
+    # adds a Server-Timing header with latency, DB time and query count
+    SERVER_TIMING = _env_flag("SERVER_TIMING", False)
+
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(
+        SQLALCHEMY_DATABASE_URI,
+        pool_size=5,
+        max_overflow=10,
+        pool_recycle=1800,
+        pre_ping=True,
+        statement_timeout_ms=0,
+    )
+
+
+class DevelopmentConfig(Config):
+    """
+    Local development: debug mode and a small pool
+    """
+
+    DEBUG = True
+    SERVER_TIMING = True
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(
+        Config.SQLALCHEMY_DATABASE_URI,
+        pool_size=2,
+        max_overflow=2,
+        pool_recycle=1800,
+        pre_ping=True,
+        statement_timeout_ms=0,
+    )
+
+
+class ProductionConfig(Config):
+    """
+    Production: pool sized per worker, stale connections recycled before the
+    server or a proxy drops them and a 30s ceiling on every statement
+    """
+
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(
+        Config.SQLALCHEMY_DATABASE_URI,
+        pool_size=10,
+        max_overflow=5,
+        pool_recycle=900,
+        pre_ping=True,
+        statement_timeout_ms=30000,
+    )
+
+
+class TestingConfig(Config):
+    """
+    Tests and benchmarks: in-memory SQLite unless TEST_DATABASE_URL is set
+    """
+
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = os.environ.get("TEST_DATABASE_URL", "sqlite://")
+    # a fixed key so tokens can be issued without any environment set up
+    SECRET_KEY = os.environ.get("SECRET_KEY", "testing")
+    # jobs finish before the request returns, so results can be asserted on
+    JOBS_MAX_WORKERS = 0
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(
+        SQLALCHEMY_DATABASE_URI,
+        pool_size=5,
+        max_overflow=10,
+        pool_recycle=1800,
+        pre_ping=False,
+        statement_timeout_ms=0,
+    )
+
+
+# profiles selectable through the APP_CONFIG environment variable
+config_by_name = {
+    "default": Config,
+    "development": DevelopmentConfig,
+    "production": ProductionConfig,
+    "testing": TestingConfig,
+}
+
+
+def get_config(name=None):
+    """
+    Returns the config class for name, falling back to APP_CONFIG and then default
+    """
+    name = name or os.environ.get("APP_CONFIG", "default")
+    try:
+        return config_by_name[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown config '{name}', expected one of: {', '.join(config_by_name)}"
+        )
@@ -2,14 +2,30 @@ from flask import Flask
 from database import db
 import click
 from flask_migrate import Migrate
-from config import Config
+from config import get_config
 from models.clientModel import Client
 from models.internetModel import Internet
 from models.userModel import User
 from models.meetingModel import Meeting
 from models.office import BuildingOffice
 from models.buildingModel import Building
+from models.tableVersionModel import TableVersion
+from models.changeLogModel import ChangeLog
+from models.jobModel import Job
+from models.clientSummaryModel import ClientSummary
+from models.pipelineRollupModel import PipelineRollup
 from flask_cors import CORS
+from services.json_provider import init_json
+from services.projection import close_read_connection
+from services.metrics import init_metrics
+from services.logs import configure_logging
+from services.loadtest import loadtest_command
+from services.change_feed import compact_changes_command
+from services.client_summary import rebuild_summary_command
+from services.revenue import backfill_isp_price_command
+from services.pipeline import reconcile_pipeline_command
+from services.doc_cache import init_doc_cache
+from services.jobs import init_jobs, purge_jobs_command
 
 
 
@@ -17,6 +33,7 @@ from flask_cors import CORS
 from views.client_info import client_bp
 from admin.admin import admin_bp
 from views.sales_location import location_bp
+from views.monitoring import monitoring_bp
 
 
 
@@ -27,18 +44,30 @@ and fetching data from the database
 
 migrate = Migrate()
 
-def create_app():
+def create_app(config_name=None):
     """
     Instantiates the flask app
     initializes the database with the app
+
+    config_name selects a profile from config.config_by_name, defaulting to
+    the APP_CONFIG environment variable
     """
     app = Flask(__name__)
-    app.config.from_object(Config)
+    app.config.from_object(get_config(config_name))
+    if not app.config["SECRET_KEY"] and not app.config.get("TESTING"):
+        # session tokens are signed with it, logins would fail with a 500
+        raise RuntimeError("SECRET_KEY is not set, export it before starting the app")
+    init_json(app)
+    configure_logging(app)
+    init_metrics(app)
+    init_doc_cache(app)
     db.init_app(app)
+    app.teardown_appcontext(close_read_connection)
     migrate.init_app(app, db)
     app.register_blueprint(admin_bp)
     app.register_blueprint(client_bp)
     app.register_blueprint(location_bp)
+    app.register_blueprint(monitoring_bp)
     # handles CORS for the app
     CORS(app, resources={
         r"/*": {
@@ -48,9 +77,17 @@ def create_app():
         }
     }, supports_credentials=True)
 
+    app.cli.add_command(loadtest_command)
+    app.cli.add_command(compact_changes_command)
+    app.cli.add_command(rebuild_summary_command)
+    app.cli.add_command(backfill_isp_price_command)
+    app.cli.add_command(reconcile_pipeline_command)
+    app.cli.add_command(purge_jobs_command)
+
     with app.app_context():
         db.create_all()
         click.echo("Database tables created")
+        init_jobs(app)
     
     return app
 
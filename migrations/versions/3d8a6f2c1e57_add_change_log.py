@@ -0,0 +1,39 @@
+"""Add change_log behind the /changes sync feed
+
+Revision ID: 3d8a6f2c1e57
+Revises: b7d24e61c0f3
+Create Date: 2026-10-18 14:52:37.604119
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3d8a6f2c1e57'
+down_revision = 'b7d24e61c0f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('change_log',
+    sa.Column('change_id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+    sa.Column('entity', sa.String(length=32), nullable=True),
+    sa.Column('entity_id', sa.Integer(), nullable=True),
+    sa.Column('op', sa.String(length=8), nullable=False),
+    sa.Column('row', sa.JSON(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('change_id')
+    )
+    with op.batch_alter_table('change_log', schema=None) as batch_op:
+        batch_op.create_index('ix_change_log_entity', ['entity', 'entity_id', 'change_id'], unique=False)
+        batch_op.create_index('ix_change_log_timestamp', ['timestamp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('change_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_change_log_timestamp')
+        batch_op.drop_index('ix_change_log_entity')
+
+    op.drop_table('change_log')
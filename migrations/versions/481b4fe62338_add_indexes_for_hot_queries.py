@@ -0,0 +1,57 @@
+"""Add indexes on foreign keys, name lookups and /count predicates
+
+Revision ID: 481b4fe62338
+Revises: bd9e97941cde
+Create Date: 2026-10-18 09:12:37.104512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '481b4fe62338'
+down_revision = 'bd9e97941cde'
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns, partial index predicate)
+INDEXES = [
+    ('ix_client_building_id', 'client', ['building_id'], None),
+    ('ix_client_office_id', 'client', ['office_id'], None),
+    ('ix_building_building_name', 'building', ['building_name'], None),
+    ('ix_buildingoffice_office_name', 'buildingoffice', ['office_name'], None),
+    ('ix_buildingoffice_building_id', 'buildingoffice', ['building_id'], None),
+    ('ix_meeting_client_id_meeting_date', 'meeting', ['client_id', 'meeting_date'], None),
+    ('ix_meeting_scheduled', 'meeting', ['meeting_status'], "meeting_status = 'Scheduled'"),
+    ('ix_internet_client_id_timestamp', 'internet', ['client_id', 'timestamp'], None),
+    ('ix_internet_pending', 'internet', ['deal_status'], "deal_status = 'Pending'"),
+]
+
+
+def upgrade():
+    # CONCURRENTLY cannot run inside a transaction, so the indexes are built
+    # in autocommit mode and writes to the tables are not blocked meanwhile
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+                sqlite_where=sa.text(where) if where else None,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                if_exists=True,
+                postgresql_concurrently=True,
+            )
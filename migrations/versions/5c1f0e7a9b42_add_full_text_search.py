@@ -0,0 +1,85 @@
+"""Add full-text search columns (Postgres) or FTS5 tables (SQLite)
+
+Revision ID: 5c1f0e7a9b42
+Revises: 9e933bc52dd9
+Create Date: 2026-10-18 13:02:44.590113
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1f0e7a9b42'
+down_revision = '9e933bc52dd9'
+branch_labels = None
+depends_on = None
+
+
+# (table, primary key, [(column, weight)])
+SEARCHED = [
+    ('client', 'client_id', [('client_name', 'A'), ('deal_information', 'B')]),
+    ('buildingoffice', 'office_id', [('office_name', 'A'), ('more_data_on_office', 'B')]),
+    ('meeting', 'meeting_id', [('meeting_remarks', 'B')]),
+    ('building', 'building_id', [('access_information', 'C')]),
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for table, _, fields in SEARCHED:
+            vector = ' || '.join(
+                f"setweight(to_tsvector('english', coalesce({column}, '')), '{weight}')"
+                for column, weight in fields
+            )
+            op.execute(
+                f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector '
+                f'GENERATED ALWAYS AS ({vector}) STORED'
+            )
+        # the GIN indexes are built without blocking writes, see 481b4fe62338
+        with op.get_context().autocommit_block():
+            for table, _, _ in SEARCHED:
+                op.execute(
+                    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_search_vector '
+                    f'ON {table} USING gin (search_vector)'
+                )
+        return
+
+    for table, key, fields in SEARCHED:
+        fts = f'{table}_fts'
+        columns = ', '.join(column for column, _ in fields)
+        new = ', '.join(f'new.{column}' for column, _ in fields)
+        old = ', '.join(f'old.{column}' for column, _ in fields)
+        op.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, "
+            f"content='{table}', content_rowid='{key}', tokenize='porter unicode61')"
+        )
+        op.execute(
+            f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN '
+            f'INSERT INTO {fts}(rowid, {columns}) VALUES (new.{key}, {new}); END'
+        )
+        op.execute(
+            f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN '
+            f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.{key}, {old}); END"
+        )
+        op.execute(
+            f'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columns} ON {table} BEGIN '
+            f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.{key}, {old}); "
+            f'INSERT INTO {fts}(rowid, {columns}) VALUES (new.{key}, {new}); END'
+        )
+        # index the rows that already exist
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for table, _, _ in reversed(SEARCHED):
+                op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS ix_{table}_search_vector')
+        for table, _, _ in reversed(SEARCHED):
+            op.execute(f'ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector')
+        return
+
+    for table, _, _ in reversed(SEARCHED):
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(f'DROP TRIGGER IF EXISTS {table}_fts_{suffix}')
+        op.execute(f'DROP TABLE IF EXISTS {table}_fts')
@@ -0,0 +1,30 @@
+"""Add numeric internet.isp_price_amount
+
+Revision ID: 6e1a3c8f0d24
+Revises: c2e9a47d5b18
+Create Date: 2026-10-18 18:05:12.417309
+
+The column is added empty and nullable, which needs no table rewrite;
+existing prices are converted afterwards in small batches with
+'flask backfill-isp-price' so no long lock is held on internet.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e1a3c8f0d24'
+down_revision = 'c2e9a47d5b18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('internet', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('isp_price_amount', sa.Numeric(precision=12, scale=2), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('internet', schema=None) as batch_op:
+        batch_op.drop_column('isp_price_amount')
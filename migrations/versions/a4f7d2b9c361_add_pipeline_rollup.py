@@ -0,0 +1,35 @@
+"""Add pipeline_rollup table
+
+Revision ID: a4f7d2b9c361
+Revises: 6e1a3c8f0d24
+Create Date: 2026-10-18 18:42:37.208115
+
+The table is created empty; fill it with 'flask reconcile-pipeline'
+once 'flask backfill-isp-price' has run, so the amounts are complete.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4f7d2b9c361'
+down_revision = '6e1a3c8f0d24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('pipeline_rollup',
+    sa.Column('dimension', sa.String(length=16), nullable=False),
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('period', sa.String(length=7), nullable=False),
+    sa.Column('deal_status', sa.String(), nullable=False),
+    sa.Column('records', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.PrimaryKeyConstraint('dimension', 'key', 'period', 'deal_status')
+    )
+
+
+def downgrade():
+    op.drop_table('pipeline_rollup')
@@ -0,0 +1,45 @@
+"""Add indexes for the list endpoint filters
+
+Revision ID: b7d24e61c0f3
+Revises: 5c1f0e7a9b42
+Create Date: 2026-10-18 13:48:10.221907
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d24e61c0f3'
+down_revision = '5c1f0e7a9b42'
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns)
+INDEXES = [
+    ('ix_meeting_meeting_date', 'meeting', ['meeting_date']),
+    ('ix_internet_isp_name', 'internet', ['isp_name']),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                if_exists=True,
+                postgresql_concurrently=True,
+            )
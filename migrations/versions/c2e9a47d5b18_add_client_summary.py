@@ -0,0 +1,78 @@
+"""Add client_summary read model
+
+Revision ID: c2e9a47d5b18
+Revises: 8f4b2d9e6a13
+Create Date: 2026-10-18 17:20:44.930512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2e9a47d5b18'
+down_revision = '8f4b2d9e6a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('client_summary',
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('client_name', sa.String(), nullable=True),
+    sa.Column('client_contact', sa.String(), nullable=True),
+    sa.Column('client_email', sa.String(), nullable=True),
+    sa.Column('client_job_title', sa.String(), nullable=True),
+    sa.Column('client_deal_information', sa.Text(), nullable=True),
+    sa.Column('client_timestamp', sa.DateTime(), nullable=True),
+    sa.Column('building_id', sa.Integer(), nullable=True),
+    sa.Column('office_id', sa.Integer(), nullable=True),
+    sa.Column('building_name', sa.String(), nullable=True),
+    sa.Column('building_is_fibre_setup', sa.String(), nullable=True),
+    sa.Column('building_ease_of_access', sa.Integer(), nullable=True),
+    sa.Column('building_access_information', sa.String(), nullable=True),
+    sa.Column('building_number_offices', sa.Integer(), nullable=True),
+    sa.Column('office_name', sa.String(), nullable=True),
+    sa.Column('office_staff_number', sa.Integer(), nullable=True),
+    sa.Column('office_industry_category', sa.String(), nullable=True),
+    sa.Column('office_floor', sa.Integer(), nullable=True),
+    sa.Column('office_more_data_on_office', sa.Text(), nullable=True),
+    sa.Column('office_building_id', sa.Integer(), nullable=True),
+    sa.Column('meeting_id', sa.Integer(), nullable=True),
+    sa.Column('meeting_date', sa.Date(), nullable=True),
+    sa.Column('meeting_location', sa.String(), nullable=True),
+    sa.Column('meeting_remarks', sa.Text(), nullable=True),
+    sa.Column('meetingtype', sa.String(), nullable=True),
+    sa.Column('meeting_status', sa.String(), nullable=True),
+    sa.Column('internet_id', sa.Integer(), nullable=True),
+    sa.Column('internet_is_isp_connected', sa.String(), nullable=True),
+    sa.Column('internet_isp_name', sa.String(), nullable=True),
+    sa.Column('internet_connection_type', sa.String(), nullable=True),
+    sa.Column('internet_service_provided', sa.String(), nullable=True),
+    sa.Column('internet_isp_price', sa.String(), nullable=True),
+    sa.Column('internet_deal_status', sa.String(), nullable=True),
+    sa.Column('internet_timestamp', sa.DateTime(), nullable=True),
+    sa.Column('total_meetings', sa.Integer(), nullable=False),
+    sa.Column('total_internet_records', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('client_id')
+    )
+    with op.batch_alter_table('client_summary', schema=None) as batch_op:
+        batch_op.create_index('ix_client_summary_building_id', ['building_id'], unique=False)
+        batch_op.create_index('ix_client_summary_office_id', ['office_id'], unique=False)
+        batch_op.create_index('ix_client_summary_internet_deal_status', ['internet_deal_status'], unique=False)
+
+    # fill it for the existing clients, as 'flask rebuild-summary' does
+    from models.clientSummaryModel import ClientSummary
+    from services.client_summary import _source_select
+
+    names, stmt = _source_select()
+    op.get_bind().execute(ClientSummary.__table__.insert().from_select(names, stmt))
+
+
+def downgrade():
+    with op.batch_alter_table('client_summary', schema=None) as batch_op:
+        batch_op.drop_index('ix_client_summary_internet_deal_status')
+        batch_op.drop_index('ix_client_summary_office_id')
+        batch_op.drop_index('ix_client_summary_building_id')
+
+    op.drop_table('client_summary')
@@ -8,7 +8,7 @@ class Building(db.Model):
     __tablename__ = 'building'
 
     building_id = db.Column(db.Integer, primary_key=True, nullable=False)
-    building_name = db.Column(db.String, nullable=False)
+    building_name = db.Column(db.String, nullable=False, index=True)
     is_fibre_setup = db.Column(db.String, nullable=False)
     ease_of_access = db.Column(db.Integer, nullable=False)
     access_information = db.Column(db.String, nullable=False)
@@ -21,6 +21,16 @@ class Building(db.Model):
 
         return f'Building: {self.building_name}'
     
+    # keys returned by to_dict
+    serialized_fields = (
+        'building_id',
+        'building_name',
+        'is_fibre_setup',
+        'ease_of_access',
+        'access_information',
+        'number_offices',
+    )
+
     def to_dict(self):
         return {
             'building_id': self.building_id,
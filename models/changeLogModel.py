@@ -0,0 +1,53 @@
+from datetime import datetime
+from database import db
+
+
+class ChangeLog(db.Model):
+    """
+    Append-only log of committed writes to the sales tables, read by /changes
+    change_id: position in the log, the cursor handed to clients
+    entity: table that changed
+    entity_id: primary key of the changed row, NULL when a bulk statement
+               changed rows that are not known individually
+    op: insert, update or delete; "expired" marks the retention horizon
+    row: row image after an insert or update, NULL for deletes
+    timestamp: when the change was committed
+    """
+
+    __tablename__ = 'change_log'
+    __table_args__ = (
+        # compaction looks for newer entries of the same row
+        db.Index('ix_change_log_entity', 'entity', 'entity_id', 'change_id'),
+        db.Index('ix_change_log_timestamp', 'timestamp'),
+    )
+
+    # SQLite only autoincrements INTEGER PRIMARY KEY columns
+    change_id = db.Column(
+        db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True
+    )
+    entity = db.Column(db.String(32))
+    entity_id = db.Column(db.Integer)
+    op = db.Column(db.String(8), nullable=False)
+    row = db.Column(db.JSON)
+    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    def __repr__(self):
+        return f'ChangeLog {self.change_id} {self.op} {self.entity} {self.entity_id}'
+
+    # keys returned by to_dict
+    serialized_fields = (
+        'change_id',
+        'entity',
+        'entity_id',
+        'op',
+        'row',
+    )
+
+    def to_dict(self):
+        return {
+            'change_id': self.change_id,
+            'entity': self.entity,
+            'entity_id': self.entity_id,
+            'op': self.op,
+            'row': self.row,
+        }
@@ -25,8 +25,8 @@ class Client(db.Model):
     job_title = db.Column(db.String, nullable=False)
     deal_information = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.DateTime, default=func.now())
-    building_id = db.Column(db.Integer, db.ForeignKey('building.building_id', ondelete="CASCADE"), nullable=False)
-    office_id = db.Column(db.Integer, db.ForeignKey('buildingoffice.office_id', ondelete="CASCADE"), nullable=False)
+    building_id = db.Column(db.Integer, db.ForeignKey('building.building_id', ondelete="CASCADE"), nullable=False, index=True)
+    office_id = db.Column(db.Integer, db.ForeignKey('buildingoffice.office_id', ondelete="CASCADE"), nullable=False, index=True)
 
     meetings = db.relationship('Meeting', backref='attends', cascade="all, delete-orphan", passive_deletes=True)
     internet = db.relationship('Internet', backref='hasinternet', cascade="all, delete-orphan", passive_deletes=True)
@@ -34,6 +34,18 @@ class Client(db.Model):
     def __repr__(self):
         return f'Client {self.client_name} {self.timestamp}'
     
+    # keys returned by to_dict
+    serialized_fields = (
+        'client_id',
+        'client_name',
+        'client_contact',
+        'client_email',
+        'job_title',
+        'deal_information',
+        'timestamp',
+        'building_id',
+    )
+
     def to_dict(self):
         return {
             'client_id': self.client_id,
@@ -0,0 +1,93 @@
+from database import db
+
+
+class ClientSummary(db.Model):
+    """
+    One flattened row per client: the client with its building, its office,
+    its latest meeting and latest internet record and how many of each it has
+
+    Derived data kept current by services/client_summary.py; columns are
+    named like the export's, the section prefix added where the source
+    column lacks one
+    """
+
+    __tablename__ = 'client_summary'
+    __table_args__ = (
+        db.Index('ix_client_summary_building_id', 'building_id'),
+        db.Index('ix_client_summary_office_id', 'office_id'),
+        db.Index('ix_client_summary_internet_deal_status', 'internet_deal_status'),
+    )
+
+    # client
+    client_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    client_name = db.Column(db.String)
+    client_contact = db.Column(db.String)
+    client_email = db.Column(db.String)
+    client_job_title = db.Column(db.String)
+    client_deal_information = db.Column(db.Text)
+    client_timestamp = db.Column(db.DateTime)
+    building_id = db.Column(db.Integer)
+    office_id = db.Column(db.Integer)
+
+    # building
+    building_name = db.Column(db.String)
+    building_is_fibre_setup = db.Column(db.String)
+    building_ease_of_access = db.Column(db.Integer)
+    building_access_information = db.Column(db.String)
+    building_number_offices = db.Column(db.Integer)
+
+    # office
+    office_name = db.Column(db.String)
+    office_staff_number = db.Column(db.Integer)
+    office_industry_category = db.Column(db.String)
+    office_floor = db.Column(db.Integer)
+    office_more_data_on_office = db.Column(db.Text)
+    office_building_id = db.Column(db.Integer)
+
+    # latest meeting, by meeting_date then meeting_id
+    meeting_id = db.Column(db.Integer)
+    meeting_date = db.Column(db.Date)
+    meeting_location = db.Column(db.String)
+    meeting_remarks = db.Column(db.Text)
+    meetingtype = db.Column(db.String)
+    meeting_status = db.Column(db.String)
+
+    # latest internet record, by timestamp then internet_id
+    internet_id = db.Column(db.Integer)
+    internet_is_isp_connected = db.Column(db.String)
+    internet_isp_name = db.Column(db.String)
+    internet_connection_type = db.Column(db.String)
+    internet_service_provided = db.Column(db.String)
+    internet_isp_price = db.Column(db.String)
+    internet_deal_status = db.Column(db.String)
+    internet_timestamp = db.Column(db.DateTime)
+
+    total_meetings = db.Column(db.Integer, nullable=False, default=0)
+    total_internet_records = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'ClientSummary {self.client_id} {self.client_name}'
+
+    # keys returned by to_dict
+    serialized_fields = (
+        'client_id', 'client_name', 'client_contact', 'client_email',
+        'client_job_title', 'client_deal_information', 'client_timestamp',
+        'building_id', 'office_id',
+        'building_name', 'building_is_fibre_setup', 'building_ease_of_access',
+        'building_access_information', 'building_number_offices',
+        'office_name', 'office_staff_number', 'office_industry_category',
+        'office_floor', 'office_more_data_on_office', 'office_building_id',
+        'meeting_id', 'meeting_date', 'meeting_location', 'meeting_remarks',
+        'meetingtype', 'meeting_status',
+        'internet_id', 'internet_is_isp_connected', 'internet_isp_name',
+        'internet_connection_type', 'internet_service_provided',
+        'internet_isp_price', 'internet_deal_status', 'internet_timestamp',
+        'total_meetings', 'total_internet_records',
+    )
+
+    def to_dict(self):
+        values = {field: getattr(self, field) for field in self.serialized_fields}
+        for field in ('client_timestamp', 'meeting_date', 'internet_timestamp'):
+            if values[field] is not None:
+                values[field] = values[field].isoformat()
+        return values
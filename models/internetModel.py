@@ -1,5 +1,6 @@
 from database import db
 from datetime import datetime
+from sqlalchemy import text
 from models.clientModel import Client
 
 class Internet(db.Model):
@@ -9,12 +10,26 @@ class Internet(db.Model):
     isp_name (string): name of the isp the client is currently using
     internt_connection_type (string): the connection type as either dedicated or shared
     service_provided (string): type of service the client receives from the isp
-    isp_price (decimal): amount paid by the client for the service
+    isp_price (string): amount paid by the client for the service, as entered
+    isp_price_amount (decimal): isp_price as a number, NULL when it does not parse
     deal_status (string): the status of the deal as either ongoing, terminated, closed etc
     client_id: relationship between office and client
     """
 
     __tablename__ = 'internet'
+    __table_args__ = (
+        # lookups by client, ordered by time for the latest internet record
+        db.Index('ix_internet_client_id_timestamp', 'client_id', 'timestamp'),
+        # /count only counts pending deals, so only those rows are indexed
+        db.Index(
+            'ix_internet_pending',
+            'deal_status',
+            postgresql_where=text("deal_status = 'Pending'"),
+            sqlite_where=text("deal_status = 'Pending'"),
+        ),
+        # /internet and /clients filters by provider
+        db.Index('ix_internet_isp_name', 'isp_name'),
+    )
     
     internet_id = db.Column(db.Integer, primary_key=True)
     is_isp_connected = db.Column(db.String, nullable=False)
@@ -22,6 +37,8 @@ class Internet(db.Model):
     internet_connection_type = db.Column(db.String, default=None)
     service_provided = db.Column(db.String, default=None)
     isp_price = db.Column(db.String, default=0)
+    # isp_price read as a number, kept in step by services/revenue.py
+    isp_price_amount = db.Column(db.Numeric(12, 2))
     deal_status = db.Column(db.String, default=None)
     client_id = db.Column(db.Integer, db.ForeignKey('client.client_id', ondelete="CASCADE"), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.now)
@@ -29,6 +46,19 @@ class Internet(db.Model):
     def __repr__(self):
         return f'Internet status: \n{self.is_isp_connected} \n{self.timestamp}'
     
+    # keys returned by to_dict
+    serialized_fields = (
+        'internet_id',
+        'is_isp_connected',
+        'isp_name',
+        'internet_connection_type',
+        'service_provided',
+        'isp_price',
+        'deal_status',
+        'client_id',
+        'timestamp',
+    )
+
     def to_dict(self):
         return {
             'internet_id': self.internet_id,
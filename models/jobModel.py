@@ -0,0 +1,68 @@
+from datetime import datetime
+from database import db
+
+
+class Job(db.Model):
+    """
+    Long-running operation executed off the request path, see services/jobs.py
+    job_id: random hex id handed to the client
+    kind: registered job name, such as clear_all
+    status: queued, running, succeeded or failed
+    progress_done / progress_total: units of work done so far and in total,
+                                    total is NULL when it is not known upfront
+    result: JSON outcome of a finished job
+    error: failure message of a failed job
+    owner: host:pid of the worker process running the job
+    """
+
+    __tablename__ = 'job'
+    __table_args__ = (
+        db.Index('ix_job_status', 'status'),
+    )
+
+    job_id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(32), nullable=False)
+    status = db.Column(db.String(16), nullable=False, default="queued")
+    params = db.Column(db.JSON)
+    progress_done = db.Column(db.Integer, nullable=False, default=0)
+    progress_total = db.Column(db.Integer)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    owner = db.Column(db.String(64))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    def __repr__(self):
+        return f'Job {self.job_id} {self.kind} {self.status}'
+
+    # keys returned by to_dict
+    serialized_fields = (
+        'job_id',
+        'kind',
+        'status',
+        'progress_done',
+        'progress_total',
+        'result',
+        'error',
+        'created_at',
+        'started_at',
+        'finished_at',
+        'updated_at',
+    )
+
+    def to_dict(self):
+        return {
+            'job_id': self.job_id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress_done': self.progress_done,
+            'progress_total': self.progress_total,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
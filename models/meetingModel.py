@@ -1,4 +1,5 @@
 from database import db
+from sqlalchemy import text
 
 class Meeting(db.Model):
     """
@@ -6,6 +7,19 @@ class Meeting(db.Model):
     """
 
     __tablename__ = 'meeting'
+    __table_args__ = (
+        # lookups by client, ordered by date for the latest meeting
+        db.Index('ix_meeting_client_id_meeting_date', 'client_id', 'meeting_date'),
+        # /count only counts scheduled meetings, so only those rows are indexed
+        db.Index(
+            'ix_meeting_scheduled',
+            'meeting_status',
+            postgresql_where=text("meeting_status = 'Scheduled'"),
+            sqlite_where=text("meeting_status = 'Scheduled'"),
+        ),
+        # /meetings?from=&to= date range filters
+        db.Index('ix_meeting_meeting_date', 'meeting_date'),
+    )
 
     meeting_id = db.Column(db.Integer, primary_key=True)
     meeting_date = db.Column(db.Date, nullable=False)
@@ -19,6 +33,17 @@ class Meeting(db.Model):
     def __repr__(self):
         return f"Meeting \n{self.meeting_id} \n{self.meeting_date}"
     
+    # keys returned by to_dict
+    serialized_fields = (
+        'meeting_id',
+        'meeting_date',
+        'meeting_location',
+        'meeting_remarks',
+        'meetingtype',
+        'meeting_status',
+        'client_id',
+    )
+
     def to_dict(self):
         return {
             'meeting_id': self.meeting_id,
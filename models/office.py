@@ -8,12 +8,12 @@ class BuildingOffice(db.Model):
     __tablename__ = 'buildingoffice'
 
     office_id = db.Column(db.Integer, primary_key=True, nullable=False)
-    office_name = db.Column(db.String, nullable=False)
+    office_name = db.Column(db.String, nullable=False, index=True)
     office_floor = db.Column(db.Integer, nullable=False)
     staff_number = db.Column(db.Integer, nullable=False)
     industry_category = db.Column(db.String, nullable=False)
     more_data_on_office = db.Column(db.Text, nullable=False)
-    building_id = db.Column(db.Integer, db.ForeignKey('building.building_id', ondelete="CASCADE"))
+    building_id = db.Column(db.Integer, db.ForeignKey('building.building_id', ondelete="CASCADE"), index=True)
     
     clients = db.relationship('Client', backref='office', cascade="all, delete-orphan", passive_deletes=True)
 
@@ -21,6 +21,17 @@ class BuildingOffice(db.Model):
         
         return f'Office {self.office_name}'
     
+    # keys returned by to_dict
+    serialized_fields = (
+        'office_id',
+        'office_name',
+        'staff_number',
+        'industry_category',
+        'office_floor',
+        'more_data_on_office',
+        'building_id',
+    )
+
     def to_dict(self):
         return {
             'office_id': self.office_id,
@@ -0,0 +1,41 @@
+from database import db
+
+
+class PipelineRollup(db.Model):
+    """
+    Internet records counted per dimension value, month and deal status
+    Derived data kept current by services/pipeline.py
+
+    dimension: industry, building, isp or month
+    key: industry_category, building_id or isp_name of the records; empty
+         for the month dimension and for records without a value
+    period: month of the record's timestamp as YYYY-MM, empty when unknown
+    deal_status: deal status of the records, empty when unknown
+    records: number of internet records
+    amount: sum of their isp_price_amount
+    """
+
+    __tablename__ = 'pipeline_rollup'
+
+    dimension = db.Column(db.String(16), primary_key=True)
+    key = db.Column(db.String, primary_key=True)
+    period = db.Column(db.String(7), primary_key=True)
+    deal_status = db.Column(db.String, primary_key=True)
+    records = db.Column(db.Integer, nullable=False, default=0)
+    amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+    def __repr__(self):
+        return f'PipelineRollup {self.dimension} {self.key} {self.period} {self.deal_status}'
+
+    # keys returned by to_dict
+    serialized_fields = (
+        'dimension',
+        'key',
+        'period',
+        'deal_status',
+        'records',
+        'amount',
+    )
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.serialized_fields}
@@ -0,0 +1,17 @@
+from database import db
+
+
+class TableVersion(db.Model):
+    """
+    Version counter per table, bumped by every commit that writes to the table
+    table_name: name of the tracked table
+    version: number of committed transactions that changed the table
+    """
+
+    __tablename__ = 'table_version'
+
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'TableVersion {self.table_name} {self.version}'
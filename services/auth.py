@@ -0,0 +1,198 @@
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from functools import wraps
+from flask import current_app, g, jsonify, request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from werkzeug.security import check_password_hash
+
+"""
+Password verification off the request threads and signed session tokens
+
+check_password_hash is a deliberately slow KDF. Running it on a small,
+bounded pool caps how many CPU cores logins can take at once; when the
+pool and its queue are full the login is refused with 503 instead of
+stalling every worker thread.
+"""
+
+_TOKEN_SALT = "session-token"
+
+
+class LoginBusy(Exception):
+    """
+    Raised when the hashing pool cannot accept another verification
+    """
+
+
+class LoginThrottled(Exception):
+    """
+    Raised when a username made too many attempts in the current window
+
+    retry_after: seconds until the oldest attempt leaves the window
+    """
+
+    def __init__(self, retry_after):
+        super().__init__(f"Too many login attempts, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class _HashPool:
+    """
+    Thread pool with a bounded number of queued and running verifications
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._executor is None:
+                workers = current_app.config["PASSWORD_HASH_WORKERS"]
+                queued = current_app.config["PASSWORD_HASH_QUEUE"]
+                self._slots = threading.BoundedSemaphore(workers + queued)
+                self._executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix="password-hash"
+                )
+
+    def check(self, password_hash, password):
+        """
+        Verifies password against password_hash on the pool
+        """
+        if self._executor is None:
+            self._start()
+        if not self._slots.acquire(blocking=False):
+            raise LoginBusy()
+
+        try:
+            future = self._executor.submit(check_password_hash, password_hash, password)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return future.result(timeout=current_app.config["PASSWORD_HASH_TIMEOUT"])
+        except TimeoutError:
+            raise LoginBusy()
+
+
+class _Throttle:
+    """
+    Sliding window of login attempts per username
+    """
+
+    # attempts between two sweeps of every username's window
+    SWEEP_EVERY = 1000
+
+    def __init__(self):
+        self._attempts = defaultdict(deque)
+        self._lock = threading.Lock()
+        self._since_sweep = 0
+
+    @staticmethod
+    def _trim(attempts, horizon):
+        while attempts and attempts[0] <= horizon:
+            attempts.popleft()
+
+    def _sweep(self, horizon):
+        # usernames tried once and never again, often ones that do not
+        # exist, would otherwise stay in the dict forever
+        for username in list(self._attempts):
+            self._trim(self._attempts[username], horizon)
+            if not self._attempts[username]:
+                del self._attempts[username]
+
+    def hit(self, username):
+        """
+        Records an attempt, raising LoginThrottled when the limit is reached
+        """
+        limit = current_app.config["LOGIN_MAX_ATTEMPTS"]
+        window = current_app.config["LOGIN_WINDOW_SECONDS"]
+        now = time.monotonic()
+
+        with self._lock:
+            self._since_sweep += 1
+            if self._since_sweep >= self.SWEEP_EVERY:
+                self._since_sweep = 0
+                self._sweep(now - window)
+
+            attempts = self._attempts[username]
+            self._trim(attempts, now - window)
+            if len(attempts) >= limit:
+                raise LoginThrottled(int(attempts[0] + window - now) + 1)
+            attempts.append(now)
+
+    def reset(self, username):
+        with self._lock:
+            self._attempts.pop(username, None)
+
+
+_pool = _HashPool()
+_throttle = _Throttle()
+
+
+def verify_login(username, password_hash, password):
+    """
+    Checks a login attempt for username
+
+    password_hash: stored hash of the account, None when it does not exist
+    Raises LoginThrottled or LoginBusy when the attempt cannot be checked
+    """
+    _throttle.hit(username or "")
+    if not password_hash or password is None:
+        return False
+
+    valid = _pool.check(password_hash, password)
+    if valid:
+        _throttle.reset(username)
+    return valid
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config["SECRET_KEY"], salt=_TOKEN_SALT)
+
+
+def issue_token(user):
+    """
+    Returns a signed token carrying the user's id and name
+    """
+    return _serializer().dumps({"user_id": user.user_id, "user_name": user.user_name})
+
+
+def verify_token(token):
+    """
+    Returns the claims of a valid token, None when it is forged or expired
+
+    Only the signature and age are checked, the users table is not read
+    """
+    try:
+        return _serializer().loads(
+            token, max_age=current_app.config["SESSION_TOKEN_TTL"]
+        )
+    except (BadSignature, SignatureExpired):
+        return None
+
+
+def token_required(view):
+    """
+    Rejects requests without a valid 'Authorization: Bearer <token>' header
+
+    The token's claims are available to the view as g.user_claims
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        header = request.headers.get("Authorization", "")
+        scheme, _, token = header.partition(" ")
+        claims = verify_token(token) if scheme.lower() == "bearer" else None
+        if claims is None:
+            return (
+                jsonify({"success": False, "message": "Invalid or expired token"}),
+                401,
+            )
+        g.user_claims = claims
+        return view(*args, **kwargs)
+
+    return wrapper
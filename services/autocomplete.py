@@ -0,0 +1,163 @@
+import threading
+import time
+from bisect import bisect_left, insort
+from flask import current_app
+from database import db
+from models.office import BuildingOffice
+from models.buildingModel import Building
+from services.hooks import on_commit
+from services.projection import read_connection
+
+"""
+In-memory prefix indexes behind /autocomplete
+
+Each kind keeps its names in a list sorted by their case-folded form, so a
+prefix lookup is a bisect followed by a short scan and never reaches the
+database. The list is loaded with one query on first use; afterwards
+commits made by this process patch it in place from the commit hook's
+change records. Bulk statements that do not say which rows they touched
+mark the index stale, and it is also reloaded once it is older than
+AUTOCOMPLETE_MAX_AGE seconds so commits made by other workers show up.
+"""
+
+
+class PrefixIndex:
+    """
+    Sorted (folded name, id, name, extra) entries with prefix lookup
+
+    extra carries whatever the caller wants returned with a match, such as
+    an office's building_id
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._entries = []
+        self._names = {}
+        self._loaded_at = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _fresh(self):
+        if self._loaded_at is None:
+            return False
+        max_age = current_app.config["AUTOCOMPLETE_MAX_AGE"]
+        return time.monotonic() - self._loaded_at < max_age
+
+    def _load(self):
+        generation = self._generation
+        loaded_at = time.monotonic()
+        rows = self._loader()
+        entries = sorted((name.casefold(), id_, name, extra) for id_, name, extra in rows)
+        with self._lock:
+            self._entries = entries
+            self._names = {entry[1]: entry for entry in entries}
+            # a commit landing while the query ran may be missing from it,
+            # serve this copy but load again on the next lookup
+            if generation == self._generation:
+                self._loaded_at = loaded_at
+
+    def lookup(self, prefix, limit):
+        """
+        Returns up to limit (id, name, extra) whose name starts with prefix,
+        ignoring case, in alphabetical order
+        """
+        if not self._fresh():
+            self._load()
+
+        folded = prefix.casefold()
+        matches = []
+        with self._lock:
+            entries = self._entries
+            index = bisect_left(entries, (folded,))
+            while index < len(entries) and len(matches) < limit:
+                if not entries[index][0].startswith(folded):
+                    break
+                matches.append(entries[index][1:])
+                index += 1
+        return matches
+
+    def put(self, id_, name, extra=None):
+        """
+        Adds or renames one entry
+        """
+        with self._lock:
+            self._generation += 1
+            if self._loaded_at is None:
+                return
+            self._remove(id_)
+            if name is not None:
+                entry = (name.casefold(), id_, name, extra)
+                insort(self._entries, entry)
+                self._names[id_] = entry
+
+    def discard(self, id_):
+        with self._lock:
+            self._generation += 1
+            self._remove(id_)
+
+    def _remove(self, id_):
+        entry = self._names.pop(id_, None)
+        if entry is not None:
+            index = bisect_left(self._entries, entry)
+            if index < len(self._entries) and self._entries[index] == entry:
+                del self._entries[index]
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._loaded_at = None
+
+
+def _load_buildings():
+    return read_connection().execute(
+        db.select(Building.building_id, Building.building_name, db.null())
+    ).all()
+
+
+def _load_offices():
+    return read_connection().execute(
+        db.select(BuildingOffice.office_id, BuildingOffice.office_name, BuildingOffice.building_id)
+    ).all()
+
+
+# kind: (index, model, name column, extra column or None)
+INDEXES = {
+    "building": (PrefixIndex(_load_buildings), Building, "building_name", None),
+    "office": (PrefixIndex(_load_offices), BuildingOffice, "office_name", "building_id"),
+}
+
+
+def autocomplete(kind, prefix, limit):
+    """
+    Returns the top matches for prefix as dicts; raises KeyError for an unknown kind
+    """
+    index, _, _, extra_key = INDEXES[kind]
+    matches = []
+    for id_, name, extra in index.lookup(prefix, limit):
+        match = {"id": id_, "name": name}
+        if extra_key:
+            match[extra_key] = extra
+        matches.append(match)
+    return matches
+
+
+@on_commit(Building, BuildingOffice)
+def _apply_changes(changes):
+    for index, model, name_key, extra_key in INDEXES.values():
+        for change in changes:
+            if change.model is not model:
+                continue
+            if change.identity is None:
+                # a bulk statement touched rows we cannot name
+                index.invalidate()
+                break
+            if change.op == "delete":
+                index.discard(change.identity)
+            elif change.op == "insert" or name_key in change.previous or (
+                extra_key and extra_key in change.previous
+            ):
+                values = change.values
+                if name_key not in values or (extra_key and extra_key not in values):
+                    index.invalidate()
+                    break
+                index.put(change.identity, values[name_key], values.get(extra_key))
@@ -0,0 +1,66 @@
+import threading
+import time
+
+"""
+Small in-process caches shared by the read endpoints
+"""
+
+
+class TTLCache:
+    """
+    Thread-safe key/value cache whose entries expire after a fixed number of seconds
+
+    Concurrent misses on the same key are collapsed into a single call of the
+    factory, and a value computed while invalidate() runs is never stored, so
+    a commit cannot be masked by a read that started before it.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._loading = {}
+        self._generation = 0
+
+    def get(self, key):
+        """
+        Returns the cached value or None when it is missing or expired
+        """
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def get_or_set(self, key, factory, ttl):
+        """
+        Returns the cached value for key, calling factory() to fill it on a miss
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            loading = self._loading.setdefault(key, threading.Lock())
+
+        with loading:
+            # another thread may have filled the entry while we waited
+            value = self.get(key)
+            if value is not None:
+                return value
+
+            generation = self._generation
+            value = factory()
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[key] = (time.monotonic() + ttl, value)
+            return value
+
+    def invalidate(self, key=None):
+        """
+        Drops one entry, or every entry when key is None
+        """
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
@@ -0,0 +1,244 @@
+from datetime import date, datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy.orm import aliased
+from database import db
+from models.changeLogModel import ChangeLog
+from models.clientModel import Client
+from models.internetModel import Internet
+from models.meetingModel import Meeting
+from models.office import BuildingOffice
+from models.buildingModel import Building
+from services.hooks import before_commit
+from services.pagination import keyset_page, split_page
+from services.projection import fetch_dicts, read_connection, select_model
+
+"""
+Change log behind /changes, letting clients apply deltas instead of
+reloading /sales after every edit
+
+Every commit touching the sales tables appends one entry per changed row
+to change_log in the same transaction, so the log never disagrees with the
+data; a row written several times in one transaction gets a single entry.
+Inserts and updates carry the row image as to_dict returns it. A bulk
+statement whose rows are unknown is logged with a NULL entity_id, telling
+clients to reload that entity.
+
+On Postgres log writers take a transaction-level advisory lock, so entries
+become visible in change_id order and a reader that has seen change_id N
+can never later find a committed entry below N.
+
+The log is bounded by 'flask compact-changes': entries superseded by a
+newer entry for the same row are dropped once older than
+CHANGE_LOG_COMPACT_AFTER, and everything older than CHANGE_LOG_RETENTION is
+removed, leaving an "expired" entry at the horizon. A cursor behind the
+horizon can no longer be served and the client has to reload.
+"""
+
+TRACKED = (Client, Meeting, Internet, BuildingOffice, Building)
+
+EXPIRED = "expired"
+
+# key of the Postgres advisory lock serializing log writers
+_LOCK_KEY = 0x6368616E6765
+
+# session.info key holding the last change_id of the committing transaction
+_CURSOR_KEY = "change_feed.cursor"
+
+
+class CursorExpired(Exception):
+    """
+    The requested cursor is older than the retained log
+    """
+
+    def __init__(self, horizon):
+        super().__init__(f"cursor is older than the change log horizon {horizon}")
+        self.horizon = horizon
+
+
+def _image(row):
+    return {
+        key: value.isoformat() if isinstance(value, (date, datetime)) else value
+        for key, value in row.items()
+    }
+
+
+def _coalesce(changes):
+    """
+    Folds the changes of one transaction to {(model, identity): op}
+
+    A row inserted and deleted in the same transaction was never visible and
+    is left out; bulk changes keep one entry per model and op
+    """
+    ops = {}
+    for change in changes:
+        if change.identity is None:
+            ops[(change.model, None, change.op)] = change.op
+            continue
+        key = (change.model, change.identity)
+        if key not in ops:
+            ops[key] = change.op
+        elif ops[key] == "insert":
+            ops[key] = None if change.op == "delete" else "insert"
+        elif ops[key] is None:
+            ops[key] = "insert" if change.op == "insert" else None
+        elif ops[key] == "delete" and change.op == "insert":
+            # deleted and written again under the same key
+            ops[key] = "update"
+        else:
+            ops[key] = change.op
+    return ops
+
+
+def _row_images(model, ids):
+    """
+    Reads the rows written by this transaction, on the session's connection
+    """
+    key = model.__mapper__.primary_key[0]
+    stmt = select_model(model).where(key.in_(ids))
+    return {
+        row[key.key]: _image(row)
+        for row in (dict(row) for row in db.session.execute(stmt).mappings())
+    }
+
+
+def commit_cursor():
+    """
+    The last change_id written by the transaction being committed, None
+    when it logged nothing; readable until the next commit of the session
+    """
+    return db.session.info.get(_CURSOR_KEY)
+
+
+@before_commit(*TRACKED)
+def _log_changes(changes):
+    db.session.info[_CURSOR_KEY] = None
+    ops = _coalesce(changes)
+
+    written = {}
+    for key, op in ops.items():
+        if op in ("insert", "update"):
+            written.setdefault(key[0], []).append(key[1])
+    images = {model: _row_images(model, ids) for model, ids in written.items()}
+
+    entries = []
+    for key, op in ops.items():
+        if op is None:
+            continue
+        model, identity = key[0], key[1]
+        row = images.get(model, {}).get(identity) if op != "delete" else None
+        entries.append(
+            {
+                "entity": model.__tablename__,
+                "entity_id": identity,
+                "op": op,
+                "row": row,
+            }
+        )
+    if not entries:
+        return
+
+    if db.session.get_bind().dialect.name == "postgresql":
+        db.session.execute(db.select(db.func.pg_advisory_xact_lock(_LOCK_KEY)))
+    ids = db.session.execute(
+        db.insert(ChangeLog).returning(ChangeLog.change_id), entries
+    ).scalars().all()
+    db.session.info[_CURSOR_KEY] = max(ids)
+
+
+def changes_since(since, limit):
+    """
+    Returns (entries, cursor, has_more) for the log after since
+
+    cursor is the change_id to ask for next; without since, the entries are
+    empty and cursor is the current end of the log, to be taken before the
+    initial load. Raises CursorExpired for cursors behind the horizon.
+    """
+    horizon = db.select(db.func.min(ChangeLog.change_id)).where(
+        ChangeLog.op == EXPIRED
+    ).scalar_subquery()
+    latest = db.select(db.func.max(ChangeLog.change_id)).scalar_subquery()
+    horizon, latest = read_connection().execute(db.select(horizon, latest)).one()
+
+    if since is None:
+        return [], latest or 0, False
+    if horizon is not None and since < horizon:
+        raise CursorExpired(horizon)
+
+    stmt = select_model(ChangeLog).where(ChangeLog.op != EXPIRED)
+    entries, next_after = split_page(
+        fetch_dicts(keyset_page(stmt, ChangeLog.change_id, since, limit)),
+        limit,
+        lambda entry: entry["change_id"],
+    )
+    cursor = entries[-1]["change_id"] if entries else since
+    return entries, cursor, next_after is not None
+
+
+def compact_change_log(retention, compact_after, now=None):
+    """
+    Applies compaction and retention, both given as timedeltas
+
+    Returns {"compacted": n, "expired": n}; the caller commits
+    """
+    now = now or datetime.now()
+    newer = aliased(ChangeLog)
+
+    compacted = db.session.execute(
+        db.delete(ChangeLog)
+        .where(
+            ChangeLog.entity_id.is_not(None),
+            ChangeLog.timestamp < now - compact_after,
+            db.select(newer.change_id)
+            .where(
+                newer.entity == ChangeLog.entity,
+                newer.entity_id == ChangeLog.entity_id,
+                newer.change_id > ChangeLog.change_id,
+            )
+            .exists(),
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    horizon = db.session.execute(
+        db.select(db.func.max(ChangeLog.change_id)).where(
+            ChangeLog.timestamp < now - retention
+        )
+    ).scalar()
+    expired = 0
+    if horizon is not None:
+        expired = db.session.execute(
+            db.delete(ChangeLog)
+            .where(ChangeLog.change_id < horizon)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        # the newest expired entry stays behind as the horizon marker
+        db.session.execute(
+            db.update(ChangeLog)
+            .where(ChangeLog.change_id == horizon)
+            .values(entity=None, entity_id=None, op=EXPIRED, row=None)
+            .execution_options(synchronize_session=False)
+        )
+    return {"compacted": compacted, "expired": expired}
+
+
+@click.command("compact-changes")
+@click.option("--retention", type=float, default=None,
+              help="Seconds of change log to keep; CHANGE_LOG_RETENTION by default.")
+@click.option("--compact-after", type=float, default=None,
+              help="Seconds after which superseded entries are dropped; "
+                   "CHANGE_LOG_COMPACT_AFTER by default.")
+@with_appcontext
+def compact_changes_command(retention, compact_after):
+    """Compact the change log and drop entries past the retention period."""
+    config = current_app.config
+    counts = compact_change_log(
+        timedelta(seconds=retention if retention is not None else config["CHANGE_LOG_RETENTION"]),
+        timedelta(
+            seconds=compact_after if compact_after is not None
+            else config["CHANGE_LOG_COMPACT_AFTER"]
+        ),
+    )
+    db.session.commit()
+    click.echo(f"compacted {counts['compacted']} entries, expired {counts['expired']}")
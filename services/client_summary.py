@@ -0,0 +1,240 @@
+import click
+from flask.cli import with_appcontext
+from sqlalchemy.orm import aliased
+from database import db
+from models.clientModel import Client
+from models.clientSummaryModel import ClientSummary
+from models.internetModel import Internet
+from models.meetingModel import Meeting
+from models.office import BuildingOffice
+from models.buildingModel import Building
+from services.hooks import before_commit
+from services.projection import fetch_dicts
+
+"""
+client_summary read model: one flattened row per client
+
+The row joins the client to its building, its office, its latest meeting
+and its latest internet record and counts its meetings and internet
+records, so report reads are single-table scans on client_summary instead
+of the five-way join.
+
+It is a plain table on every database rather than a Postgres materialized
+view, since a materialized view can only be refreshed whole. Every commit
+touching the source tables refreshes the affected summary rows in the
+same transaction with one DELETE and one INSERT ... SELECT; a client is
+affected when it, its meetings or internet records, its building or its
+office changed. A bulk statement whose rows are unknown rebuilds the whole
+table, as does 'flask rebuild-summary'.
+"""
+
+# sales_read section: (summary section, model)
+SECTIONS = {
+    "client": ("client", Client),
+    "buildings": ("building", Building),
+    "offices": ("office", BuildingOffice),
+    "meetings": ("meeting", Meeting),
+    "internet_records": ("internet", Internet),
+}
+
+# columns shared by several sections
+_SHARED = {
+    ("client", "building_id"): "building_id",
+    ("meeting", "client_id"): "client_id",
+    ("internet", "client_id"): "client_id",
+}
+
+
+def summary_column(section, field):
+    """
+    Name of the client_summary column holding field of section
+    """
+    return _SHARED.get((section, field)) or (
+        field if field.startswith(section) else f"{section}_{field}"
+    )
+
+
+# summary section: [(field, summary column)], in to_dict order
+FIELDS = {
+    section: [(field, summary_column(section, field)) for field in model.serialized_fields]
+    for section, model in SECTIONS.values()
+}
+
+# a non-nullable column of each joined section, NULL when the client has none
+_PRESENT = {"building": "building_name", "office": "office_name",
+            "meeting": "meeting_id", "internet": "internet_id"}
+
+
+def _source_select(where=None):
+    """
+    Selects the summary rows of the clients matching where from the source tables
+    """
+    latest_meeting = (
+        db.select(Meeting.meeting_id)
+        .where(Meeting.client_id == Client.client_id)
+        .order_by(Meeting.meeting_date.desc(), Meeting.meeting_id.desc())
+        .limit(1)
+        .correlate(Client)
+        .scalar_subquery()
+    )
+    latest_internet = (
+        db.select(Internet.internet_id)
+        .where(Internet.client_id == Client.client_id)
+        .order_by(Internet.timestamp.desc(), Internet.internet_id.desc())
+        .limit(1)
+        .correlate(Client)
+        .scalar_subquery()
+    )
+    counted_meetings = aliased(Meeting)
+    counted_internet = aliased(Internet)
+
+    sources = {}
+    for section, model in SECTIONS.values():
+        for field, column in FIELDS[section]:
+            sources.setdefault(column, getattr(model, field))
+    # the client's own keys, present even if the joined row is missing
+    sources["building_id"] = Client.building_id
+    sources["office_id"] = Client.office_id
+    sources["client_id"] = Client.client_id
+    sources["total_meetings"] = (
+        db.select(db.func.count(counted_meetings.meeting_id))
+        .where(counted_meetings.client_id == Client.client_id)
+        .scalar_subquery()
+    )
+    sources["total_internet_records"] = (
+        db.select(db.func.count(counted_internet.internet_id))
+        .where(counted_internet.client_id == Client.client_id)
+        .scalar_subquery()
+    )
+
+    names = [column.key for column in ClientSummary.__table__.columns]
+    stmt = (
+        db.select(*(sources[name].label(name) for name in names))
+        .select_from(Client)
+        .outerjoin(Building, Building.building_id == Client.building_id)
+        .outerjoin(BuildingOffice, BuildingOffice.office_id == Client.office_id)
+        .outerjoin(Meeting, Meeting.meeting_id == latest_meeting)
+        .outerjoin(Internet, Internet.internet_id == latest_internet)
+    )
+    if where is not None:
+        stmt = stmt.where(where)
+    return names, stmt
+
+
+def refresh(client_ids=None, building_ids=(), office_ids=()):
+    """
+    Rewrites the summary rows of the given clients and of every client in
+    the given buildings and offices; everything when client_ids is None
+    """
+    table = ClientSummary.__table__
+    if client_ids is None:
+        stale, where = None, None
+    else:
+        stale = db.or_(
+            table.c.client_id.in_(client_ids),
+            table.c.building_id.in_(building_ids),
+            table.c.office_id.in_(office_ids),
+        )
+        where = db.or_(
+            Client.client_id.in_(client_ids),
+            Client.building_id.in_(building_ids),
+            Client.office_id.in_(office_ids),
+        )
+
+    delete = table.delete()
+    db.session.execute(delete if stale is None else delete.where(stale))
+    names, stmt = _source_select(where)
+    db.session.execute(table.insert().from_select(names, stmt))
+
+
+def _affected(changes):
+    """
+    Returns (client ids, building ids, office ids), None client ids when
+    some change does not say which rows it touched
+    """
+    clients, buildings, offices = set(), set(), set()
+    for change in changes:
+        if change.identity is None:
+            return None, None, None
+        if change.model is Client:
+            clients.add(change.identity)
+        elif change.model is Building:
+            buildings.add(change.identity)
+        elif change.model is BuildingOffice:
+            offices.add(change.identity)
+        else:
+            if "client_id" not in change.values:
+                return None, None, None
+            ids = {change.values["client_id"], change.previous.get("client_id")}
+            clients.update(ids - {None})
+    return clients, buildings, offices
+
+
+@before_commit(Client, Meeting, Internet, Building, BuildingOffice)
+def _refresh_summaries(changes):
+    clients, buildings, offices = _affected(changes)
+    if clients is None:
+        refresh()
+    else:
+        refresh(sorted(clients), sorted(buildings), sorted(offices))
+
+
+def nest(row, sections=None):
+    """
+    Turns a flat summary row into the /sales/<id> sections: client, and the
+    building, office, meeting and internet record or None for missing ones
+
+    sections narrows the result as in services.sales_read
+    """
+    nested = {}
+    for section, (name, _) in SECTIONS.items():
+        if sections is not None and section not in sections:
+            continue
+        fields = sections.get(section) if sections is not None else None
+        present = _PRESENT.get(name)
+        if present is not None and row.get(present) is None:
+            nested[name] = None
+            continue
+        nested[name] = {
+            field: row[column]
+            for field, column in FIELDS[name]
+            if fields is None or field in fields
+        }
+    return nested
+
+
+def summary_columns(sections=None):
+    """
+    The client_summary columns behind sections, every one when None
+    """
+    if sections is None:
+        return [getattr(ClientSummary, field) for field in ClientSummary.serialized_fields]
+    names = []
+    for section, fields in sections.items():
+        name = SECTIONS[section][0]
+        names += [
+            column for field, column in FIELDS[name] if fields is None or field in fields
+        ]
+        if name in _PRESENT:
+            names.append(_PRESENT[name])
+    return [getattr(ClientSummary, name) for name in dict.fromkeys(names)]
+
+
+def load_summary(client_id, sections=None):
+    """
+    Returns the summary row of one client as a dict, None when it does not exist
+    """
+    rows = fetch_dicts(
+        db.select(*summary_columns(sections)).where(ClientSummary.client_id == client_id)
+    )
+    return rows[0] if rows else None
+
+
+@click.command("rebuild-summary")
+@with_appcontext
+def rebuild_summary_command():
+    """Rebuild the client_summary read model from the source tables."""
+    refresh()
+    db.session.commit()
+    count = db.session.execute(db.select(db.func.count()).select_from(ClientSummary)).scalar()
+    click.echo(f"client_summary rebuilt with {count} rows")
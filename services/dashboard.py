@@ -0,0 +1,61 @@
+from flask import current_app
+from sqlalchemy import func
+from database import db
+from models.clientModel import Client
+from models.internetModel import Internet
+from models.meetingModel import Meeting
+from models.office import BuildingOffice
+from models.buildingModel import Building
+from services.cache import TTLCache
+from services.hooks import on_commit
+
+"""
+Dashboard counters served by /count
+"""
+
+_counts = TTLCache()
+
+
+def count_columns():
+    """
+    The three counters as labelled scalar subqueries, to be selected together
+    """
+    return [
+        db.select(func.count(Client.client_id)).scalar_subquery().label(
+            "client_count"
+        ),
+        db.select(func.count(Meeting.meeting_id))
+        .where(Meeting.meeting_status == "Scheduled")
+        .scalar_subquery()
+        .label("meeting_count"),
+        db.select(func.count(Internet.internet_id))
+        .where(Internet.deal_status == "Pending")
+        .scalar_subquery()
+        .label("deal_status"),
+    ]
+
+
+def _count_query():
+    """
+    Fetches all three counters in a single round trip
+    """
+    row = db.session.execute(db.select(*count_columns())).one()
+    return {key: value or 0 for key, value in row._mapping.items()}
+
+
+def dashboard_counts():
+    """
+    Returns the counters, from cache when they were read less than
+    COUNT_CACHE_TTL seconds ago and nothing relevant was committed since
+    """
+    return _counts.get_or_set(
+        "counts", _count_query, current_app.config["COUNT_CACHE_TTL"]
+    )
+
+
+@on_commit(Client, Meeting, Internet, BuildingOffice, Building)
+def _invalidate_counts(changes):
+    # offices and buildings take their clients with them when deleted
+    if any(change.model in (Client, Meeting, Internet) or change.op == "delete"
+           for change in changes):
+        _counts.invalidate()
@@ -0,0 +1,281 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from models.buildingModel import Building
+from models.clientModel import Client
+from models.internetModel import Internet
+from models.meetingModel import Meeting
+from models.office import BuildingOffice
+from database import db
+from models.clientSummaryModel import ClientSummary
+from services.hooks import on_commit
+from services.projection import fetch_dicts
+
+try:
+    import redis
+except ImportError:  # the shared backend is optional
+    redis = None
+
+"""
+Read-through cache of serialized per-client documents (/sales/<id>,
+/client/<id>/complete)
+
+A document is stored as the exact response bytes together with a snapshot
+of the version counters ("tags") of everything it was built from: the
+client, its building and its office. A commit touching any of those rows,
+or the client's meetings and internet records, bumps the matching tag, so
+the next read sees a changed counter and rebuilds; nothing has to know
+which documents exist.
+
+Backends, chosen by CLIENT_CACHE_BACKEND:
+
+    lru     in-process, bounded by CLIENT_CACHE_MAX_ENTRIES and
+            CLIENT_CACHE_MAX_BYTES; other workers' commits are only seen
+            once an entry is older than CLIENT_CACHE_TTL
+    shared  Redis at CLIENT_CACHE_URL, shared by every worker; without a
+            URL an in-process LocalStore stands in for Redis
+    none    caching disabled
+"""
+
+ALL = "all"
+
+
+class LRUBackend:
+    """
+    Least recently used entries with a count and total size bound
+    """
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._tags = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._bytes += len(value)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def get_tags(self, names):
+        with self._lock:
+            return [self._tags.get(name, 0) for name in names]
+
+    def bump_tags(self, names):
+        # tags are tiny and never evicted, an evicted counter could
+        # come back at a value an old entry was stored with
+        with self._lock:
+            for name in names:
+                self._tags[name] = self._tags.get(name, 0) + 1
+
+
+class LocalStore:
+    """
+    Stand-in for a Redis client implementing the few commands SharedBackend
+    uses, for development and single-process runs without Redis
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key):
+        entry = self._data.get(key)
+        if entry and entry[0] is not None and entry[0] <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key)
+            return entry[1] if entry else None
+
+    def mget(self, keys):
+        with self._lock:
+            return [entry[1] if (entry := self._live(key)) else None for key in keys]
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ex if ex else None, value)
+
+    def incr(self, key):
+        with self._lock:
+            entry = self._live(key)
+            value = int(entry[1]) + 1 if entry else 1
+            self._data[key] = (entry[0] if entry else None, str(value).encode())
+            return value
+
+
+class SharedBackend:
+    """
+    Entries and tags kept in Redis (or a LocalStore) under a key prefix
+    """
+
+    def __init__(self, client, prefix="client-doc:"):
+        self._client = client
+        self._prefix = prefix
+
+    def get(self, key):
+        return self._client.get(self._prefix + key)
+
+    def set(self, key, value, ttl):
+        self._client.set(self._prefix + key, value, ex=max(1, int(ttl)))
+
+    def get_tags(self, names):
+        values = self._client.mget([f"{self._prefix}tag:{name}" for name in names])
+        return [int(value) if value is not None else 0 for value in values]
+
+    def bump_tags(self, names):
+        for name in names:
+            self._client.incr(f"{self._prefix}tag:{name}")
+
+
+def create_backend(config):
+    """
+    Builds the backend named by CLIENT_CACHE_BACKEND, None when disabled
+    """
+    kind = config["CLIENT_CACHE_BACKEND"]
+    if kind == "none":
+        return None
+    if kind == "lru":
+        return LRUBackend(config["CLIENT_CACHE_MAX_ENTRIES"], config["CLIENT_CACHE_MAX_BYTES"])
+    if kind == "shared":
+        url = config["CLIENT_CACHE_URL"]
+        if not url:
+            return SharedBackend(LocalStore())
+        if redis is None:
+            raise RuntimeError(
+                "CLIENT_CACHE_URL needs the redis package, install the 'shared-cache' extra"
+            )
+        return SharedBackend(redis.Redis.from_url(url))
+    raise ValueError(f"Unknown CLIENT_CACHE_BACKEND {kind!r}, expected lru, shared or none")
+
+
+def init_doc_cache(app):
+    app.extensions["client_doc_cache"] = create_backend(app.config)
+
+
+def _backend():
+    return current_app.extensions.get("client_doc_cache")
+
+
+def client_tags(client_id):
+    return [ALL, f"client:{client_id}"]
+
+
+def location_tags(building_id, office_id):
+    return [f"building:{building_id}", f"office:{office_id}"]
+
+
+def _location(client_id):
+    """
+    (building_id, office_id) of the client, (None, None) when it does not exist
+    """
+    rows = fetch_dicts(
+        db.select(ClientSummary.building_id, ClientSummary.office_id).where(
+            ClientSummary.client_id == client_id
+        )
+    )
+    return (rows[0]["building_id"], rows[0]["office_id"]) if rows else (None, None)
+
+
+def cached_document(kind, client_id, build):
+    """
+    Returns (body, hit) for the document kind of client_id
+
+    build() returns the body bytes, or None when the client does not
+    exist, which is not cached.
+    """
+    backend = _backend()
+    if backend is None:
+        return build(), False
+
+    key = f"{kind}:{client_id}"
+    entry = backend.get(key)
+    if entry is not None:
+        header, _, body = entry.partition(b"\n")
+        snapshot = json.loads(header)
+        if backend.get_tags(list(snapshot)) == list(snapshot.values()):
+            return body, True
+
+    # every tag is read before building, so a commit landing meanwhile
+    # makes the stored entry stale instead of being lost; a client moved
+    # after its location was read bumps its own tag
+    names = client_tags(client_id) + location_tags(*_location(client_id))
+    snapshot = dict(zip(names, backend.get_tags(names)))
+    body = build()
+    if body is None:
+        return None, False
+
+    backend.set(
+        key,
+        json.dumps(snapshot).encode() + b"\n" + body,
+        current_app.config["CLIENT_CACHE_TTL"],
+    )
+    return body, False
+
+
+def _ids(change, key):
+    """
+    Values of key before and after the change, None when it is unknown
+    """
+    if key not in change.values:
+        return None
+    ids = {change.values[key], change.previous.get(key)}
+    ids.discard(None)
+    return ids
+
+
+@on_commit(Client, Meeting, Internet, Building, BuildingOffice)
+def _invalidate_documents(changes):
+    if not has_app_context() or _backend() is None:
+        return
+
+    tags = set()
+    for change in changes:
+        if change.identity is None:
+            tags.add(ALL)
+        elif change.model is Client:
+            tags.add(f"client:{change.identity}")
+        elif change.model is Building:
+            tags.add(f"building:{change.identity}")
+        elif change.model is BuildingOffice:
+            # the complete document lists every office of the client's building
+            tags.add(f"office:{change.identity}")
+            building_ids = _ids(change, "building_id")
+            if building_ids is None:
+                tags.add(ALL)
+            else:
+                tags.update(f"building:{building_id}" for building_id in building_ids)
+        else:
+            client_ids = _ids(change, "client_id")
+            if client_ids is None:
+                tags.add(ALL)
+            else:
+                tags.update(f"client:{client_id}" for client_id in client_ids)
+    _backend().bump_tags(sorted(tags))
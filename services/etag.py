@@ -0,0 +1,98 @@
+import hashlib
+from functools import wraps
+from flask import make_response, request
+from sqlalchemy.dialects import postgresql, sqlite
+from database import db
+from models.clientModel import Client
+from models.internetModel import Internet
+from models.meetingModel import Meeting
+from models.office import BuildingOffice
+from models.buildingModel import Building
+from models.tableVersionModel import TableVersion
+from services.hooks import before_commit
+from services.projection import read_connection
+
+"""
+ETag / If-None-Match support for the list endpoints
+
+Every commit bumps the version row of each table it wrote to, in the same
+transaction, so the counters are shared by all workers. A list response's
+ETag is derived from the versions of the tables it reads plus the request
+path and query string; a client presenting a current ETag gets 304 after a
+single primary-key lookup, made on the same read-only connection the list
+query would use, instead of the full SELECT and serialization.
+"""
+
+TRACKED = (Client, Meeting, Internet, BuildingOffice, Building)
+
+
+def _upsert():
+    dialect = db.session.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    table = TableVersion.__table__
+    return insert(table).on_conflict_do_update(
+        index_elements=[table.c.table_name],
+        set_={"version": table.c.version + 1},
+    )
+
+
+def bump_versions(*tables):
+    """
+    Bumps the version of the named tables in the current transaction, for
+    derived tables written outside the tracked models
+    """
+    db.session.execute(
+        _upsert(),
+        [{"table_name": table, "version": 1} for table in sorted(tables)],
+    )
+
+
+@before_commit(*TRACKED)
+def _bump_versions(changes):
+    bump_versions(*{change.model.__tablename__ for change in changes})
+
+
+def table_versions(*models):
+    """
+    Returns {table name: version} for the tables of models, 0 for untouched ones
+    """
+    names = [model.__tablename__ for model in models]
+    versions = dict.fromkeys(names, 0)
+    versions.update(
+        read_connection().execute(
+            db.select(TableVersion.table_name, TableVersion.version).where(
+                TableVersion.table_name.in_(names)
+            )
+        ).all()
+    )
+    return versions
+
+
+def etag(*models):
+    """
+    Decorator answering conditional GETs for a view that only reads models
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versions = table_versions(*models)
+            state = ",".join(f"{name}:{version}" for name, version in sorted(versions.items()))
+            tag = hashlib.sha1(
+                f"{state}|{request.full_path}".encode()
+            ).hexdigest()[:20]
+
+            if request.if_none_match.contains(tag):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(tag)
+            # browsers must revalidate, which is now cheap
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+
+        return wrapper
+
+    return decorator
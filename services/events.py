@@ -0,0 +1,236 @@
+import itertools
+import json
+import queue
+import threading
+import time
+from models.clientModel import Client
+from models.internetModel import Internet
+from models.meetingModel import Meeting
+from database import db
+from models.changeLogModel import ChangeLog
+from services.change_feed import commit_cursor
+from services.dashboard import count_columns
+from services.hooks import on_commit
+from services.projection import read_connection
+
+"""
+Server-Sent Events behind /events, pushing dashboard updates to open
+screens instead of having them poll /count and /sales
+
+Each commit touching clients, meetings or internet records is turned into
+one "update" event holding the deltas of the /count counters and the ids
+of the clients that changed, worked out from the commit hook's change
+records alone, so no query is made however many screens are listening.
+The event is encoded once and put on every subscriber's bounded queue; a
+subscriber too slow to keep up has its backlog replaced by a single
+"reload" event instead of holding up the commit or growing without bound.
+A comment line is sent every EVENTS_HEARTBEAT seconds so proxies keep idle
+connections open.
+
+A stream subscribes before it reads its opening snapshot, so no commit is
+lost in between, but a commit landing then may be both in the snapshot and
+delivered as an update. The snapshot and every update therefore carry a
+cursor, the change_log position of the commit (see services/change_feed.py,
+which writes the log in commit order): a screen drops the updates whose
+cursor is not above the snapshot's, as the snapshot already counts them.
+
+The broadcaster lives in the worker process: with several workers a
+stream only carries the commits of its own worker, and the worker must
+be able to hold one long-lived request per screen (threaded or gevent
+workers). Streams end after EVENTS_MAX_DURATION seconds and the browser's
+EventSource reconnects on its own.
+"""
+
+# /count key: (model, column, counted value or None for every row)
+COUNTERS = {
+    "client_count": (Client, None, None),
+    "meeting_count": (Meeting, "meeting_status", "Scheduled"),
+    "deal_status": (Internet, "deal_status", "Pending"),
+}
+
+# milliseconds the browser waits before reconnecting
+RETRY_MS = 3000
+
+
+def encode(event, data, event_id=None):
+    """
+    Formats one SSE message
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+class Subscription:
+    """
+    One listener's bounded queue of encoded messages
+    """
+
+    def __init__(self, size):
+        self.queue = queue.Queue(size)
+        # publishers of concurrent commits take turns, so no message can
+        # refill the queue between draining it and putting the reload
+        self._lock = threading.Lock()
+
+    def offer(self, message, reload):
+        with self._lock:
+            try:
+                self.queue.put_nowait(message)
+            except queue.Full:
+                # the listener fell behind, whatever it missed is covered by a reload
+                while True:
+                    try:
+                        self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                self.queue.put_nowait(reload)
+
+
+class Broadcaster:
+    """
+    Fans encoded messages out to every subscription of this process
+    """
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def subscribe(self, size, limit):
+        """
+        Returns a new Subscription, None when limit listeners are connected
+        """
+        with self._lock:
+            if len(self._subscriptions) >= limit:
+                return None
+            subscription = Subscription(size)
+            self._subscriptions.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event, data):
+        event_id = next(self._ids)
+        message = encode(event, data, event_id)
+        reload = encode("reload", {}, event_id)
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.offer(message, reload)
+
+
+broadcaster = Broadcaster()
+
+
+def stream(subscription, counts, heartbeat, max_duration):
+    """
+    Yields the SSE body for one subscription: the counts snapshot, then queued
+    messages and heartbeats until max_duration seconds have passed
+    """
+    deadline = time.monotonic() + max_duration
+    try:
+        yield f"retry: {RETRY_MS}\n\n".encode()
+        yield encode("counts", counts)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                yield subscription.queue.get(timeout=min(heartbeat, remaining))
+            except queue.Empty:
+                yield b": keepalive\n\n"
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+def snapshot():
+    """
+    The /count values plus the change_log cursor they are current as of,
+    read in one statement so both come from the same database snapshot
+    """
+    row = read_connection().execute(
+        db.select(
+            *count_columns(),
+            db.select(db.func.max(ChangeLog.change_id)).scalar_subquery().label("cursor"),
+        )
+    ).one()
+    values = {key: value or 0 for key, value in row._mapping.items()}
+    values["cursor"] = row.cursor
+    return values
+
+
+def _counted(values, column, counted):
+    if column is None:
+        return True
+    if column not in values:
+        return None
+    return values[column] == counted
+
+
+def _delta(change, column, counted):
+    """
+    How much one change moves a counter, None when the change does not say
+    """
+    if change.op == "insert":
+        now = _counted(change.values, column, counted)
+        return None if now is None else int(now)
+    if change.op == "delete":
+        before = _counted(change.values, column, counted)
+        return None if before is None else -int(before)
+    if column is None or column not in change.previous:
+        return 0
+    now = _counted(change.values, column, counted)
+    before = change.previous[column] == counted
+    return None if now is None else int(now) - int(before)
+
+
+def _client_ids(change):
+    if change.model is Client:
+        return {change.identity}
+    ids = {change.values.get("client_id"), change.previous.get("client_id")}
+    ids.discard(None)
+    return ids or None
+
+
+def dashboard_update(changes):
+    """
+    Builds the update event for the changes of one commit
+
+    counts holds the counter deltas and clients the changed client ids;
+    either is None when some change did not carry enough to work it out,
+    such as a bulk statement, and the screen should refetch it. cursor is
+    added by the publisher, see snapshot.
+    """
+    counts = dict.fromkeys(COUNTERS, 0)
+    clients = set()
+    for change in changes:
+        if change.identity is None:
+            return {"counts": None, "clients": None}
+        for key, (model, column, counted) in COUNTERS.items():
+            if counts is None or change.model is not model:
+                continue
+            delta = _delta(change, column, counted)
+            if delta is None:
+                counts = None
+            else:
+                counts[key] += delta
+        if clients is not None:
+            ids = _client_ids(change)
+            clients = None if ids is None else clients | ids
+    return {"counts": counts, "clients": sorted(clients) if clients is not None else None}
+
+
+@on_commit(Client, Meeting, Internet)
+def _publish_update(changes):
+    if len(broadcaster):
+        update = dashboard_update(changes)
+        update["cursor"] = commit_cursor()
+        broadcaster.publish("update", update)
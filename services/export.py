@@ -0,0 +1,167 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from database import db
+from models.clientModel import Client
+from models.internetModel import Internet
+from models.meetingModel import Meeting
+from models.office import BuildingOffice
+from models.buildingModel import Building
+from services.jobs import job, result_path
+
+"""
+Flattened, streaming export of the sales report
+
+Every output row is one client joined to its building and office, and
+to its n-th meeting and n-th internet record, both numbered by id. A
+client with M meetings and I internet records gives max(M, I) rows: each
+meeting and each internet record appears exactly once, so columns such
+as internet_isp_price can be summed, and the shorter side is left empty
+on the remaining rows. Clients without meetings or internet records
+still produce one row with those columns empty.
+"""
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _export_columns():
+    """
+    Returns the labelled columns of the export, prefixed by the table they come from
+    """
+    columns = []
+    for prefix, model in (
+        ("client", Client),
+        ("building", Building),
+        ("office", BuildingOffice),
+        ("meeting", Meeting),
+        ("internet", Internet),
+    ):
+        for column in model.__table__.columns:
+            label = column.name
+            if not label.startswith(prefix):
+                label = f"{prefix}_{label}"
+            columns.append(column.label(label))
+    return columns
+
+
+def _numbered(key, client_id):
+    """
+    Subquery of (id, client_id, n), n numbering each client's rows by id from 1
+    """
+    return db.select(
+        key.label("id"),
+        client_id.label("client_id"),
+        db.func.row_number().over(partition_by=client_id, order_by=key).label("n"),
+    ).subquery()
+
+
+def export_statement(chunk_size):
+    """
+    Builds the export query
+
+    yield_per makes the driver use a server-side cursor and fetch chunk_size
+    rows per round trip instead of buffering the whole result
+    """
+    meetings = _numbered(Meeting.meeting_id, Meeting.client_id)
+    internet = _numbered(Internet.internet_id, Internet.client_id)
+    # row numbers used by each client, from whichever side has more rows
+    slots = db.union(
+        db.select(meetings.c.client_id, meetings.c.n),
+        db.select(internet.c.client_id, internet.c.n),
+    ).subquery("slots")
+
+    return (
+        db.select(*_export_columns())
+        .join(Building, Client.building_id == Building.building_id)
+        .join(BuildingOffice, Client.office_id == BuildingOffice.office_id)
+        .outerjoin(slots, slots.c.client_id == Client.client_id)
+        .outerjoin(
+            meetings,
+            db.and_(meetings.c.client_id == slots.c.client_id, meetings.c.n == slots.c.n),
+        )
+        .outerjoin(Meeting, Meeting.meeting_id == meetings.c.id)
+        .outerjoin(
+            internet,
+            db.and_(internet.c.client_id == slots.c.client_id, internet.c.n == slots.c.n),
+        )
+        .outerjoin(Internet, Internet.internet_id == internet.c.id)
+        .order_by(Client.client_id, slots.c.n)
+        .execution_options(yield_per=chunk_size)
+    )
+
+
+def _plain(value):
+    """
+    Converts dates to ISO strings and decimals to strings, as the JSON
+    responses do, so rows can be written as CSV or JSON
+    """
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def iter_export(fmt, chunk_size, on_rows=None):
+    """
+    Generator producing the export body one chunk of rows at a time
+
+    on_rows, when given, is called with the number of rows in each chunk
+    """
+    on_rows = on_rows or (lambda count: None)
+    result = db.session.execute(export_statement(chunk_size))
+    keys = list(result.keys())
+
+    try:
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(keys)
+            yield buffer.getvalue()
+            for partition in result.partitions():
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(
+                    [_plain(value) for value in row] for row in partition
+                )
+                on_rows(len(partition))
+                yield buffer.getvalue()
+        else:
+            for partition in result.partitions():
+                on_rows(len(partition))
+                yield "".join(
+                    json.dumps(dict(zip(keys, map(_plain, row)))) + "\n"
+                    for row in partition
+                )
+    finally:
+        result.close()
+
+
+@job("export")
+def export_job(context):
+    """
+    Writes the export to a file under JOBS_RESULT_DIR, served by /jobs/<id>/result
+    """
+    fmt = context.params["format"]
+    rows = 0
+
+    def on_rows(count):
+        nonlocal rows
+        rows += count
+        context.progress(rows)
+
+    path = result_path(context.job_id, fmt)
+    with open(path, "w", encoding="utf-8", newline="") as out:
+        for chunk in iter_export(fmt, context.params["chunk_size"], on_rows):
+            out.write(chunk)
+    return {
+        "rows": rows,
+        "file": path,
+        "mimetype": EXPORT_FORMATS[fmt],
+        "filename": f"sales.{fmt}",
+    }
@@ -0,0 +1,223 @@
+from datetime import date, datetime, timedelta
+from flask import request
+from database import db
+from models.clientModel import Client
+from models.clientSummaryModel import ClientSummary
+from models.internetModel import Internet
+from models.meetingModel import Meeting
+from models.pipelineRollupModel import PipelineRollup
+
+"""
+Query string filters and sorting for the list endpoints
+
+Each endpoint declares the parameters it accepts; every parameter maps to
+a SQL condition, so filtering happens in the WHERE clause and only the
+matching rows are transferred. A parameter may be repeated or hold
+comma-separated values, which are OR-ed:
+
+    /internet?deal_status=Pending,Ongoing&isp_name=Zuku&sort=-timestamp
+
+sort takes comma-separated column names from the endpoint's allow-list,
+each optionally prefixed with '-' for descending order; the primary key is
+always appended so the order is stable.
+"""
+
+
+def _values(param):
+    values = []
+    for raw in request.args.getlist(param):
+        values += [value.strip() for value in raw.split(",") if value.strip()]
+    return values
+
+
+def _convert(param, values, convert):
+    try:
+        return [convert(value) for value in values]
+    except ValueError:
+        raise ValueError(f"{param} has an invalid value")
+
+
+def equals(column, convert=str):
+    """
+    column equal to one of the given values
+    """
+    def condition(param, values):
+        values = _convert(param, values, convert)
+        return column == values[0] if len(values) == 1 else column.in_(values)
+    return condition
+
+
+def through(key, foreign_key, inner):
+    """
+    Rows whose key appears as foreign_key among the rows matching inner,
+    e.g. clients having an internet record with a given deal status
+    """
+    def condition(param, values):
+        return key.in_(db.select(foreign_key).where(inner(param, values)))
+    return condition
+
+
+def _day(param, values):
+    if len(values) != 1:
+        raise ValueError(f"{param} takes a single date")
+    try:
+        return date.fromisoformat(values[0])
+    except ValueError:
+        raise ValueError(f"{param} must be a date in YYYY-MM-DD format")
+
+
+def since(column):
+    """
+    column on or after the given day
+    """
+    def condition(param, values):
+        day = _day(param, values)
+        if column.type.python_type is datetime:
+            return column >= datetime.combine(day, datetime.min.time())
+        return column >= day
+    return condition
+
+
+def until(column):
+    """
+    column on or before the given day, the whole day for timestamps
+    """
+    def condition(param, values):
+        day = _day(param, values)
+        if column.type.python_type is datetime:
+            return column < datetime.combine(day + timedelta(days=1), datetime.min.time())
+        return column <= day
+    return condition
+
+
+def _month(param, values):
+    if len(values) != 1:
+        raise ValueError(f"{param} takes a single month")
+    try:
+        return datetime.strptime(values[0], "%Y-%m").strftime("%Y-%m")
+    except ValueError:
+        raise ValueError(f"{param} must be a month in YYYY-MM format")
+
+
+def month_since(column):
+    """
+    YYYY-MM column on or after the given month
+    """
+    def condition(param, values):
+        return column >= _month(param, values)
+    return condition
+
+
+def month_until(column):
+    """
+    YYYY-MM column on or before the given month, never the empty unknown one
+    """
+    def condition(param, values):
+        return db.and_(column != "", column <= _month(param, values))
+    return condition
+
+
+def apply_filters(stmt, filters):
+    """
+    Adds a WHERE condition for every parameter of filters present in the
+    query string; raises ValueError for values that do not convert
+    """
+    for param, condition in filters.items():
+        values = _values(param)
+        if values:
+            stmt = stmt.where(condition(param, values))
+    return stmt
+
+
+def apply_sort(stmt, sortable, key):
+    """
+    Orders stmt by ?sort=, restricted to the columns named in sortable,
+    then by key; raises ValueError for any other column
+    """
+    order = []
+    for field in _values("sort"):
+        column = sortable.get(field.lstrip("-"))
+        if column is None:
+            raise ValueError(
+                f"cannot sort by {field.lstrip('-')}, expected one of: {', '.join(sortable)}"
+            )
+        order.append(column.desc() if field.startswith("-") else column.asc())
+    return stmt.order_by(*order, key)
+
+
+def _by_client(client_key, column):
+    """
+    Child rows whose client has column equal to one of the given ids
+    """
+    return through(client_key, Client.client_id, equals(column, int))
+
+
+CLIENT_FILTERS = {
+    "building_id": equals(Client.building_id, int),
+    "office_id": equals(Client.office_id, int),
+    "deal_status": through(Client.client_id, Internet.client_id, equals(Internet.deal_status)),
+    "isp_name": through(Client.client_id, Internet.client_id, equals(Internet.isp_name)),
+    "meeting_status": through(
+        Client.client_id, Meeting.client_id, equals(Meeting.meeting_status)
+    ),
+    "from": since(Client.timestamp),
+    "to": until(Client.timestamp),
+}
+CLIENT_SORT = {
+    "client_id": Client.client_id,
+    "client_name": Client.client_name,
+    "timestamp": Client.timestamp,
+    "building_id": Client.building_id,
+    "office_id": Client.office_id,
+}
+
+MEETING_FILTERS = {
+    "client_id": equals(Meeting.client_id, int),
+    "meeting_status": equals(Meeting.meeting_status),
+    "meetingtype": equals(Meeting.meetingtype),
+    "building_id": _by_client(Meeting.client_id, Client.building_id),
+    "office_id": _by_client(Meeting.client_id, Client.office_id),
+    "from": since(Meeting.meeting_date),
+    "to": until(Meeting.meeting_date),
+}
+MEETING_SORT = {
+    "meeting_id": Meeting.meeting_id,
+    "meeting_date": Meeting.meeting_date,
+    "meeting_status": Meeting.meeting_status,
+    "client_id": Meeting.client_id,
+}
+
+INTERNET_FILTERS = {
+    "client_id": equals(Internet.client_id, int),
+    "deal_status": equals(Internet.deal_status),
+    "isp_name": equals(Internet.isp_name),
+    "is_isp_connected": equals(Internet.is_isp_connected),
+    "internet_connection_type": equals(Internet.internet_connection_type),
+    "building_id": _by_client(Internet.client_id, Client.building_id),
+    "office_id": _by_client(Internet.client_id, Client.office_id),
+    "from": since(Internet.timestamp),
+    "to": until(Internet.timestamp),
+}
+INTERNET_SORT = {
+    "internet_id": Internet.internet_id,
+    "timestamp": Internet.timestamp,
+    "deal_status": Internet.deal_status,
+    "isp_name": Internet.isp_name,
+    "client_id": Internet.client_id,
+}
+
+SUMMARY_FILTERS = {
+    "building_id": equals(ClientSummary.building_id, int),
+    "office_id": equals(ClientSummary.office_id, int),
+    "deal_status": equals(ClientSummary.internet_deal_status),
+    "isp_name": equals(ClientSummary.internet_isp_name),
+    "meeting_status": equals(ClientSummary.meeting_status),
+    "from": since(ClientSummary.client_timestamp),
+    "to": until(ClientSummary.client_timestamp),
+}
+
+PIPELINE_FILTERS = {
+    "deal_status": equals(PipelineRollup.deal_status),
+    "from": month_since(PipelineRollup.period),
+    "to": month_until(PipelineRollup.period),
+}
@@ -0,0 +1,208 @@
+import logging
+from collections import namedtuple
+from sqlalchemy import event, inspect
+from database import db
+
+"""
+Collects the rows written by a session and hands them to registered
+callbacks once the transaction commits
+
+Changes are gathered per flush and kept in session.info until the
+transaction ends:
+
+    before_commit callbacks run inside the transaction, after the final
+    flush, and may write to the database (change log, read models)
+    on_commit callbacks run after the commit and must not touch the
+    database (cache invalidation, notifications)
+
+A rollback, or closing the session without committing, discards the
+collected changes.
+"""
+
+logger = logging.getLogger(__name__)
+
+# model: mapped class
+# op: "insert", "update" or "delete"
+# identity: primary key value, None when a bulk statement touched unknown rows
+# values: column values known after the change (last known values for deletes)
+# previous: old values of the columns an update changed
+Change = namedtuple("Change", "model op identity values previous")
+
+_INFO_KEY = "hooks.changes"
+_before_commit = []
+_on_commit = []
+
+
+def before_commit(*models):
+    """
+    Registers fn(changes) to run inside the transaction when any of models changed
+    """
+    def register(fn):
+        _before_commit.append((models, fn))
+        return fn
+    return register
+
+
+def on_commit(*models):
+    """
+    Registers fn(changes) to run after a commit that changed any of models
+    """
+    def register(fn):
+        _on_commit.append((models, fn))
+        return fn
+    return register
+
+
+def record(session, model, op, identity=None, values=None, previous=None):
+    """
+    Records a change the unit of work cannot see, such as a set-based DELETE
+    """
+    session.info.setdefault(_INFO_KEY, []).append(
+        Change(model, op, identity, values or {}, previous or {})
+    )
+
+
+def _loaded_values(state):
+    """
+    Column values already loaded on the instance, without emitting any SQL
+    """
+    return {
+        attr.key: state.dict[attr.key]
+        for attr in state.mapper.column_attrs
+        if attr.key in state.dict
+    }
+
+
+def _previous_values(state):
+    previous = {}
+    for attr in state.mapper.column_attrs:
+        history = state.attrs[attr.key].history
+        if history.deleted:
+            previous[attr.key] = history.deleted[0]
+    return previous
+
+
+def _identity(state):
+    identity = state.identity
+    if identity is None:
+        # rows inserted by this flush only get their identity key once the
+        # flush is over, but the generated primary key is already loaded
+        identity = state.mapper.primary_key_from_instance(state.obj())
+        if any(value is None for value in identity):
+            return None
+    return identity[0] if len(identity) == 1 else identity
+
+
+def _cascaded(mapper, seen=None):
+    """
+    Models whose rows the database deletes along with a row of mapper,
+    through relationships declared with passive_deletes
+    """
+    seen = set() if seen is None else seen
+    for relationship in mapper.relationships:
+        child = relationship.mapper
+        if (
+            relationship.passive_deletes
+            and relationship.cascade.delete
+            and child.class_ not in seen
+        ):
+            seen.add(child.class_)
+            _cascaded(child, seen)
+    return seen
+
+
+@event.listens_for(db.session, "after_flush")
+def _collect_flush(session, flush_context):
+    changes = session.info.setdefault(_INFO_KEY, [])
+
+    for obj in session.new:
+        state = inspect(obj)
+        changes.append(
+            Change(type(obj), "insert", _identity(state), _loaded_values(state), {})
+        )
+
+    for obj in session.dirty:
+        if not session.is_modified(obj, include_collections=False):
+            continue
+        state = inspect(obj)
+        changes.append(
+            Change(
+                type(obj),
+                "update",
+                _identity(state),
+                _loaded_values(state),
+                _previous_values(state),
+            )
+        )
+
+    for obj in session.deleted:
+        state = inspect(obj)
+        changes.append(
+            Change(type(obj), "delete", _identity(state), _loaded_values(state), {})
+        )
+        # children left to ON DELETE CASCADE vanish without the unit of work
+        # seeing them; record them as bulk deletes of unknown rows
+        for model in _cascaded(state.mapper):
+            changes.append(Change(model, "delete", None, {}, {}))
+
+
+@event.listens_for(db.session, "do_orm_execute")
+def _collect_bulk(orm_execute_state):
+    # ORM-enabled insert(), update() and delete() statements bypass the unit
+    # of work, so the affected rows are unknown unless the caller records them
+    if orm_execute_state.execution_options.get("hooks_recorded"):
+        return
+    if not (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        return
+
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return
+
+    op = (
+        "insert" if orm_execute_state.is_insert
+        else "update" if orm_execute_state.is_update
+        else "delete"
+    )
+    record(orm_execute_state.session, mapper.class_, op)
+
+
+def _dispatch(registry, changes):
+    for models, fn in registry:
+        matching = [change for change in changes if change.model in models]
+        if matching:
+            yield fn, matching
+
+
+@event.listens_for(db.session, "before_commit")
+def _run_before_commit(session):
+    if not _before_commit:
+        return
+    # flush now so callbacks see the whole transaction, not only earlier flushes
+    session.flush()
+    for fn, matching in _dispatch(_before_commit, session.info.get(_INFO_KEY, [])):
+        fn(matching)
+
+
+@event.listens_for(db.session, "after_commit")
+def _run_on_commit(session):
+    changes = session.info.pop(_INFO_KEY, [])
+    for fn, matching in _dispatch(_on_commit, changes):
+        try:
+            fn(matching)
+        except Exception:
+            # the data is already committed, a failing listener must not
+            # turn a successful request into an error
+            logger.exception("on_commit callback %s failed", fn.__name__)
+
+
+@event.listens_for(db.session, "after_transaction_end")
+def _discard_changes(session, transaction):
+    # after a commit the changes were already consumed, after a rollback or a
+    # close without commit they describe rows that were never written
+    if transaction.parent is None:
+        session.info.pop(_INFO_KEY, None)
@@ -0,0 +1,329 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy.exc import SQLAlchemyError
+from database import db
+from models.jobModel import Job
+from services.projection import fetch_dicts, select_model
+
+"""
+Background jobs for operations too slow for a request, such as clearing
+every table, large exports and bulk imports
+
+A job is a row in the job table plus a call on this process's thread pool
+(JOBS_MAX_WORKERS threads). Submitting inserts the row and returns at
+once, so the endpoint can answer 202 with the job id; /jobs/<id> reports
+status and progress and /jobs/<id>/result the outcome. At most
+JOBS_MAX_PENDING jobs may be queued or running per process, further
+submissions raise JobsBusy.
+
+A job function receives a JobContext and returns its JSON result. It
+runs in its own app context and session and commits its own work;
+progress and status are written on separate connections so they are
+visible while the work is still uncommitted. SQLite has a single writer,
+so there intermediate progress is only kept in memory and served for the
+jobs this process runs. With JOBS_MAX_WORKERS = 0 jobs run inside the
+submitting request, as the tests and benchmarks do.
+
+A job only lives as long as the process running it. When the app starts,
+queued or running jobs recorded by an earlier process on this host that
+is no longer alive are marked failed. 'flask purge-jobs' deletes finished
+jobs older than JOBS_RETENTION together with their result files; run it
+periodically on every host that runs jobs.
+"""
+
+logger = logging.getLogger(__name__)
+
+# kind: function(context) -> result
+JOBS = {}
+
+FINISHED = ("succeeded", "failed")
+
+
+class JobsBusy(Exception):
+    """
+    The process already has JOBS_MAX_PENDING jobs queued or running
+    """
+
+
+def job(kind):
+    """
+    Registers fn(context) as the job named kind
+    """
+    def register(fn):
+        JOBS[kind] = fn
+        return fn
+    return register
+
+
+def _write(job_id, **values):
+    values["updated_at"] = datetime.now()
+    table = Job.__table__
+    with db.engine.begin() as conn:
+        conn.execute(table.update().where(table.c.job_id == job_id).values(**values))
+
+
+class JobContext:
+    """
+    What a running job knows about itself: its id, parameters and a way to
+    report progress
+    """
+
+    def __init__(self, runner, job_id, params, interval):
+        self.job_id = job_id
+        self.params = params or {}
+        self._runner = runner
+        self._interval = interval
+        self._written_at = 0.0
+        self._persist = db.engine.dialect.name != "sqlite"
+
+    def progress(self, done, total=None):
+        """
+        Reports done units out of total, written at most every
+        JOBS_PROGRESS_INTERVAL seconds
+        """
+        self._runner.progress[self.job_id] = (done, total)
+        now = time.monotonic()
+        if self._persist and now - self._written_at >= self._interval:
+            self._written_at = now
+            _write(self.job_id, progress_done=done, progress_total=total)
+
+
+class JobRunner:
+    """
+    This process's thread pool and the bookkeeping of the jobs it runs
+    """
+
+    def __init__(self, app):
+        workers = app.config["JOBS_MAX_WORKERS"]
+        self._app = app
+        self._executor = (
+            ThreadPoolExecutor(workers, thread_name_prefix="job") if workers else None
+        )
+        self._slots = threading.BoundedSemaphore(app.config["JOBS_MAX_PENDING"])
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        # job_id: (done, total) of the jobs running here
+        self.progress = {}
+
+    def submit(self, kind, params=None):
+        """
+        Queues a job and returns its id; raises JobsBusy when no slot is free
+        """
+        if kind not in JOBS:
+            raise KeyError(kind)
+        if not self._slots.acquire(blocking=False):
+            raise JobsBusy(f"{current_app.config['JOBS_MAX_PENDING']} jobs already pending")
+
+        job_id = uuid.uuid4().hex
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(
+                    Job.__table__.insert().values(
+                        job_id=job_id,
+                        kind=kind,
+                        status="queued",
+                        params=params,
+                        owner=self.owner,
+                    )
+                )
+            if self._executor is None:
+                self._run(job_id, kind, params)
+            else:
+                self._executor.submit(self._run, job_id, kind, params)
+        except Exception:
+            self._slots.release()
+            raise
+        return job_id
+
+    def _run(self, job_id, kind, params):
+        try:
+            with self._app.app_context():
+                context = JobContext(
+                    self, job_id, params, self._app.config["JOBS_PROGRESS_INTERVAL"]
+                )
+                self.progress[job_id] = (0, None)
+                _write(job_id, status="running", started_at=datetime.now())
+                try:
+                    result = JOBS[kind](context)
+                    db.session.close()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.exception("job %s (%s) failed", job_id, kind)
+                    done, total = self.progress.get(job_id, (0, None))
+                    _write(
+                        job_id,
+                        status="failed",
+                        error=str(e),
+                        progress_done=done,
+                        progress_total=total,
+                        finished_at=datetime.now(),
+                    )
+                    return
+
+                done, total = self.progress.get(job_id, (0, None))
+                _write(
+                    job_id,
+                    status="succeeded",
+                    result=result,
+                    progress_done=done,
+                    progress_total=total,
+                    finished_at=datetime.now(),
+                )
+        except Exception:
+            # the job row could not be updated, nothing left to report it to
+            logger.exception("job %s (%s) could not be recorded", job_id, kind)
+        finally:
+            self.progress.pop(job_id, None)
+            self._slots.release()
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def fail_orphaned_jobs(runner):
+    """
+    Marks failed the unfinished jobs of this host whose process is gone
+
+    Returns how many jobs were marked; the caller commits
+    """
+    host = runner.owner.rsplit(":", 1)[0]
+    rows = db.session.execute(
+        db.select(Job.job_id, Job.owner).where(
+            Job.status.not_in(FINISHED), Job.owner.like(f"{host}:%")
+        )
+    ).all()
+    orphaned = []
+    for job_id, owner in rows:
+        pid = owner.rsplit(":", 1)[1]
+        # this process has not started any job yet, so a match is a reused pid
+        if owner == runner.owner or not pid.isdigit() or not _alive(int(pid)):
+            orphaned.append(job_id)
+    if orphaned:
+        now = datetime.now()
+        db.session.execute(
+            Job.__table__.update()
+            .where(Job.job_id.in_(orphaned), Job.status.not_in(FINISHED))
+            .values(
+                status="failed",
+                error="the process running the job exited",
+                finished_at=now,
+                updated_at=now,
+            )
+        )
+    return len(orphaned)
+
+
+def init_jobs(app):
+    """
+    Starts the job runner; needs the database, as orphaned jobs are
+    failed on the way
+    """
+    runner = JobRunner(app)
+    app.extensions["jobs"] = runner
+    try:
+        failed = fail_orphaned_jobs(runner)
+        db.session.commit()
+    except SQLAlchemyError:
+        # e.g. the job table is not migrated yet
+        db.session.rollback()
+        logger.exception("orphaned jobs could not be checked")
+        return
+    if failed:
+        logger.warning("marked %s orphaned jobs as failed", failed)
+
+
+def submit_job(kind, params=None):
+    return current_app.extensions["jobs"].submit(kind, params)
+
+
+def get_job(job_id):
+    """
+    Returns the job as a dict, None when it does not exist
+    """
+    rows = fetch_dicts(select_model(Job).where(Job.job_id == job_id))
+    if not rows:
+        return None
+    job = rows[0]
+    live = current_app.extensions["jobs"].progress.get(job_id)
+    if live is not None and job["status"] not in FINISHED:
+        job["progress_done"], job["progress_total"] = live
+    return job
+
+
+def result_path(job_id, suffix):
+    """
+    Where a job writes a result file, under JOBS_RESULT_DIR
+    """
+    directory = current_app.config["JOBS_RESULT_DIR"]
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{job_id}.{suffix}")
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def purge_jobs(retention, now=None):
+    """
+    Deletes the jobs finished more than retention (a timedelta) ago and
+    their result files, then any file in JOBS_RESULT_DIR older than that
+
+    Returns {"jobs": n, "files": n}; the caller commits
+    """
+    cutoff = (now or datetime.now()) - retention
+    expired = db.session.execute(
+        db.delete(Job)
+        .where(Job.status.in_(FINISHED), Job.finished_at < cutoff)
+        .returning(Job.result)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+
+    files = sum(
+        _remove(result["file"]) for result in expired if result and "file" in result
+    )
+    # results of jobs whose row was purged from another host, or lost
+    directory = current_app.config["JOBS_RESULT_DIR"]
+    if os.path.isdir(directory):
+        for entry in os.scandir(directory):
+            if (
+                entry.is_file()
+                and datetime.fromtimestamp(entry.stat().st_mtime) < cutoff
+                and _remove(entry.path)
+            ):
+                files += 1
+    return {"jobs": len(expired), "files": files}
+
+
+@click.command("purge-jobs")
+@click.option("--retention", type=float, default=None,
+              help="Seconds finished jobs are kept; JOBS_RETENTION by default.")
+@with_appcontext
+def purge_jobs_command(retention):
+    """Delete finished jobs past the retention period and their result files."""
+    counts = purge_jobs(
+        timedelta(
+            seconds=retention if retention is not None
+            else current_app.config["JOBS_RETENTION"]
+        )
+    )
+    db.session.commit()
+    click.echo(f"purged {counts['jobs']} jobs and {counts['files']} result files")
@@ -0,0 +1,38 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency, see the "fast" extra
+    orjson = None
+
+"""
+JSON provider backed by orjson when it is installed
+"""
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Drop-in replacement for Flask's provider using orjson's C encoder
+
+    Dates and other types orjson does not handle the way Flask does are
+    handed back to DefaultJSONProvider.default, so responses are unchanged
+    """
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+def init_json(app):
+    """
+    Installs the orjson provider on app, keeping Flask's when orjson is missing
+    """
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
@@ -0,0 +1,285 @@
+import itertools
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from http.client import HTTPConnection, HTTPSConnection
+from urllib.parse import urlsplit
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+"""
+Closed-loop load generator behind the 'flask loadtest' command
+
+    flask --app main loadtest benchmarks/loadtest_scenario.json --workers 8 --duration 30
+    flask --app main loadtest benchmarks/loadtest_scenario.json --url http://localhost:5000
+
+Every worker thread picks a request from the scenario by weight, sends it,
+waits for the full response and immediately picks the next one, so the
+offered load adapts to how fast the app answers. Without --url requests go
+through the app's test client in this process; with it they go over HTTP
+to a running server. A scenario is a JSON file such as
+
+    {"requests": [
+        {"name": "count", "method": "GET", "path": "/count", "weight": 40},
+        {"name": "edit", "method": "POST", "path": "/update", "weight": 5,
+         "json": {"category": "client", "field": "client_name",
+                  "value": "Renamed {n}", "clientData": {"client": {"client_id": 1}}}}
+    ]}
+
+"{n}" in paths and string values is replaced by a number unique to each
+request and "{worker}" by the worker index, so writes do not collide.
+"""
+
+PERCENTILES = (50, 95, 99)
+
+
+def load_scenario(path):
+    """
+    Reads and validates a scenario file, raising click.UsageError when it is invalid
+    """
+    with open(path) as fh:
+        try:
+            scenario = json.load(fh)
+        except ValueError as e:
+            raise click.UsageError(f"{path} is not valid JSON: {e}")
+
+    requests = scenario.get("requests") if isinstance(scenario, dict) else None
+    if not requests:
+        raise click.UsageError(f"{path} has no 'requests' list")
+
+    for index, entry in enumerate(requests):
+        if not entry.get("path"):
+            raise click.UsageError(f"request {index} in {path} has no 'path'")
+        if entry.get("weight", 1) <= 0:
+            raise click.UsageError(f"request {index} in {path} needs a positive 'weight'")
+        entry.setdefault("method", "GET")
+        entry.setdefault("name", f"{entry['method']} {entry['path']}")
+    return requests
+
+
+def _fill(value, n, worker):
+    if isinstance(value, str):
+        return value.replace("{n}", str(n)).replace("{worker}", str(worker))
+    if isinstance(value, dict):
+        return {key: _fill(item, n, worker) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_fill(item, n, worker) for item in value]
+    return value
+
+
+def percentile(ordered, p):
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+class _InProcess:
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def send(self, method, path, body, headers):
+        response = self._client.open(path, method=method, data=body, headers=headers)
+        response.get_data()
+        response.close()
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class _OverHTTP:
+    """
+    One keep-alive connection per worker, reopened after any transport error
+    """
+
+    def __init__(self, url, timeout):
+        parts = urlsplit(url)
+        self._factory = HTTPSConnection if parts.scheme == "https" else HTTPConnection
+        self._netloc = parts.netloc
+        self._prefix = parts.path.rstrip("/")
+        self._timeout = timeout
+        self._conn = None
+
+    def send(self, method, path, body, headers):
+        if self._conn is None:
+            self._conn = self._factory(self._netloc, timeout=self._timeout)
+        try:
+            self._conn.request(method, self._prefix + path, body=body, headers=headers)
+            response = self._conn.getresponse()
+            response.read()
+            return response.status
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class _Results:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, status):
+        with self._lock:
+            self.latencies[name].append(seconds)
+            self.statuses[name][status] += 1
+            if status == "error" or status >= 400:
+                self.errors[name] += 1
+
+
+def run_load(transport, requests, workers, duration, warmup=0.0, seed=None):
+    """
+    Drives the scenario from `workers` threads for `duration` seconds
+
+    transport: callable returning a fresh transport for each worker
+    Requests started during the warm-up are sent but not recorded.
+    Returns (results, measured seconds).
+    """
+    results = _Results()
+    counter = itertools.count(1)
+    counter_lock = threading.Lock()
+    weights = [entry.get("weight", 1) for entry in requests]
+    started = time.perf_counter()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    def work(worker):
+        rng = random.Random(None if seed is None else seed + worker)
+        conn = transport()
+        try:
+            while True:
+                now = time.perf_counter()
+                if now >= stop_at:
+                    return
+                entry = rng.choices(requests, weights)[0]
+                with counter_lock:
+                    n = next(counter)
+
+                path = _fill(entry["path"], n, worker)
+                headers = dict(entry.get("headers", {}))
+                body = None
+                if "json" in entry:
+                    body = json.dumps(_fill(entry["json"], n, worker))
+                    headers["Content-Type"] = "application/json"
+
+                sent = time.perf_counter()
+                try:
+                    status = conn.send(entry["method"], path, body, headers)
+                except Exception:
+                    status = "error"
+                elapsed = time.perf_counter() - sent
+                if sent >= measure_from:
+                    results.add(entry["name"], elapsed, status)
+        finally:
+            conn.close()
+
+    threads = [
+        threading.Thread(target=work, args=(index,), name=f"loadtest-{index}", daemon=True)
+        for index in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, duration
+
+
+def summarize(results, seconds):
+    """
+    Returns the report as a dict: totals plus one row per scenario entry
+    """
+    rows = []
+    for name in sorted(results.latencies):
+        ordered = sorted(results.latencies[name])
+        row = {
+            "name": name,
+            "requests": len(ordered),
+            "rps": len(ordered) / seconds,
+            "error_rate": results.errors[name] / len(ordered),
+            "statuses": {str(k): v for k, v in results.statuses[name].items()},
+            "max_ms": ordered[-1] * 1000,
+        }
+        for p in PERCENTILES:
+            row[f"p{p}_ms"] = percentile(ordered, p) * 1000
+        rows.append(row)
+
+    total = sum(row["requests"] for row in rows)
+    errors = sum(results.errors.values())
+    return {
+        "seconds": seconds,
+        "requests": total,
+        "rps": total / seconds,
+        "error_rate": errors / total if total else 0.0,
+        "endpoints": rows,
+    }
+
+
+def print_report(report):
+    click.echo(
+        f"{report['requests']} requests in {report['seconds']:.1f}s, "
+        f"{report['rps']:.1f} req/s, {report['error_rate']:.2%} errors\n"
+    )
+    header = f"{'endpoint':<28}{'reqs':>8}{'req/s':>9}{'errors':>9}"
+    header += "".join(f"{f'p{p} ms':>10}" for p in PERCENTILES) + f"{'max ms':>10}"
+    click.echo(header)
+    for row in report["endpoints"]:
+        line = (
+            f"{row['name']:<28}{row['requests']:>8}{row['rps']:>9.1f}"
+            f"{row['error_rate']:>9.2%}"
+        )
+        line += "".join(f"{row[f'p{p}_ms']:>10.2f}" for p in PERCENTILES)
+        click.echo(line + f"{row['max_ms']:>10.2f}")
+
+
+@click.command("loadtest")
+@click.argument("scenario", type=click.Path(exists=True, dir_okay=False))
+@click.option("--workers", "-w", default=4, show_default=True,
+              help="Concurrent closed-loop workers.")
+@click.option("--duration", "-d", default=10.0, show_default=True,
+              help="Seconds to measure for.")
+@click.option("--warmup", default=1.0, show_default=True,
+              help="Seconds of unrecorded requests before measuring.")
+@click.option("--url", default=None,
+              help="Base URL of a running server; in-process when omitted.")
+@click.option("--timeout", default=30.0, show_default=True,
+              help="Per-request timeout over HTTP, in seconds.")
+@click.option("--seed", type=int, default=None,
+              help="Random seed for a repeatable request sequence.")
+@click.option("--output", "-o", type=click.Path(dir_okay=False, writable=True),
+              default=None, help="Also write the report to this JSON file.")
+@with_appcontext
+def loadtest_command(scenario, workers, duration, warmup, url, timeout, seed, output):
+    """Run a weighted request scenario and report throughput and latency."""
+    requests = load_scenario(scenario)
+    if url:
+        transport = lambda: _OverHTTP(url, timeout)
+        target = url
+    else:
+        app = current_app._get_current_object()
+        transport = lambda: _InProcess(app)
+        target = "in-process"
+
+    click.echo(
+        f"{len(requests)} request types, {workers} workers, {target}, "
+        f"{warmup:g}s warm-up + {duration:g}s"
+    )
+    results, seconds = run_load(transport, requests, workers, duration, warmup, seed)
+    report = summarize(results, seconds)
+    print_report(report)
+
+    if output:
+        with open(output, "w") as fh:
+            json.dump(report, fh, indent=2)
@@ -0,0 +1,207 @@
+import threading
+import time
+from collections import defaultdict
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+"""
+Per-route request latency, SQL statement counts and database time
+
+SQLAlchemy cursor events count every statement and its duration against
+the request being served; a before/after_request pair records one
+observation per request. Everything is kept in process memory and exposed
+in Prometheus text format by /metrics, so each worker reports its own
+series and the scraper aggregates them.
+"""
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 25, 50, 100, 250, 1000)
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.total += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.total}'
+        yield f"{name}_sum{{{labels}}} {self.sum:.6f}"
+        yield f"{name}_count{{{labels}}} {self.total}"
+
+
+class _RouteStats:
+    def __init__(self):
+        self.latency = _Histogram(LATENCY_BUCKETS)
+        self.statements = _Histogram(STATEMENT_BUCKETS)
+        self.db_seconds = 0.0
+        self.responses = defaultdict(int)
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of the per-route series
+    """
+
+    def __init__(self):
+        self._routes = defaultdict(_RouteStats)
+        self._lock = threading.Lock()
+
+    def observe(self, method, route, status, seconds, statements, db_seconds):
+        with self._lock:
+            stats = self._routes[(method, route)]
+            stats.latency.observe(seconds)
+            stats.statements.observe(statements)
+            stats.db_seconds += db_seconds
+            stats.responses[status] += 1
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+    def render(self):
+        """
+        Returns every series in Prometheus text exposition format
+        """
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = [
+                "# HELP http_request_duration_seconds Request latency per route",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route), stats in routes:
+                lines.extend(stats.latency.lines(
+                    "http_request_duration_seconds", _labels(method, route)
+                ))
+
+            lines += [
+                "# HELP http_requests_total Responses per route and status",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route), stats in routes:
+                for status, count in sorted(stats.responses.items()):
+                    lines.append(
+                        f'http_requests_total{{{_labels(method, route)},'
+                        f'status="{status}"}} {count}'
+                    )
+
+            lines += [
+                "# HELP db_statements_per_request SQL statements issued per request",
+                "# TYPE db_statements_per_request histogram",
+            ]
+            for (method, route), stats in routes:
+                lines.extend(stats.statements.lines(
+                    "db_statements_per_request", _labels(method, route)
+                ))
+
+            lines += [
+                "# HELP db_statements_total SQL statements issued per route",
+                "# TYPE db_statements_total counter",
+            ]
+            for (method, route), stats in routes:
+                lines.append(
+                    f"db_statements_total{{{_labels(method, route)}}} "
+                    f"{stats.statements.sum:.0f}"
+                )
+
+            lines += [
+                "# HELP db_time_seconds_total Time spent executing SQL per route",
+                "# TYPE db_time_seconds_total counter",
+            ]
+            for (method, route), stats in routes:
+                lines.append(
+                    f"db_time_seconds_total{{{_labels(method, route)}}} "
+                    f"{stats.db_seconds:.6f}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+def _labels(method, route):
+    route = route.replace("\\", "\\\\").replace('"', '\\"')
+    return f'method="{method}",route="{route}"'
+
+
+registry = MetricsRegistry()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    # kept on the statement's execution context, which is discarded with
+    # it, so a statement that raises leaves nothing behind on the connection
+    if context is not None and has_app_context():
+        context._metrics_started = time.perf_counter()
+
+
+def _count_statement(context):
+    started = getattr(context, "_metrics_started", None)
+    if started is None or not has_app_context():
+        return
+    del context._metrics_started
+    g.sql_statements = g.get("sql_statements", 0) + 1
+    g.sql_seconds = g.get("sql_seconds", 0.0) + time.perf_counter() - started
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _end_statement(conn, cursor, statement, parameters, context, executemany):
+    _count_statement(context)
+
+
+@event.listens_for(Engine, "handle_error")
+def _failed_statement(exception_context):
+    _count_statement(exception_context.execution_context)
+
+
+def request_sql_stats():
+    """
+    Returns (statements, seconds) spent in SQL by the current request so far
+    """
+    return g.get("sql_statements", 0), g.get("sql_seconds", 0.0)
+
+
+def _before_request():
+    g.request_started = time.perf_counter()
+    g.sql_statements = 0
+    g.sql_seconds = 0.0
+
+
+def _after_request(response):
+    started = g.pop("request_started", None)
+    if started is None:
+        return response
+
+    seconds = time.perf_counter() - started
+    statements, db_seconds = request_sql_stats()
+    route = request.url_rule.rule if request.url_rule else "<unmatched>"
+    registry.observe(
+        request.method, route, response.status_code, seconds, statements, db_seconds
+    )
+
+    if current_app.config["SERVER_TIMING"]:
+        response.headers["Server-Timing"] = (
+            f'app;dur={seconds * 1000:.2f}, '
+            f'db;dur={db_seconds * 1000:.2f};desc="{statements} queries"'
+        )
+    return response
+
+
+def init_metrics(app):
+    """
+    Installs the request hooks; SERVER_TIMING adds a Server-Timing header
+    with the request's latency, DB time and statement count
+    """
+    app.before_request(_before_request)
+    app.after_request(_after_request)
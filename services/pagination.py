@@ -0,0 +1,79 @@
+from flask import current_app, request
+
+"""
+Helpers for keyset (seek) pagination over integer primary keys
+"""
+
+
+def keyset_args(size_key="SALES_PAGE_SIZE", max_key="SALES_MAX_PAGE_SIZE", after_param="after"):
+    """
+    Reads ?after=<id>&limit=N from the query string
+
+    after: last primary key the caller has already seen, None for the first page;
+           read from ?<after_param>= when the endpoint names its cursor differently
+    limit: page size, defaults to config[size_key] and is capped at config[max_key]
+
+    Raises ValueError when either value is not a valid integer
+    """
+    after = request.args.get(after_param)
+    limit = request.args.get("limit")
+
+    try:
+        after = int(after) if after not in (None, "") else None
+        limit = (
+            int(limit) if limit not in (None, "") else current_app.config[size_key]
+        )
+    except ValueError:
+        raise ValueError(f"{after_param} and limit must be integers")
+
+    if limit < 1:
+        raise ValueError("limit must be greater than zero")
+
+    return after, min(limit, current_app.config[max_key])
+
+
+def keyset_page(stmt, key_column, after, limit):
+    """
+    Applies the keyset filter, ordering and limit to a select statement
+
+    One extra row is requested so callers can tell whether a next page exists
+    """
+    if after is not None:
+        stmt = stmt.where(key_column > after)
+    return stmt.order_by(key_column).limit(limit + 1)
+
+
+def split_page(rows, limit, key):
+    """
+    Trims the look-ahead row returned by keyset_page
+
+    Returns the page rows and the cursor for the next page, None on the last page
+    """
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, key(rows[-1])
+    return rows, None
+
+
+def offset_args(size_key, max_key):
+    """
+    Reads ?offset=N&limit=N for results that have no stable key to seek on,
+    such as relevance-ranked ones
+
+    Raises ValueError when either value is not a valid integer
+    """
+    offset = request.args.get("offset")
+    limit = request.args.get("limit")
+
+    try:
+        offset = int(offset) if offset not in (None, "") else 0
+        limit = (
+            int(limit) if limit not in (None, "") else current_app.config[size_key]
+        )
+    except ValueError:
+        raise ValueError("offset and limit must be integers")
+
+    if offset < 0 or limit < 1:
+        raise ValueError("offset must not be negative and limit must be greater than zero")
+
+    return offset, min(limit, current_app.config[max_key])
@@ -0,0 +1,303 @@
+import logging
+from datetime import datetime
+import click
+from flask.cli import with_appcontext
+from database import db
+from models.buildingModel import Building
+from models.clientModel import Client
+from models.internetModel import Internet
+from models.office import BuildingOffice
+from models.pipelineRollupModel import PipelineRollup
+from services.etag import bump_versions
+from services.hooks import before_commit
+from services.projection import fetch_dicts
+
+"""
+Pipeline rollups: internet records counted by deal status per industry,
+building, ISP and month, read by /reports/pipeline
+
+pipeline_rollup holds one row per (dimension, key, period, deal_status)
+with the number of records and their summed isp_price_amount. Every
+commit touching internet records, clients or offices recomputes only the
+groups it affected, in the same transaction, with one DELETE and one
+INSERT ... SELECT per dimension; a group is a dimension key in one month,
+or in every month when a client moved or an office changed industry.
+Changes whose rows are unknown (bulk statements, deleted buildings or
+offices whose clients went with them in the database) rebuild the table.
+
+On Postgres a refresh takes its own transaction-level advisory lock, so
+concurrent commits recomputing the same groups run one after the other
+instead of both inserting the group they each deleted.
+
+'flask reconcile-pipeline' rebuilds it from the source tables and reports
+how many rows had drifted; run it periodically, e.g. nightly from cron.
+"""
+
+logger = logging.getLogger(__name__)
+
+# dimension: key column of the internet records, None for month
+DIMENSIONS = {
+    "industry": BuildingOffice.industry_category,
+    "building": Client.building_id,
+    "isp": Internet.isp_name,
+    "month": None,
+}
+
+# any key or any period of a dimension
+ANY = object()
+
+# key of the Postgres advisory lock serializing rollup refreshes
+_LOCK_KEY = 0x706970656C6E
+
+
+def _period_of(timestamp):
+    return timestamp.strftime("%Y-%m") if timestamp is not None else ""
+
+
+def _month(column):
+    if db.session.get_bind().dialect.name == "postgresql":
+        return db.func.to_char(column, "YYYY-MM")
+    return db.func.strftime("%Y-%m", column)
+
+
+def _key(dimension):
+    column = DIMENSIONS[dimension]
+    if column is None:
+        return db.literal("")
+    return db.func.coalesce(db.cast(column, db.String), "")
+
+
+def _source_select(dimension, where=None):
+    """
+    Selects the rollup rows of dimension from the internet records matching where
+    """
+    key = _key(dimension)
+    period = db.func.coalesce(_month(Internet.timestamp), "")
+    deal_status = db.func.coalesce(Internet.deal_status, "")
+    stmt = (
+        db.select(
+            db.literal(dimension).label("dimension"),
+            key.label("key"),
+            period.label("period"),
+            deal_status.label("deal_status"),
+            db.func.count().label("records"),
+            db.func.coalesce(db.func.sum(Internet.isp_price_amount), 0).label("amount"),
+        )
+        .select_from(Internet)
+        .join(Client, Client.client_id == Internet.client_id)
+        .outerjoin(BuildingOffice, BuildingOffice.office_id == Client.office_id)
+        .group_by(key, period, deal_status)
+    )
+    if where is not None:
+        stmt = stmt.where(where)
+    return stmt
+
+
+def _period_range(period):
+    """
+    Condition on Internet.timestamp selecting the records of period
+    """
+    if period == "":
+        return Internet.timestamp.is_(None)
+    start = datetime.strptime(period, "%Y-%m")
+    end = start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    return db.and_(Internet.timestamp >= start, Internet.timestamp < end)
+
+
+def _group_conditions(dimension, groups):
+    """
+    Returns (condition on pipeline_rollup, condition on the source rows)
+    selecting the (key, period) groups of dimension
+    """
+    table = PipelineRollup.__table__
+    stale, source = [], []
+    for key, period in groups:
+        stale_terms, source_terms = [], []
+        if key is not ANY:
+            stale_terms.append(table.c.key == key)
+            source_terms.append(_key(dimension) == key)
+        if period is not ANY:
+            stale_terms.append(table.c.period == period)
+            source_terms.append(_period_range(period))
+        if not stale_terms:
+            return db.true(), db.true()
+        stale.append(db.and_(*stale_terms))
+        source.append(db.and_(*source_terms))
+    return db.or_(*stale), db.or_(*source)
+
+
+def refresh(groups=None):
+    """
+    Recomputes the given {dimension: {(key, period)}} groups, where key or
+    period may be ANY; everything when groups is None
+    """
+    table = PipelineRollup.__table__
+    names = [column.key for column in table.columns]
+    if db.session.get_bind().dialect.name == "postgresql":
+        db.session.execute(db.select(db.func.pg_advisory_xact_lock(_LOCK_KEY)))
+    if groups is None:
+        db.session.execute(table.delete())
+        for dimension in DIMENSIONS:
+            db.session.execute(table.insert().from_select(names, _source_select(dimension)))
+    else:
+        for dimension, keys in groups.items():
+            if not keys:
+                continue
+            stale, source = _group_conditions(dimension, keys)
+            db.session.execute(
+                table.delete().where(table.c.dimension == dimension, stale)
+            )
+            db.session.execute(
+                table.insert().from_select(names, _source_select(dimension, source))
+            )
+    bump_versions(table.name)
+
+
+def _locations(client_ids, office_ids, deleted):
+    """
+    Returns ({client_id: (building_id, office_id)}, {office_id: industry})
+    for the given clients, their offices and the given offices
+
+    deleted maps the ids of clients deleted in this transaction to their
+    last row image
+    """
+    locations = {
+        client_id: (values.get("building_id"), values.get("office_id"))
+        for client_id, values in deleted.items()
+    }
+    wanted = set(client_ids) - locations.keys()
+    if wanted:
+        locations.update(
+            (client_id, (building_id, office_id))
+            for client_id, building_id, office_id in db.session.execute(
+                db.select(Client.client_id, Client.building_id, Client.office_id)
+                .where(Client.client_id.in_(sorted(wanted)))
+            )
+        )
+    office_ids = set(office_ids) | {office_id for _, office_id in locations.values()}
+    industries = dict(
+        db.session.execute(
+            db.select(BuildingOffice.office_id, BuildingOffice.industry_category)
+            .where(BuildingOffice.office_id.in_(sorted(office_ids - {None})))
+        ).all()
+    ) if office_ids - {None} else {}
+    return locations, industries
+
+
+def _affected(changes):
+    """
+    Returns {dimension: {(key, period)}} of the groups changes touched,
+    None when they cannot be told apart
+    """
+    groups = {dimension: set() for dimension in DIMENSIONS}
+    facts = []
+    moved = []
+    deleted = {}
+    emptied = set()
+    for change in changes:
+        if change.identity is None:
+            return None
+        if change.model is Internet:
+            images = [change.values]
+            if change.previous:
+                images.append({**change.values, **change.previous})
+            for image in images:
+                if not {"client_id", "isp_name", "timestamp"} <= image.keys():
+                    return None
+                facts.append(
+                    (image["client_id"], image["isp_name"], _period_of(image["timestamp"]))
+                )
+            if change.op == "delete":
+                emptied.add(change.values["client_id"])
+        elif change.model is Client:
+            if change.op == "delete":
+                deleted[change.identity] = change.values
+            elif change.op == "update" and (
+                {"building_id", "office_id"} & change.previous.keys()
+            ):
+                moved.append((change.values, {**change.values, **change.previous}))
+        elif change.model is BuildingOffice:
+            if change.op == "delete":
+                return None
+            if "industry_category" in change.previous:
+                for image in (change.values, change.previous):
+                    groups["industry"].add((image.get("industry_category") or "", ANY))
+        elif change.model is Building and change.op == "delete":
+            return None
+
+    # a client deleted without its internet records was emptied by the
+    # database cascade, which records nothing
+    if deleted.keys() - emptied:
+        return None
+
+    client_ids = {client_id for client_id, _, _ in facts}
+    office_ids = {image.get("office_id") for pair in moved for image in pair}
+    locations, industries = _locations(client_ids, office_ids, deleted)
+    for client_id, isp_name, period in facts:
+        if client_id not in locations:
+            return None
+        building_id, office_id = locations[client_id]
+        groups["industry"].add((industries.get(office_id) or "", period))
+        groups["building"].add(("" if building_id is None else str(building_id), period))
+        groups["isp"].add((isp_name or "", period))
+        groups["month"].add(("", period))
+    for pair in moved:
+        for image in pair:
+            groups["building"].add((str(image.get("building_id") or ""), ANY))
+            groups["industry"].add((industries.get(image.get("office_id")) or "", ANY))
+    return groups
+
+
+@before_commit(Internet, Client, BuildingOffice, Building)
+def _refresh_rollups(changes):
+    groups = _affected(changes)
+    if groups is None or any(groups.values()):
+        refresh(groups)
+
+
+def reconcile():
+    """
+    Rebuilds the rollups from the source tables and returns how many rows
+    were missing, stale or superfluous
+    """
+    table = PipelineRollup.__table__
+
+    def snapshot():
+        return {tuple(row) for row in db.session.execute(db.select(table))}
+
+    before = snapshot()
+    refresh()
+    return len(before ^ snapshot())
+
+
+def pipeline_report(dimension, monthly, stmt_filter):
+    """
+    Sums the rollups of dimension per key and deal status, and per month
+    when monthly; stmt_filter(select) adds the caller's WHERE conditions
+    """
+    columns = []
+    if dimension != "month":
+        columns.append(PipelineRollup.key)
+    if monthly or dimension == "month":
+        columns.append(PipelineRollup.period)
+    columns.append(PipelineRollup.deal_status)
+
+    stmt = stmt_filter(
+        db.select(
+            *columns,
+            db.func.sum(PipelineRollup.records).label("records"),
+            db.func.sum(PipelineRollup.amount).label("amount"),
+        ).where(PipelineRollup.dimension == dimension)
+    )
+    return fetch_dicts(stmt.group_by(*columns).order_by(*columns))
+
+
+@click.command("reconcile-pipeline")
+@with_appcontext
+def reconcile_pipeline_command():
+    """Rebuild the pipeline rollups and report rows that had drifted."""
+    drifted = reconcile()
+    db.session.commit()
+    if drifted:
+        logger.warning("pipeline_rollup had %s drifted rows", drifted)
+    click.echo(f"pipeline_rollup reconciled, {drifted} rows had drifted")
@@ -0,0 +1,109 @@
+from datetime import date, datetime
+from flask import g, request
+from database import db
+
+"""
+Read-only fast path for list endpoints
+
+Selects exactly the columns a model's to_dict exposes, or the subset a
+request names in ?fields=, and turns the rows into dicts directly,
+skipping model instances, the identity map and attribute instrumentation.
+Queries run on a per-request connection that never goes through the
+session, so nothing is autoflushed, and on Postgres the transaction is
+opened READ ONLY.
+"""
+
+
+def read_connection():
+    """
+    Returns the request's read-only connection, opening it on first use
+    """
+    if "read_connection" not in g:
+        conn = db.engine.connect()
+        if conn.dialect.name == "postgresql":
+            conn = conn.execution_options(postgresql_readonly=True)
+        g.read_connection = conn
+    return g.read_connection
+
+
+def close_read_connection(exc=None):
+    """
+    Teardown handler returning the read-only connection to the pool
+    """
+    conn = g.pop("read_connection", None)
+    if conn is not None:
+        conn.close()
+
+
+def _converter(column):
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        # untyped expressions such as function calls
+        return None
+    if python_type in (date, datetime):
+        return lambda value: value.isoformat() if value is not None else None
+    return None
+
+
+def columns_for(model, fields=None):
+    """
+    Returns the column attributes behind to_dict, or behind fields when given
+    """
+    return [getattr(model, field) for field in fields or model.serialized_fields]
+
+
+def fetch_dicts(stmt):
+    """
+    Runs a column select and returns its rows as to_dict-shaped dictionaries
+    """
+    result = read_connection().execute(stmt)
+    keys = list(result.keys())
+    converters = [
+        (index, convert)
+        for index, column in enumerate(stmt.selected_columns)
+        if (convert := _converter(column)) is not None
+    ]
+
+    rows = []
+    for row in result:
+        values = list(row)
+        for index, convert in converters:
+            values[index] = convert(values[index])
+        rows.append(dict(zip(keys, values)))
+    return rows
+
+
+def fetch_column(stmt):
+    """
+    Runs a single column select and returns its values as a list
+    """
+    return read_connection().execute(stmt).scalars().all()
+
+
+def requested_fields(model, param="fields"):
+    """
+    Reads ?fields=a,b,c naming which of model's serialized fields to return
+
+    Returns None when the parameter is absent, meaning every field; raises
+    ValueError naming any field model does not serialize
+    """
+    raw = request.args.get(param)
+    if raw is None:
+        return None
+
+    fields = list(dict.fromkeys(field.strip() for field in raw.split(",") if field.strip()))
+    unknown = [field for field in fields if field not in model.serialized_fields]
+    if unknown or not fields:
+        raise ValueError(
+            f"unknown fields: {', '.join(unknown) or '(none given)'}; "
+            f"expected some of: {', '.join(model.serialized_fields)}"
+        )
+    return fields
+
+
+def select_model(model, fields=None):
+    """
+    Starts a select of model's serialized columns
+    """
+    return db.select(*columns_for(model, fields))
@@ -0,0 +1,133 @@
+from database import db
+from models.clientModel import Client
+from models.internetModel import Internet
+from models.meetingModel import Meeting
+from models.office import BuildingOffice
+from models.buildingModel import Building
+from services.hooks import record
+from services.jobs import job
+
+"""
+Set-based deletes for the delete endpoints
+
+Every helper issues one DELETE per table instead of loading rows and
+deleting them one by one, and reports how many rows each table lost.
+"""
+
+# children first, so the deletes also work where foreign keys are not enforced
+TABLES = [
+    ("meetings", Meeting),
+    ("internet_records", Internet),
+    ("clients", Client),
+    ("offices", BuildingOffice),
+    ("buildings", Building),
+]
+
+
+def delete_rows(model, where):
+    """
+    Deletes the rows of model matching where with DELETE ... RETURNING
+
+    The returned rows are recorded for the commit hooks, so listeners see
+    the same row images an ORM delete would give them
+    """
+    key = model.__mapper__.primary_key[0].key
+    rows = db.session.execute(
+        db.delete(model)
+        .where(where)
+        .returning(*model.__table__.columns)
+        .execution_options(synchronize_session=False, hooks_recorded=True)
+    ).all()
+
+    for row in rows:
+        values = dict(row._mapping)
+        record(db.session, model, "delete", values[key], values)
+    return len(rows)
+
+
+def delete_client(client_id):
+    """
+    Deletes a client with its meetings and internet records
+    """
+    return {
+        "meetings": delete_rows(Meeting, Meeting.client_id == client_id),
+        "internet_records": delete_rows(Internet, Internet.client_id == client_id),
+        "clients": delete_rows(Client, Client.client_id == client_id),
+    }
+
+
+def delete_office(office_id):
+    """
+    Deletes an office and every client located in it
+    """
+    client_ids = db.select(Client.client_id).where(Client.office_id == office_id)
+    return {
+        "meetings": delete_rows(Meeting, Meeting.client_id.in_(client_ids)),
+        "internet_records": delete_rows(Internet, Internet.client_id.in_(client_ids)),
+        "clients": delete_rows(Client, Client.client_id.in_(client_ids)),
+        "offices": delete_rows(BuildingOffice, BuildingOffice.office_id == office_id),
+    }
+
+
+def delete_building(building_id):
+    """
+    Deletes a building, its offices and every client located in either
+    """
+    office_ids = db.select(BuildingOffice.office_id).where(
+        BuildingOffice.building_id == building_id
+    )
+    client_ids = db.select(Client.client_id).where(
+        (Client.building_id == building_id) | Client.office_id.in_(office_ids)
+    )
+    return {
+        "meetings": delete_rows(Meeting, Meeting.client_id.in_(client_ids)),
+        "internet_records": delete_rows(Internet, Internet.client_id.in_(client_ids)),
+        "clients": delete_rows(Client, Client.client_id.in_(client_ids)),
+        "offices": delete_rows(BuildingOffice, BuildingOffice.building_id == building_id),
+        "buildings": delete_rows(Building, Building.building_id == building_id),
+    }
+
+
+def clear_all(progress=None):
+    """
+    Empties every sales table
+
+    Postgres truncates them in one TRUNCATE ... CASCADE after counting the
+    rows; other databases get one unfiltered DELETE per table. progress,
+    when given, is called with (tables done, tables in total).
+    """
+    progress = progress or (lambda done, total: None)
+    if db.session.get_bind().dialect.name != "postgresql":
+        counts = {}
+        for done, (name, model) in enumerate(TABLES):
+            progress(done, len(TABLES))
+            counts[name] = db.session.execute(
+                db.delete(model).execution_options(synchronize_session=False)
+            ).rowcount
+        progress(len(TABLES), len(TABLES))
+        return counts
+
+    progress(0, len(TABLES))
+
+    counts = db.session.execute(
+        db.select(
+            *(
+                db.select(db.func.count()).select_from(model).scalar_subquery().label(name)
+                for name, model in TABLES
+            )
+        )
+    ).one()._asdict()
+
+    tables = ", ".join(model.__tablename__ for _, model in TABLES)
+    db.session.execute(db.text(f"TRUNCATE {tables} CASCADE"))
+    for _, model in TABLES:
+        record(db.session, model, "delete")
+    progress(len(TABLES), len(TABLES))
+    return counts
+
+
+@job("clear_all")
+def clear_all_job(context):
+    deleted = clear_all(context.progress)
+    db.session.commit()
+    return {"deleted": deleted}
@@ -0,0 +1,189 @@
+import re
+import time
+from decimal import Decimal, InvalidOperation
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import bindparam, event
+from database import db
+from models.internetModel import Internet
+from services.etag import bump_versions
+from services.projection import fetch_dicts
+
+"""
+Numeric internet prices and the revenue report built on them
+
+isp_price is free text as typed in the entry form ("4500", "4,500",
+"KES 4,500/="), so Internet.isp_price_amount holds the same price as a
+NUMERIC. Every insert or update through the ORM writes both columns; rows
+written before the column existed are converted by 'flask
+backfill-isp-price', in short batches so no long lock is held on the
+internet table. Prices that do not read as exactly one number stay NULL
+and are left out of the report.
+
+The backfill writes with Core statements, so the commit hooks never see
+it: each batch bumps the internet table version itself, but the change
+log is not fed and the pipeline rollups keep their old amounts. Run
+'flask reconcile-pipeline' once the backfill has finished.
+
+The report groups, sums, averages and takes percentiles in the database:
+percentiles are the nearest-rank values picked with window functions,
+which Postgres and SQLite both have, instead of percentile_cont, which
+SQLite lacks.
+"""
+
+GROUPS = {
+    "isp_name": Internet.isp_name,
+    "service_provided": Internet.service_provided,
+    "deal_status": Internet.deal_status,
+}
+
+DEFAULT_PERCENTILES = (50, 90)
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+_CENTS = Decimal("0.01")
+# smallest amount too large for NUMERIC(precision, scale)
+_LIMIT = Decimal(10) ** (
+    Internet.isp_price_amount.type.precision - Internet.isp_price_amount.type.scale
+)
+
+
+def parse_price(value):
+    """
+    Reads a price typed as text into a Decimal, None when it holds no
+    single number or one isp_price_amount cannot store
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float, Decimal)):
+        text = str(value)
+    else:
+        numbers = _NUMBER.findall(str(value).replace(",", ""))
+        if len(numbers) != 1:
+            return None
+        text = numbers[0]
+    try:
+        amount = Decimal(text)
+        if not amount.is_finite() or abs(amount) >= _LIMIT:
+            return None
+        amount = amount.quantize(_CENTS)
+    except InvalidOperation:
+        return None
+    # rounding to cents may carry into one more digit
+    return amount if abs(amount) < _LIMIT else None
+
+
+@event.listens_for(Internet, "before_insert")
+@event.listens_for(Internet, "before_update")
+def _write_amount(mapper, connection, target):
+    target.isp_price_amount = parse_price(target.isp_price)
+
+
+def backfill_batch(after, batch_size):
+    """
+    Converts the next batch of unconverted prices with internet_id > after
+
+    Returns (rows read, rows converted, last internet_id read or None when
+    nothing was left); the caller commits
+    """
+    table = Internet.__table__
+    rows = db.session.execute(
+        db.select(table.c.internet_id, table.c.isp_price)
+        .where(
+            table.c.isp_price_amount.is_(None),
+            table.c.isp_price.is_not(None),
+            table.c.internet_id > after,
+        )
+        .order_by(table.c.internet_id)
+        .limit(batch_size)
+    ).all()
+    if not rows:
+        return 0, 0, None
+
+    # parse_price leaves out amounts the column cannot store, as on writes
+    updates = [
+        {"id": internet_id, "price": price, "amount": amount}
+        for internet_id, price in rows
+        if (amount := parse_price(price)) is not None
+    ]
+    if updates:
+        # a row edited since it was read already got its amount from the
+        # ORM listener and is left alone
+        db.session.execute(
+            table.update()
+            .where(
+                table.c.internet_id == bindparam("id"),
+                table.c.isp_price == bindparam("price"),
+                table.c.isp_price_amount.is_(None),
+            )
+            .values(isp_price_amount=bindparam("amount")),
+            updates,
+        )
+        # the commit hooks do not see Core updates; without the bump
+        # cached ETags of reports reading the amounts would stay valid
+        bump_versions(table.name)
+    return len(rows), len(updates), rows[-1].internet_id
+
+
+@click.command("backfill-isp-price")
+@click.option("--batch-size", default=1000, show_default=True,
+              help="Rows converted per transaction.")
+@click.option("--pause", default=0.05, show_default=True,
+              help="Seconds to sleep between batches.")
+@click.option("--after", default=0, show_default=True,
+              help="Resume after this internet_id.")
+@with_appcontext
+def backfill_isp_price_command(batch_size, pause, after):
+    """Fill isp_price_amount for rows written before it existed."""
+    read = converted = 0
+    while True:
+        count, done, last = backfill_batch(after, batch_size)
+        db.session.commit()
+        if last is None:
+            break
+        read, converted, after = read + count, converted + done, last
+        click.echo(f"converted {converted} of {read} rows, up to internet_id {after}")
+        time.sleep(pause)
+    click.echo(f"done: {converted} converted, {read - converted} left NULL")
+
+
+def revenue_report(stmt_filter, group_by, percentiles):
+    """
+    Returns one dict per group with record count, total, average and the
+    requested percentiles of isp_price_amount
+
+    stmt_filter(select) adds the caller's WHERE conditions
+    """
+    keys = [GROUPS[name].label(name) for name in group_by]
+    amount = Internet.isp_price_amount
+    partition = [GROUPS[name] for name in group_by] or None
+
+    ranked = stmt_filter(
+        db.select(
+            *keys,
+            amount.label("amount"),
+            db.func.row_number()
+            .over(partition_by=partition, order_by=amount)
+            .label("position"),
+            db.func.count().over(partition_by=partition).label("size"),
+        ).where(amount.is_not(None))
+    ).subquery("ranked")
+
+    columns = [ranked.c[name] for name in group_by]
+    aggregates = [
+        db.func.count().label("records"),
+        db.func.sum(ranked.c.amount).label("total"),
+        db.func.round(
+            db.func.avg(ranked.c.amount), 2, type_=Internet.isp_price_amount.type
+        ).label("average"),
+    ]
+    for p in percentiles:
+        # nearest rank: the ceil(p% of size)-th value, in integer arithmetic
+        rank = (ranked.c.size * p + 99) // 100
+        aggregates.append(
+            db.func.max(
+                db.case((ranked.c.position == rank, ranked.c.amount))
+            ).label(f"p{p}")
+        )
+
+    stmt = db.select(*columns, *aggregates).group_by(*columns).order_by(*columns)
+    return fetch_dicts(stmt)
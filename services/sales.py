@@ -0,0 +1,235 @@
+from datetime import date
+from sqlalchemy.exc import DataError, IntegrityError, SQLAlchemyError
+from database import db
+from models.clientModel import Client
+from models.internetModel import Internet
+from models.meetingModel import Meeting
+from models.office import BuildingOffice
+from models.buildingModel import Building
+from services.jobs import job
+
+"""
+Builds the rows of a sales submission from the payload sent by the entry form
+"""
+
+# payload keys that map onto non-nullable columns
+BUILDING_FIELDS = [
+    "building_name",
+    "is_fibre_setup",
+    "ease_of_access",
+    "more_info_access",
+    "number_offices",
+]
+OFFICE_FIELDS = ["office_name", "office_floor", "number_staff", "industry", "more_offices"]
+SALE_FIELDS = [
+    "client_name",
+    "contact",
+    "client_email",
+    "job",
+    "deal_info",
+    "meetingDate",
+    "meetingLocation",
+    "meetingType",
+    "meetingRemarks",
+    "meetingStatus",
+    "is_connected",
+]
+
+
+def new_building(data):
+    return Building(
+        building_name=data.get("building_name"),
+        is_fibre_setup=data.get("is_fibre_setup"),
+        ease_of_access=data.get("ease_of_access"),
+        access_information=data.get("more_info_access"),
+        number_offices=data.get("number_offices"),
+    )
+
+
+def new_office(data, building):
+    return BuildingOffice(
+        office_name=data.get("office_name"),
+        office_floor=data.get("office_floor"),
+        staff_number=data.get("number_staff"),
+        industry_category=data.get("industry"),
+        more_data_on_office=data.get("more_offices"),
+        located=building,
+    )
+
+
+def new_sale(data, building, office):
+    """
+    Creates the client together with its meeting and internet records
+    """
+    # client information fetched from frontend
+    client = Client(
+        client_name=data.get("client_name"),
+        client_contact=data.get("contact"),
+        client_email=data.get("client_email"),
+        job_title=data.get("job"),
+        deal_information=data.get("deal_info"),
+        office=office,
+        building=building,
+    )
+
+    # meeting information fetched from frontend
+    Meeting(
+        meeting_date=data.get("meetingDate"),
+        meeting_location=data.get("meetingLocation"),
+        meetingtype=data.get("meetingType"),
+        meeting_remarks=data.get("meetingRemarks"),
+        meeting_status=data.get("meetingStatus"),
+        attends=client,
+    )
+
+    # internet information
+    Internet(
+        is_isp_connected=data.get("is_connected"),
+        isp_name=data.get("isp_name"),
+        internet_connection_type=data.get("connection_type"),
+        service_provided=data.get("product"),
+        isp_price=data.get("net_price"),
+        deal_status=data.get("deal_status"),
+        hasinternet=client,
+    )
+    return client
+
+
+def missing_fields(data, needs_building, needs_office):
+    """
+    Lists the required payload keys that are absent or empty
+    """
+    required = list(SALE_FIELDS)
+    if needs_building:
+        required += BUILDING_FIELDS
+    if needs_office:
+        required += OFFICE_FIELDS
+    return [key for key in required if data.get(key) in (None, "")]
+
+
+def parse_meeting_date(data):
+    """
+    Returns a copy of the payload with meetingDate converted to a date
+
+    Raises ValueError when the date is not in YYYY-MM-DD format
+    """
+    value = data.get("meetingDate")
+    if isinstance(value, str):
+        data = dict(data, meetingDate=date.fromisoformat(value))
+    return data
+
+
+def save_batch(items):
+    """
+    Saves a list of /salesdetails payloads
+
+    Buildings and offices referenced by the batch are resolved with one
+    query each and every row is inserted in a single flush, which the ORM
+    sends to Postgres as batched multi-row INSERT ... RETURNING statements
+    per table. Valid items are committed together.
+
+    Returns (payload, status) with the outcome of every item
+    """
+    items = [item if isinstance(item, dict) else {} for item in items]
+
+    building_names = {item.get("building_name") for item in items} - {None}
+    buildings = {
+        building.building_name: building
+        for building in db.session.execute(
+            db.select(Building).where(Building.building_name.in_(building_names))
+        ).scalars()
+    }
+
+    office_names = {item.get("office_name") for item in items} - {None}
+    offices = {
+        office.office_name: office
+        for office in db.session.execute(
+            db.select(BuildingOffice).where(BuildingOffice.office_name.in_(office_names))
+        ).scalars()
+    }
+
+    results = []
+    created = []
+
+    for index, data in enumerate(items):
+        missing = missing_fields(
+            data,
+            needs_building=data.get("building_name") not in buildings,
+            needs_office=data.get("office_name") not in offices,
+        )
+        if missing:
+            results.append(
+                {
+                    "index": index,
+                    "success": False,
+                    "message": "Missing fields: " + ", ".join(missing),
+                }
+            )
+            continue
+
+        try:
+            data = parse_meeting_date(data)
+        except ValueError:
+            results.append(
+                {
+                    "index": index,
+                    "success": False,
+                    "message": "meetingDate must be in YYYY-MM-DD format",
+                }
+            )
+            continue
+
+        # later items naming the same new building or office reuse it
+        building = buildings.get(data["building_name"])
+        if building is None:
+            building = buildings[data["building_name"]] = new_building(data)
+
+        office = offices.get(data["office_name"])
+        if office is None:
+            office = offices[data["office_name"]] = new_office(data, building)
+
+        client = new_sale(data, building, office)
+        db.session.add(client)
+        created.append((index, client))
+        results.append({"index": index, "success": True})
+
+    if not created:
+        return {"success": False, "message": "No valid submissions", "results": results}, 400
+
+    try:
+        db.session.flush()
+        client_ids = {index: client.client_id for index, client in created}
+        db.session.commit()
+    except (IntegrityError, DataError) as e:
+        db.session.rollback()
+        return {"success": False, "message": f"Data error: {e.orig}"}, 400
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return {"success": False, "message": f"Unexpected database error occured \n {e}"}, 500
+
+    for result in results:
+        if result["success"]:
+            result["client_id"] = client_ids[result["index"]]
+
+    failed = len(results) - len(created)
+    return (
+        {
+            "success": failed == 0,
+            "message": f"Added {len(created)} of {len(results)} submissions",
+            "results": results,
+        },
+        201 if failed == 0 else 207,
+    )
+
+
+@job("bulk_import")
+def bulk_import_job(context):
+    """
+    Runs save_batch for a queued /salesdetails/bulk?async=1 request; the
+    result is the body the synchronous endpoint would have sent
+    """
+    items = context.params["items"]
+    context.progress(0, len(items))
+    payload, status = save_batch(items)
+    context.progress(len(items), len(items))
+    return dict(payload, status=status)
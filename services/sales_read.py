@@ -0,0 +1,167 @@
+from collections import defaultdict
+from flask import request
+from database import db
+from models.clientModel import Client
+from models.internetModel import Internet
+from models.meetingModel import Meeting
+from models.office import BuildingOffice
+from models.buildingModel import Building
+from services.pagination import keyset_page, split_page
+from services.projection import columns_for, fetch_dicts
+
+"""
+Column-projected reads of combined sales records for /sales and /sales/<id>
+
+A sale is a client with its meetings, internet records, building and
+office. The client row is selected together with its building and office
+columns in one query, meetings and internet records with one query each
+for the whole page. ?fields= narrows every one of those SELECTs:
+
+    /sales?fields=client.client_id,client.client_name,internet_records.deal_status
+
+Each entry is section.field, or a bare section name for all of its fields;
+sections that are not named are neither queried nor returned.
+"""
+
+SECTIONS = {
+    "client": Client,
+    "meetings": Meeting,
+    "internet_records": Internet,
+    "buildings": Building,
+    "offices": BuildingOffice,
+}
+
+# count keys reported next to the list sections
+_TOTALS = {"meetings": "total_meetings", "internet_records": "total_internet_records"}
+
+_KEY = "_client_id"
+
+
+def requested_sections(param="fields"):
+    """
+    Reads ?fields= into {section: field list, None for every field}
+
+    Returns None when the parameter is absent; raises ValueError for unknown
+    sections or fields
+    """
+    raw = request.args.get(param)
+    if raw is None:
+        return None
+
+    sections = {}
+    for item in (item.strip() for item in raw.split(",")):
+        if not item:
+            continue
+        section, _, field = item.partition(".")
+        model = SECTIONS.get(section)
+        if model is None:
+            raise ValueError(
+                f"unknown section in {item}; fields are section.field with "
+                f"section one of: {', '.join(SECTIONS)}"
+            )
+        if not field:
+            sections[section] = None
+            continue
+        if field not in model.serialized_fields:
+            raise ValueError(
+                f"unknown field {item}; {section} has: {', '.join(model.serialized_fields)}"
+            )
+        if section in sections and sections[section] is None:
+            continue
+        if field not in sections.setdefault(section, []):
+            sections[section].append(field)
+
+    if not sections:
+        raise ValueError("fields names no section")
+    return sections
+
+
+def _labelled(section, fields):
+    return [
+        column.label(f"{section}.{column.key}")
+        for column in columns_for(SECTIONS[section], fields)
+    ]
+
+
+def _take(row, section):
+    prefix = f"{section}."
+    return {key[len(prefix):]: value for key, value in row.items() if key.startswith(prefix)}
+
+
+def _children(section, foreign_key, client_ids, fields):
+    model = SECTIONS[section]
+    key = model.__mapper__.primary_key[0]
+    rows = fetch_dicts(
+        db.select(foreign_key.label(_KEY), *columns_for(model, fields))
+        .where(foreign_key.in_(client_ids))
+        .order_by(key)
+    )
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[row.pop(_KEY)].append(row)
+    return grouped
+
+
+def load_sales(where=None, sections=None, after=None, limit=None):
+    """
+    Returns (sales, next_after) for the clients matching where
+
+    With a limit the clients are paged by client_id as in services.pagination;
+    next_after is None on the last page or when no limit is given.
+    """
+    sections = sections or dict.fromkeys(SECTIONS)
+
+    columns = [Client.client_id.label(_KEY)]
+    if "client" in sections:
+        columns += _labelled("client", sections["client"])
+    if "buildings" in sections:
+        columns += [Building.building_id.label("_building_id")]
+        columns += _labelled("buildings", sections["buildings"])
+    if "offices" in sections:
+        columns += [BuildingOffice.office_id.label("_office_id")]
+        columns += _labelled("offices", sections["offices"])
+
+    stmt = db.select(*columns).select_from(Client)
+    if "buildings" in sections:
+        stmt = stmt.outerjoin(Building, Building.building_id == Client.building_id)
+    if "offices" in sections:
+        stmt = stmt.outerjoin(BuildingOffice, BuildingOffice.office_id == Client.office_id)
+    if where is not None:
+        stmt = stmt.where(where)
+
+    if limit is None:
+        rows, next_after = fetch_dicts(stmt.order_by(Client.client_id)), None
+    else:
+        rows, next_after = split_page(
+            fetch_dicts(keyset_page(stmt, Client.client_id, after, limit)),
+            limit,
+            lambda row: row[_KEY],
+        )
+
+    client_ids = [row[_KEY] for row in rows]
+    children = {}
+    if client_ids and "meetings" in sections:
+        children["meetings"] = _children(
+            "meetings", Meeting.client_id, client_ids, sections["meetings"]
+        )
+    if client_ids and "internet_records" in sections:
+        children["internet_records"] = _children(
+            "internet_records", Internet.client_id, client_ids, sections["internet_records"]
+        )
+
+    sales = []
+    for row in rows:
+        sale = {}
+        if "client" in sections:
+            sale["client"] = _take(row, "client")
+        for section, total in _TOTALS.items():
+            if section in sections:
+                records = children.get(section, {}).get(row[_KEY], [])
+                sale[section] = records
+                sale[total] = len(records)
+        if "buildings" in sections:
+            sale["buildings"] = [_take(row, "buildings")] if row["_building_id"] is not None else []
+        if "offices" in sections:
+            sale["offices"] = [_take(row, "offices")] if row["_office_id"] is not None else []
+        sales.append(sale)
+    return sales, next_after
@@ -0,0 +1,184 @@
+import re
+from sqlalchemy import DDL, event, func, literal_column, union_all
+from database import db
+from models.clientModel import Client
+from models.meetingModel import Meeting
+from models.office import BuildingOffice
+from models.buildingModel import Building
+from services.projection import fetch_dicts, read_connection
+
+"""
+Ranked full-text search over clients and the records around them
+
+On Postgres every searched table carries a stored, generated tsvector
+column with a GIN index; on SQLite an external-content FTS5 table kept in
+sync by triggers plays the same part. Both are created alongside the
+tables by create_all and by migration 5c1f0e7a9b42 for existing databases.
+
+A query is split into words that are OR-ed together, since the words of
+"clinic 4th floor dedicated fibre" are spread over the office, the client
+and the meeting remarks. Every match is attributed to a client and the
+per-entity scores are summed, so clients matching more of the words in
+more places rank first.
+"""
+
+# searched columns and their weight class, A ranks highest
+SEARCHED = {
+    Client: (("client_name", "A"), ("deal_information", "B")),
+    BuildingOffice: (("office_name", "A"), ("more_data_on_office", "B")),
+    Meeting: (("meeting_remarks", "B"),),
+    Building: (("access_information", "C"),),
+}
+
+# Postgres' default ts_rank weights, reused as FTS5 bm25 column weights
+_WEIGHTS = {"A": 1.0, "B": 0.4, "C": 0.2, "D": 0.1}
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def _fts_table(model):
+    return f"{model.__tablename__}_fts"
+
+
+def _postgres_ddl(model, fields):
+    table = model.__tablename__
+    vector = " || ".join(
+        f"setweight(to_tsvector('english', coalesce({column}, '')), '{weight}')"
+        for column, weight in fields
+    )
+    return [
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({vector}) STORED",
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector "
+        f"ON {table} USING gin (search_vector)",
+    ]
+
+
+def _sqlite_ddl(model, fields):
+    table = model.__tablename__
+    fts = _fts_table(model)
+    key = model.__mapper__.primary_key[0].name
+    columns = ", ".join(column for column, _ in fields)
+    new = ", ".join(f"new.{column}" for column, _ in fields)
+    old = ", ".join(f"old.{column}" for column, _ in fields)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, "
+        f"content='{table}', content_rowid='{key}', tokenize='porter unicode61')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.{key}, {new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) "
+        f"VALUES ('delete', old.{key}, {old}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columns} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) "
+        f"VALUES ('delete', old.{key}, {old}); "
+        f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.{key}, {new}); END",
+    ]
+
+
+for _model, _fields in SEARCHED.items():
+    for _statement in _postgres_ddl(_model, _fields):
+        event.listen(
+            _model.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql")
+        )
+    for _statement in _sqlite_ddl(_model, _fields):
+        event.listen(
+            _model.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite")
+        )
+    # the FTS table is not part of the metadata, drop_all would leave it stale
+    event.listen(
+        _model.__table__,
+        "before_drop",
+        DDL(f"DROP TABLE IF EXISTS {_fts_table(_model)}").execute_if(dialect="sqlite"),
+    )
+
+
+def search_terms(q):
+    """
+    Returns the words of a query, lower-cased and de-duplicated
+    """
+    return list(dict.fromkeys(word.lower() for word in _WORD.findall(q or "")))
+
+
+def _matches(model, fields, terms, dialect):
+    """
+    Returns (key column, score, from clause, match condition) for one table
+    """
+    table = model.__tablename__
+    key = model.__mapper__.primary_key[0]
+
+    if dialect == "postgresql":
+        vector = literal_column(f"{table}.search_vector")
+        query = func.to_tsquery("english", " | ".join(terms))
+        return key, func.ts_rank(vector, query), model, vector.op("@@")(query)
+
+    fts = db.table(_fts_table(model), db.column("rowid"))
+    weights = [_WEIGHTS[weight] for _, weight in fields]
+    query = " OR ".join(f'"{term}"' for term in terms)
+    return (
+        key,
+        # bm25 is lower for better matches
+        -func.bm25(literal_column(fts.name), *weights),
+        db.join(model, fts, fts.c.rowid == key),
+        literal_column(fts.name).op("MATCH")(query),
+    )
+
+
+def _client_scores(terms, dialect):
+    """
+    One row per (client, matching record) with that record's score
+    """
+    selects = []
+    for model, fields in SEARCHED.items():
+        key, score, source, condition = _matches(model, fields, terms, dialect)
+        if model is Client:
+            stmt = db.select(Client.client_id, score.label("score")).select_from(source)
+        elif model is Meeting:
+            stmt = db.select(Meeting.client_id.label("client_id"), score.label("score"))
+            stmt = stmt.select_from(source).where(Meeting.client_id.is_not(None))
+        else:
+            # an office or building match counts for every client located there
+            foreign_key = Client.office_id if model is BuildingOffice else Client.building_id
+            stmt = db.select(Client.client_id, score.label("score")).select_from(
+                db.join(source, Client, foreign_key == key)
+            )
+        selects.append(stmt.where(condition))
+    return union_all(*selects).subquery("matches")
+
+
+def search_clients(q, limit, offset=0):
+    """
+    Returns one page of clients matching q, best first
+
+    The page holds up to limit rows after skipping offset, plus one more row
+    when a next page exists; callers trim it with split_page.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return []
+
+    dialect = read_connection().dialect.name
+    matches = _client_scores(terms, dialect)
+    ranked = (
+        db.select(matches.c.client_id, func.sum(matches.c.score, type_=db.Float).label("score"))
+        .group_by(matches.c.client_id)
+        .subquery("ranked")
+    )
+    stmt = (
+        db.select(
+            Client.client_id,
+            Client.client_name,
+            Client.deal_information,
+            BuildingOffice.office_name,
+            BuildingOffice.office_floor,
+            Building.building_name,
+            ranked.c.score,
+        )
+        .join(ranked, ranked.c.client_id == Client.client_id)
+        .join(BuildingOffice, BuildingOffice.office_id == Client.office_id)
+        .join(Building, Building.building_id == Client.building_id)
+        .order_by(ranked.c.score.desc(), Client.client_id)
+        .limit(limit + 1)
+        .offset(offset)
+    )
+    return fetch_dicts(stmt)
@@ -0,0 +1,81 @@
+import pytest
+from benchmarks.seed import seed
+from database import db
+from main import create_app
+from models.clientModel import Client
+
+"""
+Shared fixtures: an app on a fresh in-memory database seeded with
+benchmarks.seed, and a test client for it
+"""
+
+CLIENTS = 60
+BUILDINGS = 2
+
+
+@pytest.fixture
+def app():
+    app = create_app("testing")
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed(CLIENTS, buildings=BUILDINGS)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def office_id(app):
+    """
+    An office with clients in it, the one client 1 works in
+    """
+    with app.app_context():
+        return db.session.get(Client, 1).office_id
+
+
+def _sale(n, **overrides):
+    payload = {
+        "building_name": "Test building",
+        "is_fibre_setup": "Yes",
+        "ease_of_access": 3,
+        "more_info_access": "Ground floor reception",
+        "number_offices": 4,
+        "office_name": f"Test office {n}",
+        "office_floor": 2,
+        "number_staff": 12,
+        "industry": "Health",
+        "more_offices": "clinic",
+        "client_name": f"Test client {n}",
+        "contact": "0700000000",
+        "client_email": f"test{n}@example.com",
+        "job": "Manager",
+        "deal_info": "interested in dedicated fibre",
+        "meetingDate": "2025-03-01",
+        "meetingLocation": "On site",
+        "meetingType": "Physical",
+        "meetingRemarks": "wants a quote",
+        "meetingStatus": "Scheduled",
+        "is_connected": "Yes",
+        "isp_name": "Zuku",
+        "connection_type": "Shared",
+        "product": "Fibre",
+        "net_price": "4500",
+        "deal_status": "Pending",
+    }
+    payload.update(overrides)
+    return payload
+
+
+@pytest.fixture
+def sale():
+    """
+    Builds a /salesdetails payload for a new client numbered n
+    """
+    return _sale
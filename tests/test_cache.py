@@ -0,0 +1,120 @@
+import threading
+import time
+from database import db
+from models.clientModel import Client
+from services.cache import TTLCache
+
+"""
+TTLCache and the per-client document cache behind /sales/<id> and
+/client/<id>/complete
+"""
+
+
+def test_ttl_cache_hit_and_expiry():
+    cache = TTLCache()
+    calls = []
+    factory = lambda: calls.append(1) or len(calls)
+
+    assert cache.get_or_set("key", factory, ttl=60) == 1
+    assert cache.get_or_set("key", factory, ttl=60) == 1
+    assert cache.get_or_set("short", factory, ttl=0) == 2
+    assert cache.get("short") is None
+
+
+def test_ttl_cache_invalidate():
+    cache = TTLCache()
+    cache.get_or_set("a", lambda: "a", ttl=60)
+    cache.get_or_set("b", lambda: "b", ttl=60)
+
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    assert cache.get("b") == "b"
+
+    cache.invalidate()
+    assert cache.get("b") is None
+
+
+def test_ttl_cache_drops_value_computed_across_invalidate():
+    cache = TTLCache()
+
+    def factory():
+        # a commit lands while the value is being read
+        cache.invalidate()
+        return "stale"
+
+    assert cache.get_or_set("key", factory, ttl=60) == "stale"
+    assert cache.get("key") is None
+
+
+def test_ttl_cache_collapses_concurrent_misses():
+    cache = TTLCache()
+    calls = []
+
+    def factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return "value"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_set("key", factory, 60)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["value"] * 8
+    assert len(calls) == 1
+
+
+def _get(client, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    return response.headers["X-Cache"], response.get_json()
+
+
+def test_document_cache_hits_until_the_client_changes(client):
+    assert _get(client, "/sales/1")[0] == "miss"
+    assert _get(client, "/sales/1")[0] == "hit"
+
+    response = client.post("/update", json={
+        "category": "client",
+        "client_id": 1,
+        "field": "client_name",
+        "value": "Renamed",
+        "clientData": {"client": {"client_id": 1}},
+    })
+    assert response.status_code == 200
+
+    cache, body = _get(client, "/sales/1")
+    assert cache == "miss"
+    assert "Renamed" in str(body)
+    assert _get(client, "/sales/1")[0] == "hit"
+
+
+def test_document_cache_follows_children_and_location(app, client):
+    _get(client, "/client/1/complete")
+    _get(client, "/sales/2")
+
+    assert client.delete("/meeting/1").status_code == 200
+    assert _get(client, "/client/1/complete")[0] == "miss"
+    # another client's documents are untouched
+    assert _get(client, "/sales/2")[0] == "hit"
+
+    with app.app_context():
+        building_id = db.session.get(Client, 1).building_id
+    response = client.put(
+        f"/locations/building/{building_id}", json={"access_information": "Gate 4"}
+    )
+    assert response.status_code == 200
+    cache, body = _get(client, "/client/1/complete")
+    assert cache == "miss"
+    assert "Gate 4" in str(body)
+
+
+def test_document_cache_forgets_deleted_clients(client):
+    _get(client, "/sales/60")
+    assert client.delete("/client/60").status_code == 200
+    assert client.get("/sales/60").status_code == 404
@@ -0,0 +1,85 @@
+import pytest
+from database import db
+from models.clientModel import Client
+
+"""
+/changes must report every row a delete endpoint removed, including the
+children the database would have cascaded, so a syncing client drops them
+"""
+
+
+def _cursor(client):
+    return client.get("/changes").get_json()["cursor"]
+
+
+def _deleted(client, since):
+    body = client.get(f"/changes?since={since}&limit=1000").get_json()
+    assert body["success"] and not body["has_more"]
+    ops = {change["op"] for change in body["changes"]}
+    assert ops == {"delete"}, body["changes"]
+    deleted = {}
+    for change in body["changes"]:
+        deleted.setdefault(change["entity"], set()).add(change["entity_id"])
+    return deleted
+
+
+def _clients_of(app, **filters):
+    with app.app_context():
+        return set(db.session.execute(
+            db.select(Client.client_id).filter_by(**filters)
+        ).scalars())
+
+
+def test_delete_client(client):
+    since = _cursor(client)
+    assert client.delete("/client/60").status_code == 200
+    # seeded meetings and internet records share their client's id
+    assert _deleted(client, since) == {"client": {60}, "meeting": {60}, "internet": {60}}
+
+
+def test_delete_meeting(client):
+    since = _cursor(client)
+    assert client.delete("/meeting/50").status_code == 200
+    assert _deleted(client, since) == {"meeting": {50}}
+
+
+def test_delete_internet(client):
+    since = _cursor(client)
+    assert client.delete("/internet/50").status_code == 200
+    assert _deleted(client, since) == {"internet": {50}}
+
+
+@pytest.mark.parametrize("path", ["/office/{}", "/locations/office/{}"])
+def test_delete_office(app, client, office_id, path):
+    clients = _clients_of(app, office_id=office_id)
+    since = _cursor(client)
+
+    response = client.delete(path.format(office_id))
+    assert response.status_code == 200
+    assert response.get_json()["deleted"]["clients"] == len(clients)
+
+    assert _deleted(client, since) == {
+        "buildingoffice": {office_id},
+        "client": clients,
+        "meeting": clients,
+        "internet": clients,
+    }
+
+
+def test_delete_building(app, client):
+    clients = _clients_of(app, building_id=2)
+    since = _cursor(client)
+
+    assert client.delete("/locations/building/2").status_code == 200
+
+    deleted = _deleted(client, since)
+    assert deleted["building"] == {2}
+    assert deleted["buildingoffice"] == set(range(11, 21))
+    assert deleted["client"] == deleted["meeting"] == deleted["internet"] == clients
+
+
+def test_count_follows_office_delete(client, office_id):
+    before = client.get("/count").get_json()["data"]["client_count"]
+    removed = client.delete(f"/office/{office_id}").get_json()["deleted"]["clients"]
+    assert removed
+    assert client.get("/count").get_json()["data"]["client_count"] == before - removed
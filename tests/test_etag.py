@@ -0,0 +1,93 @@
+import pytest
+
+"""
+Every write endpoint must change the ETag of the lists it affects, so a
+client revalidating with If-None-Match gets the new rows instead of 304
+"""
+
+
+def _update(category, entity_id, field, value):
+    return {
+        "category": category,
+        "client_id": entity_id,
+        "field": field,
+        "value": value,
+        "clientData": {category: {f"{category}_id": entity_id}},
+    }
+
+
+# (method, path, request kwargs, expected status, lists whose ETag changes)
+WRITES = {
+    "addSales": ("POST", "/salesdetails", lambda sale: {"json": sale(1)}, 201,
+                 ["/clients", "/meetings", "/internet", "/offices"]),
+    "addSalesBulk": ("POST", "/salesdetails/bulk",
+                     lambda sale: {"json": [sale(1), sale(2)]}, 201,
+                     ["/clients", "/meetings", "/internet"]),
+    "update client": ("POST", "/update",
+                      lambda sale: {"json": _update("client", 1, "client_name", "Renamed")},
+                      200, ["/clients", "/sales/summary"]),
+    "update meeting": ("POST", "/update",
+                       lambda sale: {"json": _update("meeting", 1, "meeting_location", "Café")},
+                       200, ["/meetings"]),
+    "update internet": ("POST", "/update",
+                        lambda sale: {"json": _update("internet", 1, "isp_name", "Faiba")},
+                        200, ["/internet", "/reports/revenue"]),
+    "deleteClient": ("DELETE", "/client/60", lambda sale: {}, 200,
+                     ["/clients", "/meetings", "/internet"]),
+    "deleteMeeting": ("DELETE", "/meeting/50", lambda sale: {}, 200, ["/meetings"]),
+    "deleteInternet": ("DELETE", "/internet/50", lambda sale: {}, 200,
+                       ["/internet", "/reports/pipeline"]),
+    "deleteBuilding": ("DELETE", "/locations/building/2", lambda sale: {}, 200,
+                       ["/locations/buildings", "/locations/offices", "/clients"]),
+    "updateBuilding": ("PUT", "/locations/building/1",
+                       lambda sale: {"json": {"building_name": "Renamed"}}, 200,
+                       ["/locations/buildings", "/building_names"]),
+    "updateOffice": ("PUT", "/locations/office/1",
+                     lambda sale: {"json": {"office_floor": 9}}, 200,
+                     ["/locations/offices", "/offices"]),
+    "clear_all_data": ("DELETE", "/clear-all-data", lambda sale: {}, 202,
+                       ["/clients", "/meetings", "/internet"]),
+}
+
+
+def _etag(client, path):
+    response = client.get(path)
+    assert response.status_code == 200, path
+    tag = response.headers["ETag"]
+    assert client.get(path, headers={"If-None-Match": tag}).status_code == 304, path
+    return tag
+
+
+def _assert_changed(client, path, tag):
+    response = client.get(path, headers={"If-None-Match": tag})
+    assert response.status_code == 200, path
+    assert response.headers["ETag"] != tag, path
+
+
+@pytest.mark.parametrize("name", sorted(WRITES))
+def test_write_changes_etag(client, sale, name):
+    method, path, kwargs, status, lists = WRITES[name]
+    tags = {list_path: _etag(client, list_path) for list_path in lists}
+
+    response = client.open(path, method=method, **kwargs(sale))
+    assert response.status_code == status, response.get_json()
+
+    for list_path, tag in tags.items():
+        _assert_changed(client, list_path, tag)
+
+
+@pytest.mark.parametrize("path", ["/office/{}", "/locations/office/{}"])
+def test_office_delete_changes_etag(client, office_id, path):
+    lists = ["/offices", "/locations/offices", "/clients", "/meetings", "/internet"]
+    tags = {list_path: _etag(client, list_path) for list_path in lists}
+
+    assert client.delete(path.format(office_id)).status_code == 200
+
+    for list_path, tag in tags.items():
+        _assert_changed(client, list_path, tag)
+
+
+def test_failed_write_keeps_etag(client):
+    tag = _etag(client, "/clients")
+    assert client.delete("/client/999999").status_code == 404
+    assert client.get("/clients", headers={"If-None-Match": tag}).status_code == 304
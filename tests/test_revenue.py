@@ -0,0 +1,65 @@
+from decimal import Decimal
+import pytest
+from database import db
+from models.internetModel import Internet
+from services.revenue import backfill_batch, parse_price
+
+"""
+Price parsing into isp_price_amount, NUMERIC(12, 2)
+"""
+
+
+@pytest.mark.parametrize("value, amount", [
+    ("4500", "4500.00"),
+    ("KES 4,500/=", "4500.00"),
+    ("4500.50 per month", "4500.50"),
+    ("0.006", "0.01"),
+    (4500, "4500.00"),
+    (4500.5, "4500.50"),
+    (Decimal("12.346"), "12.35"),
+    (-5, "-5.00"),
+    ("9999999999.99", "9999999999.99"),
+])
+def test_parse_price(value, amount):
+    assert parse_price(value) == Decimal(amount)
+
+
+@pytest.mark.parametrize("value", [
+    None,
+    True,
+    "",
+    "call for price",
+    "1000-2000",
+    # too many digits for the column
+    "12345678901",
+    "9999999999.999",
+    10 ** 10,
+    1e300,
+    "1e400",
+    float("inf"),
+    float("-inf"),
+    float("nan"),
+    Decimal("NaN"),
+    Decimal("Infinity"),
+])
+def test_parse_price_rejects(value):
+    assert parse_price(value) is None
+
+
+def test_backfill_skips_prices_the_column_cannot_hold(app):
+    with app.app_context():
+        table = Internet.__table__
+        db.session.execute(table.update().values(isp_price_amount=None))
+        db.session.execute(
+            table.update().where(table.c.internet_id == 1).values(isp_price="99999999999")
+        )
+        db.session.execute(
+            table.update().where(table.c.internet_id == 2).values(isp_price="KES 4,500")
+        )
+
+        read, converted, last = backfill_batch(0, 10)
+        db.session.commit()
+
+        assert (read, converted, last) == (10, 9, 10)
+        assert db.session.get(Internet, 1).isp_price_amount is None
+        assert db.session.get(Internet, 2).isp_price_amount == Decimal("4500.00")
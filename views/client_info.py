@@ -1,5 +1,16 @@
+import logging
+import os
 from xmlrpc import client
-from flask import Blueprint, request, jsonify
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    g,
+    request,
+    jsonify,
+    send_file,
+    stream_with_context,
+)
 from models.clientModel import Client
 from models.userModel import User
 from database import db
@@ -9,18 +20,67 @@ from models.office import BuildingOffice
 from models.buildingModel import Building
 from sqlalchemy.exc import IntegrityError, DataError, SQLAlchemyError
 from sqlalchemy import func
+from services.pagination import keyset_args, keyset_page, offset_args, split_page
+from services.export import EXPORT_FORMATS, iter_export
+from services.dashboard import dashboard_counts
+from services.auth import (
+    LoginBusy,
+    LoginThrottled,
+    issue_token,
+    token_required,
+    verify_login,
+)
+from services.purge import clear_all, delete_client, delete_office
+from services.etag import etag
+from services.projection import fetch_column, fetch_dicts, requested_fields, select_model
+from services.sales_read import load_sales, requested_sections
+from models.clientSummaryModel import ClientSummary
+from services.client_summary import load_summary, nest
+from services.revenue import DEFAULT_PERCENTILES, GROUPS, revenue_report
+from models.pipelineRollupModel import PipelineRollup
+from services.pipeline import DIMENSIONS, pipeline_report
+from services.doc_cache import cached_document
+from services.change_feed import CursorExpired, changes_since
+from services.events import broadcaster, snapshot, stream
+from services.search import search_clients, search_terms
+from services.autocomplete import INDEXES, autocomplete
+from services.filters import (
+    CLIENT_FILTERS,
+    CLIENT_SORT,
+    INTERNET_FILTERS,
+    INTERNET_SORT,
+    MEETING_FILTERS,
+    MEETING_SORT,
+    PIPELINE_FILTERS,
+    apply_filters,
+    SUMMARY_FILTERS,
+    apply_sort,
+)
+from services.sales import (
+    new_building,
+    new_office,
+    new_sale,
+    parse_meeting_date,
+    save_batch,
+)
+from services.jobs import FINISHED, JobsBusy, get_job, submit_job
 
 """
 This file contains routes for entering client data 
 """
 
 client_bp = Blueprint("client_bp", __name__)
+logger = logging.getLogger(__name__)
 
 
 @client_bp.route("/", methods=["POST"])
 def userLogin():
     """
     Endpoint for user to login in to the system
+
+    The password is checked on the bounded hashing pool and attempts are
+    throttled per username. A successful login returns a signed token that
+    expires after SESSION_TOKEN_TTL seconds.
     """
     data = request.get_json()
     if not data:
@@ -31,8 +91,36 @@ def userLogin():
     existing_user = db.session.execute(
         db.select(User).filter_by(user_name=name)
     ).scalar_one_or_none()
-    if existing_user and existing_user.check_password(password):
-        return jsonify({"success": True, "message": "Login successful"}), 200
+
+    try:
+        valid = verify_login(
+            name, existing_user.user_password if existing_user else None, password
+        )
+    except LoginThrottled as e:
+        return (
+            jsonify({"success": False, "message": str(e)}),
+            429,
+            {"Retry-After": str(e.retry_after)},
+        )
+    except LoginBusy:
+        return (
+            jsonify({"success": False, "message": "Login is busy, try again shortly"}),
+            503,
+            {"Retry-After": "1"},
+        )
+
+    if valid:
+        return (
+            jsonify(
+                {
+                    "success": True,
+                    "message": "Login successful",
+                    "token": issue_token(existing_user),
+                    "expires_in": current_app.config["SESSION_TOKEN_TTL"],
+                }
+            ),
+            200,
+        )
     else:
         return (
             jsonify({"success": False, "message": "Invalid username or password"}),
@@ -40,6 +128,15 @@ def userLogin():
         )
 
 
+@client_bp.route("/session", methods=["GET"])
+@token_required
+def get_session():
+    """
+    Endpoint to check a session token, answered without touching the database
+    """
+    return jsonify({"success": True, "user": g.user_claims}), 200
+
+
 @client_bp.route("/salesdetails", methods=["POST"])
 def addSales():
     """
@@ -50,6 +147,16 @@ def addSales():
     if not data:
         return (jsonify({"success": False, "message": "No data provided"}), 400)
 
+    try:
+        data = parse_meeting_date(data)
+    except ValueError:
+        return (
+            jsonify(
+                {"success": False, "message": "meetingDate must be in YYYY-MM-DD format"}
+            ),
+            400,
+        )
+
     try:
         building_name = data.get("building_name")
         building = db.session.execute(
@@ -57,13 +164,7 @@ def addSales():
         ).scalar_one_or_none()
 
         if not building:
-            building = Building(
-                building_name=data.get("building_name"),
-                is_fibre_setup=data.get("is_fibre_setup"),
-                ease_of_access=data.get("ease_of_access"),
-                access_information=data.get("more_info_access"),
-                number_offices=data.get("number_offices"),
-            )
+            building = new_building(data)
         db.session.add(building)
         db.session.flush()
 
@@ -73,58 +174,20 @@ def addSales():
         ).scalar_one_or_none()
 
         if not office_exists:
-            office_exists = BuildingOffice(
-                office_name=office_name,
-                office_floor=data.get("office_floor"),
-                staff_number=data.get("number_staff"),
-                industry_category=data.get("industry"),
-                more_data_on_office=data.get("more_offices"),
-                located=building,
-            )
+            office_exists = new_office(data, building)
 
         db.session.add(office_exists)
-        # client information fetched from frontend
-        client = Client(
-            client_name=data.get("client_name"),
-            client_contact=data.get("contact"),
-            client_email=data.get("client_email"),
-            job_title=data.get("job"),
-            deal_information=data.get("deal_info"),
-            office=office_exists,
-            building=building
-        )
-        db.session.add(client)
-
-        # meeting information fetched from frontend
-        meeting = Meeting(
-            meeting_date=data.get("meetingDate"),
-            meeting_location=data.get("meetingLocation"),
-            meetingtype=data.get("meetingType"),
-            meeting_remarks=data.get("meetingRemarks"),
-            meeting_status=data.get("meetingStatus"),
-            attends=client
-        )
-        db.session.add(meeting)
-
-        # internet information
-        internet = Internet(
-            is_isp_connected=data.get("is_connected"),
-            isp_name=data.get("isp_name"),
-            internet_connection_type=data.get("connection_type"),
-            service_provided=data.get("product"),
-            isp_price=data.get("net_price"),
-            deal_status=data.get("deal_status"),
-            hasinternet=client
-        )
-        db.session.add(internet)
-
-        print(
-            "=======Building Details:\n {}\n ======Office Details:\n {}".format(
-                building.to_dict(), office_exists.to_dict()
-            )
-        )
+        # client, meeting and internet information fetched from frontend
+        db.session.add(new_sale(data, building, office_exists))
 
+        # read the ids before the commit expires them, so logging costs no SELECT
+        db.session.flush()
+        building_id, office_id = building.building_id, office_exists.office_id
         db.session.commit()
+        logger.debug(
+            "sales details added",
+            extra={"building_id": building_id, "office_id": office_id},
+        )
         return (
             jsonify(
                 {"success": True, "message": "Client information added successfully"}
@@ -162,21 +225,74 @@ def addSales():
         )
 
 
+def _job_accepted(kind, params, message):
+    """
+    Queues a job and answers 202 pointing at its status endpoint
+    """
+    try:
+        job_id = submit_job(kind, params)
+    except JobsBusy as e:
+        response = jsonify({"success": False, "message": f"Too many jobs running: {e}"})
+        response.headers["Retry-After"] = "30"
+        return response, 503
+    except SQLAlchemyError as e:
+        return jsonify({"success": False, "message": f"Database error: {e}"}), 500
+
+    response = jsonify({"success": True, "message": message, "job": get_job(job_id)})
+    response.headers["Location"] = f"/jobs/{job_id}"
+    return response, 202
+
+
+@client_bp.route("/salesdetails/bulk", methods=["POST"])
+def addSalesBulk():
+    """
+    Saves a batch of submissions, each shaped like the /salesdetails payload
+
+    The response reports the outcome of every item, see save_batch. With
+    ?async=1 the batch is queued as a job and 202 is returned at once; the
+    job's result is the body this endpoint would have sent.
+    """
+    items = request.get_json()
+    if not items or not isinstance(items, list):
+        return (
+            jsonify({"success": False, "message": "Expected a list of submissions"}),
+            400,
+        )
+
+    limit = current_app.config["BULK_MAX_ITEMS"]
+    if len(items) > limit:
+        return (
+            jsonify(
+                {"success": False, "message": f"At most {limit} submissions per batch"}
+            ),
+            413,
+        )
+
+    if request.args.get("async") in ("1", "true"):
+        return _job_accepted("bulk_import", {"items": items}, "Bulk import queued")
+
+    payload, status = save_batch(items)
+    return jsonify(payload), status
+
+
 @client_bp.route("/meetings", methods=["GET"])
+@etag(Meeting)
 def get_meetings():
     """
     Displays a lists of clients from the database
-    """
-    meeting_data = []
 
-    meeting_list = (
-        db.session.execute(db.select(Meeting).order_by(Meeting.meeting_id))
-        .scalars()
-        .all()
-    )
+    Accepts the filters of services.filters.MEETING_FILTERS,
+    ?sort= over MEETING_SORT and ?fields= to select only some columns
+    """
+    try:
+        stmt = apply_filters(
+            select_model(Meeting, requested_fields(Meeting)), MEETING_FILTERS
+        )
+        stmt = apply_sort(stmt, MEETING_SORT, Meeting.meeting_id)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
 
-    for meeting in meeting_list:
-        meeting_data.append(meeting.to_dict())
+    meeting_data = fetch_dicts(stmt)
 
     return (
         jsonify(
@@ -190,49 +306,65 @@ def get_meetings():
 
 
 @client_bp.route("/clients", methods=["GET"])
+@etag(Client)
 def get_clients():
     """
     Endpoint to get all clients
-    """
-
-    clientsDict = []
 
-    clients = (
-        db.session.execute(db.select(Client).order_by(Client.client_id)).scalars().all()
-    )
+    Accepts the filters of services.filters.CLIENT_FILTERS,
+    ?sort= over CLIENT_SORT and ?fields= to select only some columns
+    """
+    try:
+        stmt = apply_filters(
+            select_model(Client, requested_fields(Client)), CLIENT_FILTERS
+        )
+        stmt = apply_sort(stmt, CLIENT_SORT, Client.client_id)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
 
-    for client in clients:
-        clientsDict.append(client.to_dict())
+    clientsDict = fetch_dicts(stmt)
 
     return jsonify({"success": True, "clients": clientsDict}), 200
 
 
 @client_bp.route("/internet", methods=["GET"])
+@etag(Internet)
 def get_internet():
     """
     Endpoint to get all internet statuses
-    """
 
-    internet = (db.session.execute(db.select(Internet).order_by(Internet.internet_id))
-                .scalars()
-                .all())
+    Accepts the filters of services.filters.INTERNET_FILTERS,
+    ?sort= over INTERNET_SORT and ?fields= to select only some columns
+    """
+    try:
+        stmt = apply_filters(
+            select_model(Internet, requested_fields(Internet)), INTERNET_FILTERS
+        )
+        stmt = apply_sort(stmt, INTERNET_SORT, Internet.internet_id)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
 
-    internet_list = [i.to_dict() for i in internet]
+    internet_list = fetch_dicts(stmt)
 
     return jsonify({"success": True, "internet": internet_list}), 200
 
 
 @client_bp.route("/offices", methods=["GET"])
+@etag(BuildingOffice)
 def get_offices():
     """
     Endpoint to get all client offices
+
+    ?fields= selects only some columns
     """
-    offices = (
-        db.session.execute(db.select(BuildingOffice).order_by(BuildingOffice.office_id))
-        .scalars()
-        .all()
+    try:
+        fields = requested_fields(BuildingOffice)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    office_list = fetch_dicts(
+        select_model(BuildingOffice, fields).order_by(BuildingOffice.office_id)
     )
-    office_list = [office.to_dict() for office in offices]
 
     return jsonify({"success": True, "offices": office_list}), 200
 
@@ -248,8 +380,6 @@ def update_client_data():
     # updates data from client depending on the category sent from the frontend
     data = request.get_json()
 
-    print(f"Received data for update\n: {data}")
-
     if not data:
         return jsonify({"success": False, "message": "No data provided"}), 400
 
@@ -259,7 +389,10 @@ def update_client_data():
     field = data.get("field")
     context = data.get("clientData")
 
-    print("\n\n=============Context data sent frpm frontend:\n", context)
+    logger.debug(
+        "update requested",
+        extra={"category": category, "field": field, "client_id": id},
+    )
 
     # if not category or not id or not value or not field:
     # return (
@@ -342,6 +475,9 @@ def update_client_data():
 def deleteClient(client_id):
     """
     Endpoint to delete a client by ID along with all related records
+
+    Meetings, internet records and the client are removed with one DELETE
+    each and the response reports how many rows every table lost
     """
     client = db.session.execute(
         db.select(Client).filter_by(client_id=client_id)
@@ -351,52 +487,7 @@ def deleteClient(client_id):
         return jsonify({"success": False, "message": "Client not found"}), 404
 
     try:
-        # Delete related records in the correct order to avoid foreign key constraint violations
-        # Step 1: Get all buildings for this client
-        buildings = (
-            db.session.execute(db.select(Building).filter_by(client_id=client_id))
-            .scalars()
-            .all()
-        )
-
-        # Step 2: Delete all offices in all buildings owned by this client
-        for building in buildings:
-            offices = (
-                db.session.execute(
-                    db.select(BuildingOffice).filter_by(
-                        building_id=building.building_id
-                    )
-                )
-                .scalars()
-                .all()
-            )
-            for office in offices:
-                db.session.delete(office)
-
-        # Step 3: Delete all buildings
-        for building in buildings:
-            db.session.delete(building)
-
-        # Step 4: Delete related internet records
-        internet_records = (
-            db.session.execute(db.select(Internet).filter_by(client_id=client_id))
-            .scalars()
-            .all()
-        )
-        for internet in internet_records:
-            db.session.delete(internet)
-
-        # Step 5: Delete related meetings
-        meetings = (
-            db.session.execute(db.select(Meeting).filter_by(client_id=client_id))
-            .scalars()
-            .all()
-        )
-        for meeting in meetings:
-            db.session.delete(meeting)
-
-        # Step 6: Finally delete the client
-        db.session.delete(client)
+        deleted = delete_client(client.client_id)
         db.session.commit()
 
         return (
@@ -404,6 +495,7 @@ def deleteClient(client_id):
                 {
                     "success": True,
                     "message": "Client and all related records deleted successfully",
+                    "deleted": deleted,
                 }
             ),
             200,
@@ -473,6 +565,9 @@ def deleteInternet(internet_id):
 def deleteOffice(office_id):
     """
     Endpoint to delete office information by ID
+
+    Clients in the office go with it, together with their meetings and
+    internet records; the response reports how many rows every table lost
     """
     office = db.session.execute(
         db.select(BuildingOffice).filter_by(office_id=office_id)
@@ -485,11 +580,15 @@ def deleteOffice(office_id):
         )
 
     try:
-        db.session.delete(office)
+        deleted = delete_office(office.office_id)
         db.session.commit()
         return (
             jsonify(
-                {"success": True, "message": "Office information deleted successfully"}
+                {
+                    "success": True,
+                    "message": "Office information deleted successfully",
+                    "deleted": deleted,
+                }
             ),
             200,
         )
@@ -502,54 +601,20 @@ def deleteOffice(office_id):
 def get_sales():
     """
     Endpoint to get sales data for all clients
-    """
-    clients = db.session.execute(db.select(Client)).scalars().all()
-
-    sales_data = []
-
-    for client in clients:
-        # Get all meetings for this client
-        meetings = (
-            db.session.execute(db.select(Meeting).filter_by(client_id=client.client_id))
-            .scalars()
-            .all()
-        )
-
-        # Get all internet records for this client
-        internet_records = (
-            db.session.execute(
-                db.select(Internet).filter_by(client_id=client.client_id)
-            )
-            .scalars()
-            .all()
-        )
-
-        # Get all buildings for this client
-        buildings = (
-            db.session.execute(
-                db.select(Building).filter_by(building_id=client.building_id)
-            ).scalars().all()
-        )
 
-        # Get all offices for all buildings of this client
-        offices  = (
-            db.session.execute(
-                db.select(BuildingOffice).filter_by(office_id=client.office_id)
-            ).scalars().all()
-        )
-
-        # Combine all data for this client
-        client_data = {
-            "client": client.to_dict(),
-            "meetings": [meeting.to_dict() for meeting in meetings],
-            "internet_records": [internet.to_dict() for internet in internet_records],
-            "buildings": [building.to_dict() for building in buildings],
-            "offices": [office.to_dict() for office in offices],
-            "total_meetings": len(meetings),
-            "total_internet_records": len(internet_records),
-        }
+    Clients are paginated by client_id with ?after=<client_id>&limit=N.
+    Buildings and offices are joined into the client query and meetings and
+    internet records are loaded with one extra query each, so a page always
+    costs three queries regardless of its size. ?fields=section.field,...
+    narrows those queries, see services.sales_read.
+    """
+    try:
+        after, limit = keyset_args()
+        sections = requested_sections()
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
 
-        sales_data.append(client_data)
+    sales_data, next_after = load_sales(sections=sections, after=after, limit=limit)
 
     return (
         jsonify(
@@ -558,274 +623,599 @@ def get_sales():
                 "message": "Sales data retrieved successfully for all clients",
                 "total_clients": len(sales_data),
                 "sales_data": sales_data,
+                "limit": limit,
+                "next_after": next_after,
             }
         ),
         200,
     )
 
 
-@client_bp.route("/sales/<int:user_id>", methods=["GET"])
-def get_client_data(user_id):
-    """
-    Endpoint to get sales data:
-    - If user_id is provided: returns data for that specific user
-    - If no user_id: returns data for all users
+@client_bp.route("/sales/summary", methods=["GET"])
+@etag(Client, Meeting, Internet, BuildingOffice, Building)
+def get_sales_summary():
     """
+    Flat sales report, one row per client with its building, office, latest
+    meeting and latest internet record, read from the client_summary table
 
-    # If user_id is provided, return data for specific user
-    user = db.session.get(Client, user_id)
-
-    print("---User data: ", user)
+    Paginated by client_id with ?after=<client_id>&limit=N; accepts the
+    filters of services.filters.SUMMARY_FILTERS and ?fields= to select
+    only some columns.
+    """
+    try:
+        after, limit = keyset_args()
+        stmt = apply_filters(
+            select_model(ClientSummary, requested_fields(ClientSummary)), SUMMARY_FILTERS
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
 
-    if not user:
-        return jsonify({"success": False, "message": "User not found"}), 404
-    # Get all meetings for this user
-    user_meeting = db.session.execute(
-        db.select(Meeting).filter_by(client_id=user_id)
-    ).scalar_one_or_none()
-    # Get all internet records for this user
-    user_internet = db.session.execute(
-        db.select(Internet).filter_by(client_id=user_id)
-    ).scalar_one_or_none()
+    try:
+        rows, next_after = split_page(
+            fetch_dicts(
+                keyset_page(
+                    stmt.add_columns(ClientSummary.client_id.label("_client_id")),
+                    ClientSummary.client_id,
+                    after,
+                    limit,
+                )
+            ),
+            limit,
+            lambda row: row["_client_id"],
+        )
+    except SQLAlchemyError as e:
+        return jsonify({"success": False, "message": f"Database error: {e}"}), 500
 
-    user_building_id = user.building_id
-    # Get all buildings for this user
-    user_building = db.session.execute(
-        db.select(Building).filter_by(building_id=user_building_id)
-    ).scalar_one_or_none()
-    # Get all offices for all buildings of this user
-    user_office = db.session.execute(
-        db.select(BuildingOffice).filter_by(office_id=user.office_id)
-    ).scalar_one_or_none()
-    # Combine all data for this client
-    client_data = {
-        "client": user.to_dict(),
-        "meeting": user_meeting.to_dict() if user_meeting else None,
-        "internet": user_internet.to_dict() if user_internet else None,
-        "building": user_building.to_dict() if user_building else None,
-        "office": user_office.to_dict() if user_office else None,
-    }
-    print(f"======={user.client_name} data retrieved successfully\n {client_data}")
+    for row in rows:
+        del row["_client_id"]
     return (
         jsonify(
             {
                 "success": True,
-                "message": f"Sales data retrieved for client {user.client_name}",
-                "client_data": client_data,
+                "summary": rows,
+                "limit": limit,
+                "next_after": next_after,
             }
         ),
         200,
     )
 
 
-@client_bp.route("/clear-all-data", methods=["DELETE"])
-def clear_all_data():
+@client_bp.route("/reports/revenue", methods=["GET"])
+@etag(Internet, Client)
+def get_revenue_report():
     """
-    Utility endpoint to clear all data from all tables while respecting foreign key constraints
-    WARNING: This will delete ALL data in the database!
+    Revenue per isp_name, service_provided and deal_status: record count,
+    total, average and percentiles of the numeric isp price, computed in
+    the database
+
+    ?group_by= picks a subset of the three keys, ?percentiles= the
+    percentiles (1-100, default 50,90); accepts the filters of
+    services.filters.INTERNET_FILTERS. Prices that are not a number are
+    left out.
     """
+    group_by = [
+        name.strip()
+        for name in request.args.get("group_by", ",".join(GROUPS)).split(",")
+        if name.strip()
+    ]
+    unknown = [name for name in group_by if name not in GROUPS]
+    if unknown:
+        return (
+            jsonify({"success": False, "message": f"Cannot group by {', '.join(unknown)}"}),
+            400,
+        )
     try:
-        # Delete in the correct order to respect foreign key constraints
+        percentiles = [
+            int(p) for p in request.args.get("percentiles", "").split(",") if p.strip()
+        ] or list(DEFAULT_PERCENTILES)
+    except ValueError:
+        return jsonify({"success": False, "message": "percentiles must be integers"}), 400
+    if any(p < 1 or p > 100 for p in percentiles):
+        return (
+            jsonify({"success": False, "message": "percentiles must be between 1 and 100"}),
+            400,
+        )
 
-        # Step 1: Delete all offices first (they depend on buildings)
-        offices = db.session.execute(db.select(BuildingOffice)).scalars().all()
-        for office in offices:
-            db.session.delete(office)
+    try:
+        groups = revenue_report(
+            lambda stmt: apply_filters(stmt, INTERNET_FILTERS),
+            list(dict.fromkeys(group_by)),
+            sorted(set(percentiles)),
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except SQLAlchemyError as e:
+        return jsonify({"success": False, "message": f"Database error: {e}"}), 500
 
-        # Step 2: Delete all buildings (they depend on clients)
-        buildings = db.session.execute(db.select(Building)).scalars().all()
-        for building in buildings:
-            db.session.delete(building)
+    return jsonify({"success": True, "revenue": groups}), 200
 
-        # Step 3: Delete all internet records (they depend on clients)
-        internet_records = db.session.execute(db.select(Internet)).scalars().all()
-        for internet in internet_records:
-            db.session.delete(internet)
 
-        # Step 4: Delete all meetings (they depend on clients)
-        meetings = db.session.execute(db.select(Meeting)).scalars().all()
-        for meeting in meetings:
-            db.session.delete(meeting)
+# pipeline dimension: response field holding the key
+PIPELINE_KEYS = {"industry": "industry_category", "building": "building_id", "isp": "isp_name"}
 
-        # Step 5: Finally delete all clients
-        clients = db.session.execute(db.select(Client)).scalars().all()
-        for client in clients:
-            db.session.delete(client)
 
-        db.session.commit()
+@client_bp.route("/reports/pipeline", methods=["GET"])
+@etag(PipelineRollup)
+def get_pipeline_report():
+    """
+    Deal status breakdown of the internet records by industry, building,
+    ISP or month, read from the pipeline_rollup table
 
+    ?dimension= is one of industry, building, isp and month (the default);
+    ?monthly=true splits the other dimensions by month as well. Accepts
+    the filters of services.filters.PIPELINE_FILTERS, from and to being
+    months as YYYY-MM.
+    """
+    dimension = request.args.get("dimension", "month")
+    if dimension not in DIMENSIONS:
         return (
-            jsonify({"success": True, "message": "All data cleared successfully"}),
-            200,
+            jsonify(
+                {
+                    "success": False,
+                    "message": f"dimension must be one of: {', '.join(DIMENSIONS)}",
+                }
+            ),
+            400,
         )
+    monthly = request.args.get("monthly", "").lower() in ("1", "true", "yes")
 
+    try:
+        rows = pipeline_report(
+            dimension, monthly, lambda stmt: apply_filters(stmt, PIPELINE_FILTERS)
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
     except SQLAlchemyError as e:
-        db.session.rollback()
         return jsonify({"success": False, "message": f"Database error: {e}"}), 500
 
+    # the rollups store missing values as empty strings
+    for row in rows:
+        if "key" in row:
+            key = row.pop("key") or None
+            if dimension == "building" and key is not None:
+                key = int(key)
+            row[PIPELINE_KEYS[dimension]] = key
+        if "period" in row:
+            row["month"] = row.pop("period") or None
+        row["deal_status"] = row["deal_status"] or None
+    return jsonify({"success": True, "dimension": dimension, "pipeline": rows}), 200
+
+
+@client_bp.route("/sales/export", methods=["GET"])
+def export_sales():
+    """
+    Streams the sales report as CSV or newline delimited JSON
 
-@client_bp.route("/client/<client_id>/complete", methods=["GET"])
-def get_complete_client_data(client_id):
+    ?format=csv|ndjson (defaults to csv). Rows are read through a server-side
+    cursor in EXPORT_CHUNK_SIZE chunks and written out as they arrive, so the
+    worker never holds more than one chunk in memory.
     """
-    Endpoint to get complete data for a specific client including all related records
+    fmt = request.args.get("format", "csv").lower()
+    if fmt not in EXPORT_FORMATS:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": "format must be one of: " + ", ".join(EXPORT_FORMATS),
+                }
+            ),
+            400,
+        )
+
+    body = iter_export(fmt, current_app.config["EXPORT_CHUNK_SIZE"])
+    return Response(
+        stream_with_context(body),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename=sales.{fmt}"},
+    )
+
+
+@client_bp.route("/sales/export", methods=["POST"])
+def queue_export():
     """
-    # Get the client
-    client = db.session.execute(
-        db.select(Client).filter_by(client_id=client_id)
-    ).scalar_one_or_none()
+    Runs the sales export as a background job for reports too large to
+    stream within a request; ?format=csv|ndjson as for GET /sales/export.
+    The file is fetched from /jobs/<id>/result once the job succeeded.
+    """
+    fmt = request.args.get("format", "csv").lower()
+    if fmt not in EXPORT_FORMATS:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": "format must be one of: " + ", ".join(EXPORT_FORMATS),
+                }
+            ),
+            400,
+        )
+    params = {"format": fmt, "chunk_size": current_app.config["EXPORT_CHUNK_SIZE"]}
+    return _job_accepted("export", params, "Export queued")
 
-    if not client:
-        return jsonify({"success": False, "message": "Client not found"}), 404
 
-    # Get all meetings for this client
-    meetings = (
-        db.session.execute(db.select(Meeting).filter_by(client_id=client_id))
-        .scalars()
-        .all()
-    )
+def _document_response(body, hit):
+    """
+    Sends an already serialized JSON document, noting whether it was cached
+    """
+    response = current_app.response_class(body, mimetype=current_app.json.mimetype)
+    response.headers["X-Cache"] = "hit" if hit else "miss"
+    return response
 
-    # Get all internet records for this client
-    internet_records = (
-        db.session.execute(db.select(Internet).filter_by(client_id=client_id))
-        .scalars()
-        .all()
-    )
 
-    # Get all buildings for this client with their offices
-    buildings = (
-        db.session.execute(db.select(Building).filter_by(client_id=client_id))
-        .scalars()
-        .all()
+def _client_data(user_id, sections=None):
+    """
+    Builds the /sales/<id> payload, None when the client does not exist
+    """
+    # one primary key lookup on the client_summary read model, narrowed by
+    # ?fields= like /sales
+    row = load_summary(user_id, sections)
+    if row is None:
+        return None
+
+    # Combine all data for this client
+    client_data = nest(row, sections)
+
+    name = (client_data.get("client") or {}).get("client_name", user_id)
+    payload = {
+        "success": True,
+        "message": f"Sales data retrieved for client {name}",
+        "client_data": client_data,
+    }
+    return payload
+
+
+@client_bp.route("/sales/<int:user_id>", methods=["GET"])
+def get_client_data(user_id):
+    """
+    Endpoint to get sales data for one client
+
+    The full document is served from the client document cache; requests
+    narrowed with ?fields= are built from the database every time.
+    """
+    try:
+        sections = requested_sections()
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    not_found = jsonify({"success": False, "message": "User not found"}), 404
+    logger.debug("client data requested", extra={"client_id": user_id})
+
+    if sections is not None:
+        payload = _client_data(user_id, sections)
+        return (jsonify(payload), 200) if payload else not_found
+
+    def build():
+        payload = _client_data(user_id)
+        return current_app.json.response(payload).get_data() if payload else None
+
+    body, hit = cached_document("sales", user_id, build)
+    return _document_response(body, hit) if body is not None else not_found
+
+
+@client_bp.route("/clear-all-data", methods=["DELETE"])
+def clear_all_data():
+    """
+    Utility endpoint to clear all data from all tables while respecting foreign key constraints
+    WARNING: This will delete ALL data in the database!
+
+    Runs as a background job: answers 202 with the job, whose result holds
+    the number of rows deleted per table
+    """
+    return _job_accepted("clear_all", None, "Clearing all data")
+
+
+@client_bp.route("/jobs/<job_id>", methods=["GET"])
+def get_job_status(job_id):
+    """
+    Status, progress and, once finished, result or error of a background job
+    """
+    try:
+        job = get_job(job_id)
+    except SQLAlchemyError as e:
+        return jsonify({"success": False, "message": f"Database error: {e}"}), 500
+    if job is None:
+        return jsonify({"success": False, "message": "Job not found"}), 404
+    return jsonify({"success": True, "job": job}), 200
+
+
+@client_bp.route("/jobs/<job_id>/result", methods=["GET"])
+def get_job_result(job_id):
+    """
+    Outcome of a finished job: the file it produced, such as an export, or
+    its JSON result; 409 while the job is still queued or running
+    """
+    try:
+        job = get_job(job_id)
+    except SQLAlchemyError as e:
+        return jsonify({"success": False, "message": f"Database error: {e}"}), 500
+    if job is None:
+        return jsonify({"success": False, "message": "Job not found"}), 404
+    if job["status"] not in FINISHED:
+        return jsonify({"success": False, "message": f"Job is {job['status']}", "job": job}), 409
+    if job["status"] == "failed":
+        return jsonify({"success": False, "message": job["error"], "job": job}), 200
+
+    result = job["result"] or {}
+    if "file" not in result:
+        return jsonify({"success": True, "result": result}), 200
+    if not os.path.exists(result["file"]):
+        # result files stay on the host that ran the job
+        return jsonify({"success": False, "message": "Result file is not available here"}), 410
+    return send_file(
+        result["file"],
+        mimetype=result["mimetype"],
+        as_attachment=True,
+        download_name=result["filename"],
     )
 
-    buildings_with_offices = []
-    for building in buildings:
-        offices = (
-            db.session.execute(
-                db.select(BuildingOffice).filter_by(building_id=building.building_id)
-            )
-            .scalars()
-            .all()
-        )
 
-        building_dict = building.to_dict()
-        building_dict["offices"] = [office.to_dict() for office in offices]
-        buildings_with_offices.append(building_dict)
+def _complete_client_data(client_id):
+    """
+    Builds the /client/<id>/complete payload, None when the client does not exist
+    """
+    sales, _ = load_sales(Client.client_id == client_id)
+    if not sales:
+        return None
+    sale = sales[0]
+    building_id = sale["client"]["building_id"]
+
+    # the client's building with every office in it
+    offices = fetch_dicts(
+        select_model(BuildingOffice)
+        .where(BuildingOffice.building_id == building_id)
+        .order_by(BuildingOffice.office_id)
+    )
+    buildings_with_offices = [
+        dict(building, offices=offices) for building in sale["buildings"]
+    ]
 
     # Combine all data
     complete_data = {
-        "client": client.to_dict(),
-        "meetings": [meeting.to_dict() for meeting in meetings],
-        "internet_records": [internet.to_dict() for internet in internet_records],
+        "client": sale["client"],
+        "meetings": sale["meetings"],
+        "internet_records": sale["internet_records"],
         "buildings": buildings_with_offices,
         "summary": {
-            "total_meetings": len(meetings),
-            "total_buildings": len(buildings),
-            "total_internet_records": len(internet_records),
+            "total_meetings": sale["total_meetings"],
+            "total_buildings": len(buildings_with_offices),
+            "total_internet_records": sale["total_internet_records"],
             "total_offices": sum(
                 len(building.get("offices", [])) for building in buildings_with_offices
             ),
         },
     }
+    payload = {
+        "success": True,
+        "message": f"Complete data retrieved for client {sale['client']['client_name']}",
+        "data": complete_data,
+    }
+    return payload
+
+
+@client_bp.route("/client/<int:client_id>/complete", methods=["GET"])
+def get_complete_client_data(client_id):
+    """
+    Endpoint to get complete data for a specific client including all related records
+
+    The document is served from the client document cache, see
+    services/doc_cache.py
+    """
+    def build():
+        payload = _complete_client_data(client_id)
+        return current_app.json.response(payload).get_data() if payload else None
+
+    try:
+        body, hit = cached_document("complete", client_id, build)
+    except SQLAlchemyError as e:
+        return jsonify({"success": False, "message": f"Database error: {e}"}), 500
+
+    if body is None:
+        return jsonify({"success": False, "message": "Client not found"}), 404
+    return _document_response(body, hit)
+
+
+@client_bp.route("/count", methods=["GET"])
+def count_sales():
+    """
+    Endpoint to get the count of all clients, scheduled meetings and pending deals
+
+    The counters are read with one query and cached for COUNT_CACHE_TTL
+    seconds; any commit touching clients, meetings or internet records
+    drops the cached value.
+    """
+    try:
+        counts = dashboard_counts()
+        logger.debug("dashboard counts", extra=counts)
+        return (
+            jsonify(
+                {
+                    "success": True,
+                    "data": counts,
+                }
+            ),
+            200,
+        )
+    except SQLAlchemyError as e:
+        return jsonify({"success": False, "message": f"Database error: {e}"}), 500
+
+
+@client_bp.route("/events", methods=["GET"])
+def get_events():
+    """
+    Server-Sent Events stream replacing /count polling on the dashboard
+
+    Starts with a "counts" event holding the /count values and a cursor,
+    then sends an "update" event per commit with counter deltas, changed
+    client ids and the commit's cursor; updates whose cursor is not above
+    the snapshot's are already counted in it. See services/events.py. A
+    "reload" event means updates were missed and the screen should refetch.
+    """
+    config = current_app.config
+    subscription = broadcaster.subscribe(
+        config["EVENTS_QUEUE_SIZE"], config["EVENTS_MAX_SUBSCRIBERS"]
+    )
+    if subscription is None:
+        return jsonify({"success": False, "message": "Too many listeners, retry later"}), 503
+
+    # subscribed first, so a commit landing while the counts are read is
+    # delivered as an update rather than lost; its cursor tells the screen
+    # whether the snapshot already counted it
+    try:
+        counts = snapshot()
+    except SQLAlchemyError as e:
+        broadcaster.unsubscribe(subscription)
+        return jsonify({"success": False, "message": f"Database error: {e}"}), 500
+
+    body = stream(
+        subscription, counts, config["EVENTS_HEARTBEAT"], config["EVENTS_MAX_DURATION"]
+    )
+    return Response(
+        body,
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@client_bp.route("/search", methods=["GET"])
+@etag(Client, BuildingOffice, Meeting, Building)
+def search():
+    """
+    Ranked full-text search over client names and deal notes, office names
+    and descriptions, meeting remarks and building access information
+
+    ?q= holds the words to look for; results are paged with ?offset=&limit=
+    because relevance order has no key to seek on.
+    """
+    q = request.args.get("q", "")
+    if not search_terms(q):
+        return jsonify({"success": False, "message": "q must contain at least one word"}), 400
+
+    try:
+        offset, limit = offset_args("SEARCH_PAGE_SIZE", "SEARCH_MAX_PAGE_SIZE")
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    try:
+        results, next_offset = split_page(
+            search_clients(q, limit, offset), limit, lambda _: offset + limit
+        )
+    except SQLAlchemyError as e:
+        return jsonify({"success": False, "message": f"Database error: {e}"}), 500
 
     return (
         jsonify(
             {
                 "success": True,
-                "message": f"Complete data retrieved for client {client.client_name}",
-                "data": complete_data,
+                "query": q,
+                "results": results,
+                "limit": limit,
+                "offset": offset,
+                "next_offset": next_offset,
             }
         ),
         200,
     )
 
 
-@client_bp.route("/count", methods=["GET"])
-def count_sales():
+@client_bp.route("/autocomplete", methods=["GET"])
+def get_autocomplete():
     """
-    Endpoint to get the count of all clients
+    Typeahead for the entry form's building and office pickers
+
+    ?kind=building|office&prefix=<text>&limit=N returns the names starting
+    with prefix, ignoring case, from an in-memory index; no query is made
+    once the index is loaded.
     """
+    kind = request.args.get("kind")
+    if kind not in INDEXES:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": f"kind must be one of: {', '.join(INDEXES)}",
+                }
+            ),
+            400,
+        )
+
     try:
-        client_count = db.session.execute(
-            db.select(func.count(Client.client_id))
-        ).scalar()
-
-        meeting_count = db.session.execute(
-            db.select(
-                func.count(Meeting.meeting_id).filter(
-                    Meeting.meeting_status == "Scheduled"
-                )
-            )
-        ).scalar()
+        limit = int(request.args.get("limit", current_app.config["AUTOCOMPLETE_LIMIT"]))
+    except ValueError:
+        return jsonify({"success": False, "message": "limit must be an integer"}), 400
+    if limit < 1:
+        return jsonify({"success": False, "message": "limit must be greater than zero"}), 400
+    limit = min(limit, current_app.config["AUTOCOMPLETE_MAX_LIMIT"])
+
+    prefix = request.args.get("prefix", "")
+    try:
+        matches = autocomplete(kind, prefix, limit)
+    except SQLAlchemyError as e:
+        return jsonify({"success": False, "message": f"Database error: {e}"}), 500
 
-        deal_status_count = db.session.execute(
-            db.select(
-                func.count(Internet.internet_id).filter(
-                    Internet.deal_status == "Pending"
-                )
-            )
-        ).scalar()
+    return jsonify({"success": True, "kind": kind, "prefix": prefix, "matches": matches}), 200
 
-        if client_count is None:
-            client_count = 0
 
-        if meeting_count is None:
-            meeting_count = 0
+@client_bp.route("/changes", methods=["GET"])
+def get_changes():
+    """
+    Incremental sync: the rows inserted, updated and deleted after a cursor
+
+    Without ?since= only the current cursor is returned; take it before the
+    initial /sales load, then poll ?since=<cursor>&limit=N and apply the
+    entries in order. Inserts and updates carry the new row, deletes only
+    the id; an entry with a null entity_id means the whole entity changed
+    and has to be reloaded. A cursor older than the retained log gets 410,
+    after which the client reloads and starts again from the new cursor.
+    """
+    try:
+        since, limit = keyset_args("CHANGES_PAGE_SIZE", "CHANGES_MAX_PAGE_SIZE", "since")
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
 
-        if deal_status_count is None:
-            deal_status_count = 0
-        # Log the counts for debugging
-        print(
-            f"Client count: {client_count}, \
-              Meeting count: {meeting_count}, \
-                Deal status count: {deal_status_count}"
-        )
+    try:
+        changes, cursor, has_more = changes_since(since, limit)
+    except CursorExpired as e:
         return (
-            jsonify(
-                {
-                    "success": True,
-                    "data": {
-                        "client_count": client_count,
-                        "meeting_count": meeting_count,
-                        "deal_status": deal_status_count,
-                    },
-                }
-            ),
-            200,
+            jsonify({"success": False, "message": f"{e}, reload and restart from it"}),
+            410,
         )
     except SQLAlchemyError as e:
         return jsonify({"success": False, "message": f"Database error: {e}"}), 500
 
+    return (
+        jsonify(
+            {
+                "success": True,
+                "changes": changes,
+                "cursor": cursor,
+                "has_more": has_more,
+            }
+        ),
+        200,
+    )
+
 
 @client_bp.route("/building_names", methods=["GET"])
+@etag(Building)
 def get_building_name():
     """Fetches the building name from the database"""
-    names = []
-    buildings = (
-        db.session.execute(db.select(Building).order_by(Building.building_id))
-        .scalars()
-        .all()
+    names = fetch_column(
+        db.select(Building.building_name).order_by(Building.building_id)
     )
-    for building in buildings:
-        names.append(building.building_name)
 
-    print(f"Building names fetched: {names}")
+    logger.debug("building names fetched", extra={"count": len(names)})
 
     return jsonify({"success": True, "building_names": names}), 200
 
 
 @client_bp.route("/office_names", methods=["GET"])
+@etag(BuildingOffice)
 def get_office_name():
     """Fetches the office name from the database"""
-    names = []
-    offices = (
-        db.session.execute(db.select(BuildingOffice).order_by(BuildingOffice.office_id))
-        .scalars()
-        .all()
+    names = fetch_column(
+        db.select(BuildingOffice.office_name).order_by(BuildingOffice.office_id)
     )
-    for office in offices:
-        names.append(office.office_name)
 
-    print(f"Office names fetched: {names}")
+    logger.debug("office names fetched", extra={"count": len(names)})
 
     return jsonify({"success": True, "office_names": names}), 200
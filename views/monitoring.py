@@ -0,0 +1,71 @@
+import time
+from flask import Blueprint, Response, jsonify
+from database import db
+from sqlalchemy.exc import SQLAlchemyError
+from services.metrics import registry
+
+"""
+File containing health and monitoring endpoints
+"""
+
+monitoring_bp = Blueprint("monitoring_bp", __name__)
+
+
+def _pool_stats(pool):
+    """
+    Reads the counters of a connection pool, None for those it does not track
+    """
+    def stat(name):
+        method = getattr(pool, name, None)
+        return method() if callable(method) else None
+
+    return {
+        "pool_class": type(pool).__name__,
+        "size": stat("size"),
+        "checked_out": stat("checkedout"),
+        "idle": stat("checkedin"),
+        "overflow": stat("overflow"),
+        "status": pool.status(),
+    }
+
+
+@monitoring_bp.route("/health/db", methods=["GET"])
+def database_health():
+    """
+    Endpoint reporting database reachability and connection pool usage
+
+    checked_out is the number of connections held by requests right now and
+    idle the number waiting in the pool, which is what pool sizes should be
+    compared against when choosing worker counts
+    """
+    pool = _pool_stats(db.engine.pool)
+
+    started = time.perf_counter()
+    try:
+        with db.engine.connect() as conn:
+            conn.execute(db.text("SELECT 1"))
+    except SQLAlchemyError as e:
+        return (
+            jsonify({"success": False, "message": f"Database error: {e}", "pool": pool}),
+            503,
+        )
+
+    return (
+        jsonify(
+            {
+                "success": True,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 3),
+                "pool": pool,
+            }
+        ),
+        200,
+    )
+
+
+@monitoring_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Endpoint exposing per-route latency, SQL statement counts and DB time
+    in Prometheus text format
+    """
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
@@ -1,7 +1,19 @@
+import logging
 from flask import Blueprint, request, jsonify
 from models.buildingModel import Building
+from models.clientModel import Client
 from models.office import BuildingOffice
 from database import db
+from services.pagination import keyset_args, keyset_page, split_page
+from services.purge import delete_building, delete_office
+from services.etag import etag
+from services.projection import (
+    fetch_column,
+    fetch_dicts,
+    read_connection,
+    requested_fields,
+    select_model,
+)
 from sqlalchemy.exc import IntegrityError, DataError, SQLAlchemyError
 
 
@@ -13,30 +25,29 @@ location_bp = Blueprint(
     "location_bp",
     __name__,
 )
+logger = logging.getLogger(__name__)
 
 
 @location_bp.route("/locations/buildings", methods=["GET"])
+@etag(Building)
 def getBuilding():
     """
     Endpoint to get all buildings
+
+    ?fields= selects only some columns
     """
+    try:
+        fields = requested_fields(Building)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
 
-    buildings = (
-        db.session.execute(db.select(Building).order_by(Building.building_id))
-        .scalars()
-        .all()
+    buildingList = fetch_dicts(
+        select_model(Building, fields).order_by(Building.building_id)
     )
 
-    if not buildings:
+    if not buildingList:
         return jsonify({"success": False, "message": "No buildings found"}), 404
 
-    buildingList = [building.to_dict() for building in buildings]
-
-    for building in buildings:
-        print(building.offices)
-    
-    
-
     return (
         jsonify(
             {
@@ -50,12 +61,23 @@ def getBuilding():
 
 
 @location_bp.route("/locations/offices/<int:building_id>", methods=["GET"])
+@etag(BuildingOffice)
 def getOffice(building_id):
     """
     Endpoint to get all offices in a building by building ID
-    """
 
-    offices = db.session.execute(db.select(BuildingOffice).filter_by(building_id=building_id)).scalars().all()
+    ?fields= selects only some columns
+    """
+    try:
+        fields = requested_fields(BuildingOffice)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    offices = fetch_dicts(
+        select_model(BuildingOffice, fields)
+        .where(BuildingOffice.building_id == building_id)
+        .order_by(BuildingOffice.office_id)
+    )
 
     if not offices:
         return (
@@ -64,10 +86,10 @@ def getOffice(building_id):
             ),
             404,
         )
-    
-    offices = [office.to_dict() for office in offices]
 
-    print("Offices:\n", offices)
+    logger.debug(
+        "offices fetched", extra={"building_id": building_id, "count": len(offices)}
+    )
 
     return (
         jsonify(
@@ -81,16 +103,24 @@ def getOffice(building_id):
     )
 
 @location_bp.route("/locations/offices", methods=["GET"])
+@etag(BuildingOffice)
 def getOffices():
     """
     Endpoint to fetch all offices
+
+    ?fields= selects only some columns
     """
-    offices = db.session.execute(db.select(BuildingOffice).order_by(BuildingOffice.office_id)).scalars().all()
+    try:
+        fields = requested_fields(BuildingOffice)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
 
-    if not offices:
-        return jsonify({"success": False, "message": "No offices found"}), 404
+    officeList = fetch_dicts(
+        select_model(BuildingOffice, fields).order_by(BuildingOffice.office_id)
+    )
 
-    officeList = [office.to_dict() for office in offices]
+    if not officeList:
+        return jsonify({"success": False, "message": "No offices found"}), 404
 
     return (
         jsonify(
@@ -103,10 +133,88 @@ def getOffices():
         200,
     )
 
+@location_bp.route("/locations/tree", methods=["GET"])
+@etag(Building, BuildingOffice, Client)
+def getLocationTree():
+    """
+    Endpoint returning buildings with their offices nested, and how many
+    clients each office and building has
+
+    Buildings are paginated by building_id with ?after=<building_id>&limit=N.
+    A page costs three queries whatever its size: the buildings, their
+    offices and one grouped count of clients, all on the read-only
+    connection the ETag check already holds.
+    """
+    try:
+        after, limit = keyset_args("TREE_PAGE_SIZE", "TREE_MAX_PAGE_SIZE")
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    try:
+        buildings, next_after = split_page(
+            fetch_dicts(
+                keyset_page(select_model(Building), Building.building_id, after, limit)
+            ),
+            limit,
+            lambda b: b["building_id"],
+        )
+
+        offices = []
+        if buildings:
+            offices = fetch_dicts(
+                select_model(BuildingOffice)
+                .where(BuildingOffice.building_id.in_([b["building_id"] for b in buildings]))
+                .order_by(BuildingOffice.office_id)
+            )
+
+        client_counts = {}
+        if offices:
+            client_counts = dict(
+                read_connection().execute(
+                    db.select(Client.office_id, db.func.count(Client.client_id))
+                    .where(Client.office_id.in_([o["office_id"] for o in offices]))
+                    .group_by(Client.office_id)
+                ).all()
+            )
+    except SQLAlchemyError as e:
+        return jsonify({"success": False, "message": f"Database error: {e}"}), 500
+
+    by_building = {b["building_id"]: [] for b in buildings}
+    for office in offices:
+        office["client_count"] = client_counts.get(office["office_id"], 0)
+        by_building[office["building_id"]].append(office)
+
+    tree = [
+        dict(
+            building,
+            offices=by_building[building["building_id"]],
+            client_count=sum(o["client_count"] for o in by_building[building["building_id"]]),
+        )
+        for building in buildings
+    ]
+
+    return (
+        jsonify(
+            {
+                "success": True,
+                "message": "Location tree fetched successfully",
+                "buildings": tree,
+                "limit": limit,
+                "next_after": next_after,
+            }
+        ),
+        200,
+    )
+
+
 @location_bp.route("/locations/building/<building_id>", methods=["DELETE"])
 def deleteBuilding(building_id):
     """
     Endpoint to delete a building by ID along with all related offices
+
+    Clients in the building or its offices go with it, together with their
+    meetings and internet records. Each table is cleared with one DELETE and
+    the response reports how many rows every table lost
     """
 
     building = db.session.execute(
@@ -117,20 +225,7 @@ def deleteBuilding(building_id):
         return jsonify({"success": False, "message": "Building not found"}), 404
 
     try:
-        # Delete related offices first to avoid foreign key constraint violations
-        offices = (
-            db.session.execute(
-                db.select(BuildingOffice).filter_by(building_id=building_id)
-            )
-            .scalars()
-            .all()
-        )
-
-        for office in offices:
-            db.session.delete(office)
-
-        # Finally delete the building
-        db.session.delete(building)
+        deleted = delete_building(building.building_id)
         db.session.commit()
 
         return (
@@ -138,6 +233,7 @@ def deleteBuilding(building_id):
                 {
                     "success": True,
                     "message": "Building and all related offices deleted successfully",
+                    "deleted": deleted,
                 }
             ),
             200,
@@ -200,6 +296,9 @@ def updateBuilding(building_id):
 def deleteOffice(office_id):
     """
     Endpoint for deleting office
+
+    Clients in the office go with it, together with their meetings and
+    internet records; the response reports how many rows every table lost
     """
     office = db.session.execute(
         db.select(BuildingOffice).filter_by(office_id=office_id)
@@ -209,9 +308,14 @@ def deleteOffice(office_id):
         return jsonify({"success": False, "message": "Office not found"}), 404
 
     try:
-        db.session.delete(office)
+        deleted = delete_office(office.office_id)
         db.session.commit()
-        return jsonify({"success": True, "message": "Office deleted successfully"}), 200
+        return (
+            jsonify(
+                {"success": True, "message": "Office deleted successfully", "deleted": deleted}
+            ),
+            200,
+        )
     except SQLAlchemyError as e:
         db.session.rollback()
         return jsonify({"success": False, "message": "Database error: " + str(e)}), 500
@@ -257,13 +361,14 @@ def updateOffice(office_id):
 
 
 @location_bp.route("/locations/offices/names", methods=["GET"])
+@etag(BuildingOffice)
 def getOfficeNames():
     """
     Endpoint for fetching office names
     """
-    names = db.session.execute(
-        db.select(BuildingOffice.office_name)
-    ).scalars().all()
+    names = fetch_column(
+        db.select(BuildingOffice.office_name).order_by(BuildingOffice.office_id)
+    )
 
     if not names:
         return jsonify({"success": False, "message": "No office names found"}), 404